@@ -0,0 +1,71 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from requestConstants import (
+    baseAPI,
+    poolSize
+)
+from RequestHandler import RequestHandler
+
+
+class AsyncRequestHandler(object):
+    """
+    Asyncio variant of RequestHandler.
+    Each coroutine runs the blocking call on a thread pool sized to the connection pool, so all of them share one
+    set of keep-alive connections as well as the validation and error mapping of RequestHandler.
+    """
+    def __init__(self, baseURL=baseAPI, poolSize=poolSize, prewarm=False, refresh=False, snapshotPath=None):
+        self._handler = RequestHandler(baseURL=baseURL, poolSize=poolSize, prewarm=prewarm, refresh=refresh,
+                                       snapshotPath=snapshotPath)
+        self._executor = ThreadPoolExecutor(max_workers=poolSize, thread_name_prefix='AsyncRequestHandler')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Runs a blocking RequestHandler call on the executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def getBalances(self, ccy=None, refresh=False):
+        return await self._run(self._handler.getBalances, ccy, refresh)
+
+    async def getRiskExposure(self):
+        return await self._run(self._handler.getRiskExposure)
+
+    async def RFQ(self, instrument, side, quantity):
+        return await self._run(self._handler.RFQ, instrument, side, quantity)
+
+    async def trade(self, rfq_id=None):
+        return await self._run(self._handler.trade, rfq_id)
+
+    async def getAccountInfo(self):
+        return await self._run(self._handler.getAccountInfo)
+
+    async def getCurrencies(self):
+        return await self._run(self._handler.getCurrencies)
+
+    async def getAllTrades(self):
+        return await self._run(self._handler.getAllTrades)
+
+    async def gatherRFQs(self, rfqs):
+        """
+        Requests quotes for every (instrument, side, quantity) in rfqs concurrently and returns them in the same
+        order. Instruments are fetched once up front so the fan-out does not race on the first _isValid.
+        Exceptions are returned in place of the quote rather than cancelling the other requests.
+        """
+        await self._run(self._handler._getInstruments)
+        return await asyncio.gather(*(self.RFQ(*rfq) for rfq in rfqs), return_exceptions=True)
+
+    def getConnectionStats(self):
+        return self._handler.getConnectionStats()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._handler.close()
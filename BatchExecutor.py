@@ -0,0 +1,93 @@
+import collections
+import csv
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requestConstants import poolSize
+from TradeScheduler import TradeScheduler
+
+
+class BatchExecutor(object):
+    """
+    Executes a basket of (instrument, side, quantity) orders as RFQ and trade pairs on a bounded worker pool.
+    Orders for the same instrument run one after the other in basket order, different instruments run concurrently.
+    """
+    def __init__(self, requestHandler, workers=poolSize):
+        self._requestHandler = requestHandler
+        self._scheduler = TradeScheduler(requestHandler)
+        self._workers = workers
+
+    @staticmethod
+    def load(path):
+        """
+        Reads a basket from a CSV file with instrument, side and quantity columns, from a .json file holding a list of
+        orders with those keys, or from JSONL with one order per line.
+        """
+        with open(path, newline='') as f:
+            if path.endswith('.json'):
+                rows = json.load(f)
+            elif path.endswith('.jsonl'):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = list(csv.DictReader(f))
+        return [{'instrument': r['instrument'].strip(), 'side': r['side'].strip().lower(),
+                 'quantity': str(r['quantity']).strip()} for r in rows]
+
+    def validate(self, basket):
+        """
+        Validates every order in one pass against the cached instruments (and risk limits when enabled).
+        Raises ValueError listing every invalid order.
+        """
+        invalid = []
+        for i, order in enumerate(basket):
+            try:
+                self._requestHandler.validate(order['instrument'], order['side'], order['quantity'])
+            except Exception as e:
+                invalid.append('order %d (%s %s %s): %s' % (i + 1, order['side'], order['quantity'],
+                                                             order['instrument'], e))
+        if invalid:
+            raise ValueError('Invalid basket:\n' + '\n'.join(invalid))
+        return True
+
+    def _executeInstrument(self, orders, report):
+        for i, order in orders:
+            start = time.perf_counter()
+            result = dict(order)
+            try:
+                data = self._scheduler.execute(order['instrument'], order['side'], order['quantity'])
+                if data is None:
+                    result['status'] = 'failed'
+                else:
+                    result.update(status='filled', executed_price=data['executed_price'],
+                                  client_order_id=data['client_order_id'], order_id=data['order_id'])
+            except Exception as e:
+                logging.error('Order %d failed: %s', i + 1, e)
+                result.update(status='error', error=repr(e))
+            result['seconds'] = time.perf_counter() - start
+            report[i] = result
+
+    def execute(self, basket):
+        """
+        Validates then executes the basket. Returns a fill report with one entry per order, in basket order.
+        """
+        self.validate(basket)
+        byInstrument = collections.OrderedDict()
+        for i, order in enumerate(basket):
+            byInstrument.setdefault(order['instrument'], []).append((i, order))
+        report = [None] * len(basket)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='BatchExecutor') as executor:
+            for future in [executor.submit(self._executeInstrument, orders, report)
+                           for orders in byInstrument.values()]:
+                future.result()
+        elapsed = time.perf_counter() - start
+        filled = sum(1 for r in report if r['status'] == 'filled')
+        return {
+            'orders': report,
+            'filled': filled,
+            'failed': len(report) - filled,
+            'seconds': elapsed,
+            'orders_per_sec': len(report) / elapsed if elapsed else None,
+        }
@@ -0,0 +1,113 @@
+import collections
+import logging
+import threading
+import time
+
+from requestConstants import (
+    breakerCooldown,
+    breakerMinRequests,
+    breakerThreshold,
+    breakerWindow,
+    errors,
+    maintenanceErrors,
+    CircuitOpenError
+)
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+# statuses counted as the API failing rather than the request being wrong
+_failures = (408, 429, 500, 503)
+
+
+def isFailure(code):
+    """
+    Whether a response code (None when no response came back) counts against the API's health.
+    """
+    return code is None or code in _failures or code in maintenanceErrors or 500 <= code < 600
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of one endpoint.
+    Closed, requests flow and their outcomes are kept for window seconds; once there were at least minRequests the
+    circuit opens if threshold of them failed. A maintenance error (1200, 1016) opens it straight away.
+    Open, requests fail fast with CircuitOpenError for cooldown seconds, then the circuit turns half open and lets a
+    single probe through: its success closes the circuit, its failure opens it again.
+    """
+    def __init__(self, endpoint, threshold=breakerThreshold, minRequests=breakerMinRequests, window=breakerWindow,
+                 cooldown=breakerCooldown, metrics=None):
+        self.endpoint = endpoint
+        self._threshold = threshold
+        self._minRequests = minRequests
+        self._window = window
+        self._cooldown = cooldown
+        self._metrics = metrics
+        self._outcomes = collections.deque()  # (time, failed)
+        self._failed = 0
+        self._state = CLOSED
+        self._openedAt = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def _setState(self, state, reason=None):
+        if state == self._state:
+            return
+        logging.warning('Circuit of %s %s -> %s%s', self.endpoint, self._state, state,
+                        ' (%s)' % reason if reason else '')
+        self._state = state
+        if state == OPEN:
+            self._openedAt = time.monotonic()
+        if state != CLOSED:
+            self._outcomes.clear()
+            self._failed = 0
+        if self._metrics:
+            self._metrics.circuit(self.endpoint, state)
+            self._metrics.increment('circuit_%s' % state)
+
+    def _rejected(self):
+        if self._metrics:
+            self._metrics.increment('circuit_rejected')
+
+    def before(self):
+        """
+        Called before sending a request, raises CircuitOpenError if it must not be sent.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN:
+                if time.monotonic() - self._openedAt < self._cooldown:
+                    self._rejected()
+                    raise CircuitOpenError(None, 'Circuit of %s is open.' % self.endpoint)
+                self._setState(HALF_OPEN)
+            if self._probing:
+                self._rejected()
+                raise CircuitOpenError(None, 'Circuit of %s is half open, waiting on a probe.' % self.endpoint)
+            self._probing = True
+
+    def record(self, code):
+        """
+        Records the outcome of a request let through: its status or API error code, None if no response came back.
+        """
+        failed = isFailure(code)
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                self._setState(OPEN if failed else CLOSED, errors.get(code) if failed else None)
+                return
+            if self._state == OPEN:  # sent before the circuit opened
+                return
+            if code in maintenanceErrors:
+                self._setState(OPEN, errors[code])
+                return
+            now = time.monotonic()
+            self._outcomes.append((now, failed))
+            self._failed += failed
+            while self._outcomes and now - self._outcomes[0][0] > self._window:
+                self._failed -= self._outcomes.popleft()[1]
+            if len(self._outcomes) >= self._minRequests and self._failed >= self._threshold * len(self._outcomes):
+                self._setState(OPEN, '%d of %d requests failed' % (self._failed, len(self._outcomes)))
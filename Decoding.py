@@ -0,0 +1,44 @@
+import datetime
+import decimal
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library
+    orjson = None
+
+backend = 'orjson' if orjson is not None else 'json'
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def decode(response):
+    """
+    Decodes the body of a requests response with the fastest available JSON backend.
+    """
+    return loads(response.content)
+
+
+def toDecimal(value):
+    """
+    Converts a price or quantity (string or number) to Decimal once, without going through float.
+    Returns None for 'null', None and anything that is not a finite number.
+    """
+    if value is None or value == 'null':
+        return None
+    try:
+        out = decimal.Decimal(value if isinstance(value, (str, int)) else str(value))
+    except (decimal.InvalidOperation, TypeError, ValueError):
+        return None
+    return out if out.is_finite() else None
+
+
+def parseTimestamp(value):
+    """
+    Parses an API timestamp such as 2020-02-28T11:41:30.023467Z to a naive UTC datetime.
+    Uses the C fromisoformat parser on the fixed format, strptime only for anything it rejects.
+    """
+    try:
+        return datetime.datetime.fromisoformat(value[:-1] if value.endswith('Z') else value)
+    except ValueError:
+        return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ')
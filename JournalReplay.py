@@ -0,0 +1,150 @@
+"""
+Replays a request journal written by RequestJournal against a local server that answers with the journaled responses
+after the journaled latency, reproducing a production session's timing.
+
+    python JournalReplay.py journal.jsonl [--speed 2]
+"""
+import argparse
+import collections
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import RequestJournal
+from requestConstants import poolSize
+from Transport import Transport
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Local HTTP server serving journaled responses per (method, endpoint) in the order they were recorded,
+    each after its recorded latency. Requests with nothing left to replay get a 404.
+    """
+    daemon_threads = True
+
+    def __init__(self, records, port=0, speed=1.0):
+        self._responses = collections.defaultdict(collections.deque)
+        for record in records:
+            if record.get('status') is not None:
+                self._responses[(record['method'], record['endpoint'])].append(record)
+        self._lock = threading.Lock()
+        self.speed = speed
+        super(ReplayServer, self).__init__(('127.0.0.1', port), _ReplayHandler)
+
+    @property
+    def baseURL(self):
+        return 'http://127.0.0.1:%d' % self.server_port
+
+    def next(self, method, endpoint):
+        with self._lock:
+            responses = self._responses.get((method, endpoint))
+            return responses.popleft() if responses else None
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), name='ReplayServer', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        record = self.server.next(method, self.path)
+        if record is None:
+            status, body = 404, b'{}'
+        else:
+            if record.get('latency_ns'):
+                time.sleep(record['latency_ns'] / 1e9 / self.server.speed)
+            status, body = record['status'], json.dumps(record.get('response')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply('GET')
+
+    def do_POST(self):
+        self._reply('POST')
+
+    def log_message(self, *args):
+        pass
+
+
+def replay(records, baseURL, speed=1.0, workers=poolSize):
+    """
+    Sends journaled requests to baseURL keeping their original spacing (divided by speed), concurrently when they
+    overlapped originally. Returns per request latency and the requests whose status differs from the journal.
+    """
+    records = [r for r in records if r.get('status') is not None]
+    transport = Transport({}, baseURL=baseURL, poolSize=workers)
+    results = [None] * len(records)
+
+    def _send(i, record):
+        start = time.perf_counter_ns()
+        try:
+            if record['method'] == 'POST':
+                response = transport.post(record['endpoint'], record['payload'])
+            else:
+                response = transport.get(record['endpoint'])
+            response.content  # read the body so latency covers the full response
+            status = response.status_code
+        except Exception as e:
+            logging.warning('Replay of %s failed: %s', record['endpoint'], e)
+            status = None
+        results[i] = (record, status, time.perf_counter_ns() - start)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if records:
+            origin = records[0]['ts']
+            started = time.perf_counter()
+            for i, record in enumerate(records):
+                delay = (record['ts'] - origin) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(_send, i, record)
+    transport.close()
+    return {
+        'requests': len(results),
+        'latency_ns': [r[2] for r in results],
+        'journaled_latency_ns': [r[0]['latency_ns'] for r in results],
+        'mismatches': [{'endpoint': r[0]['endpoint'], 'status': r[1], 'journaled_status': r[0]['status']}
+                       for r in results if r[1] != r[0]['status']],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a request journal against a local mock server.')
+    parser.add_argument('journal', help='journal file written by RequestJournal')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier')
+    args = parser.parse_args()
+    records = list(RequestJournal.read(args.journal))
+    server = ReplayServer(records, speed=args.speed).start()
+    try:
+        summary = replay(records, server.baseURL, speed=args.speed)
+    finally:
+        server.stop()
+    latency = sorted(summary['latency_ns'])
+    print(json.dumps({
+        'requests': summary['requests'],
+        'mismatches': summary['mismatches'],
+        'p50_ms': latency[len(latency) // 2] / 1e6 if latency else None,
+        'max_ms': latency[-1] / 1e6 if latency else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    main()
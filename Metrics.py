@@ -0,0 +1,168 @@
+import collections
+import threading
+import time
+
+_quantiles = (('p50', 0.5), ('p99', 0.99), ('p999', 0.999))
+
+# circuit_open gauge values per circuit breaker state
+_circuitValues = {'closed': 0, 'half_open': 0.5, 'open': 1}
+
+
+class Histogram(object):
+    """
+    HDR-style log-linear histogram of non-negative integers (nanoseconds here).
+    Values keep their significantBits most significant bits (the leading one included), i.e. 2 ** (significantBits - 1)
+    sub-buckets per power of two, so reported percentiles are within 1 / 2 ** (significantBits - 1) of the recorded
+    value while recording stays O(1).
+    """
+    def __init__(self, significantBits=6):
+        self._bits = significantBits
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        value = max(int(value), 0)
+        shift = max(value.bit_length() - self._bits, 0)
+        bucket = value >> shift << shift
+        with self._lock:
+            self._counts[bucket] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """
+        Lower bound of the bucket holding the q-th quantile (0 < q <= 1), None if empty.
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(q * self.count, 1)
+            seen = 0
+            for bucket in sorted(self._counts):
+                seen += self._counts[bucket]
+                if seen >= rank:
+                    return bucket
+            return self.max
+
+    def snapshot(self):
+        out = {'count': self.count, 'min': self.min, 'max': self.max,
+               'mean': self.total / self.count if self.count else None}
+        for name, q in _quantiles:
+            out[name] = self.percentile(q)
+        return out
+
+
+class Metrics(object):
+    """
+    In-process metrics for the RFQ to trade path: request latency histograms per endpoint, time left on quotes when
+    orders are submitted, event counters (RFQs out of date, API error codes) and circuit breaker states.
+    All values are in nanoseconds.
+    """
+    def __init__(self):
+        self._latency = collections.defaultdict(Histogram)
+        self.quoteRemaining = Histogram()
+        self._counters = collections.Counter()
+        self._circuits = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, endpoint, latency):
+        self._latency[endpoint].record(latency)
+
+    def increment(self, name, count=1):
+        with self._lock:
+            self._counters[name] += count
+
+    def circuit(self, endpoint, state):
+        self._circuits[endpoint] = state
+
+    def latency(self, endpoint):
+        """
+        Latency histogram of endpoint, empty if nothing was sent to it yet.
+        """
+        return self._latency.get(endpoint) or Histogram()
+
+    def snapshot(self):
+        return {
+            'latency_ns': {endpoint: h.snapshot() for endpoint, h in list(self._latency.items())},
+            'quote_remaining_ns': self.quoteRemaining.snapshot(),
+            'counters': dict(self._counters),
+            'circuits': dict(self._circuits),
+        }
+
+    def prometheus(self):
+        """
+        Metrics in Prometheus text exposition format.
+        """
+        lines = ['# TYPE request_latency_seconds summary']
+        for endpoint, h in sorted(list(self._latency.items())):
+            for _, q in _quantiles:
+                value = h.percentile(q)
+                if value is not None:
+                    lines.append('request_latency_seconds{endpoint="%s",quantile="%s"} %.9f'
+                                 % (endpoint, q, value / 1e9))
+            lines.append('request_latency_seconds_sum{endpoint="%s"} %.9f' % (endpoint, h.total / 1e9))
+            lines.append('request_latency_seconds_count{endpoint="%s"} %d' % (endpoint, h.count))
+        lines.append('# TYPE quote_remaining_seconds summary')
+        for _, q in _quantiles:
+            value = self.quoteRemaining.percentile(q)
+            if value is not None:
+                lines.append('quote_remaining_seconds{quantile="%s"} %.9f' % (q, value / 1e9))
+        lines.append('quote_remaining_seconds_count %d' % self.quoteRemaining.count)
+        lines.append('# TYPE circuit_open gauge')
+        for endpoint, state in sorted(self._circuits.items()):
+            lines.append('circuit_open{endpoint="%s"} %s' % (endpoint, _circuitValues[state]))
+        for name, value in sorted(self._counters.items()):
+            lines.append('# TYPE %s_total counter' % name)
+            lines.append('%s_total %d' % (name, value))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        """
+        Serves prometheus() on http://host:port/metrics from a background thread. Returns the server.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only imported by processes serving
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200 if self.path == '/metrics' else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='Metrics', daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def measureOverhead(samples=100000):
+    """
+    Average cost in nanoseconds of timing and recording one request latency, as done on every request.
+    """
+    metrics = Metrics()
+    start = time.perf_counter_ns()
+    for _ in range(samples):
+        t = time.perf_counter_ns()
+        metrics.observe('/order/', time.perf_counter_ns() - t)
+    return (time.perf_counter_ns() - start) / samples
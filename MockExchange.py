@@ -0,0 +1,255 @@
+import datetime
+import decimal
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requestConstants import errors
+
+_format = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+# HTTP status sent for API error codes, which are returned in the body
+_apiErrorStatus = 400
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+class MockExchange(ThreadingHTTPServer):
+    """
+    Local stand-in for the API serving /balance/, /instruments/, /request_for_quote/, /order/, /account_info/,
+    /currency/ and /trade/ over keep-alive HTTP, for tests and benchmarks.
+    latency is a number of seconds, or a dict of seconds per endpoint, added before every response.
+    Quotes are valid for quoteValidity seconds. Any code in errors can be forced with failNext; HTTP codes are sent as
+    the status, API codes (1000 and above) as {"errors": [{"code": ..., "message": ...}]} with a 400 status.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0, quoteValidity=10, prices=None, token=None):
+        self.latency = latency
+        self.quoteValidity = quoteValidity
+        self.token = token
+        self.prices = prices or {'BTCUSD.SPOT': '10000.00', 'ETHUSD.SPOT': '200.00', 'BTCEUR.SPOT': '9000.00',
+                                 'XRPUSD.SPOT': '0.25'}
+        self.balances = {'USD': '1000000', 'EUR': '1000000', 'BTC': '100', 'ETH': '1000', 'XRP': '1000000'}
+        self.currencies = {
+            'USD': {'stable_coin': False, 'is_crypto': False, 'currency_type': 'fiat', 'readable_name': 'US Dollar',
+                    'long_only': False, 'minimum_trade_size': 1},
+            'EUR': {'stable_coin': False, 'is_crypto': False, 'currency_type': 'fiat', 'readable_name': 'Euro',
+                    'long_only': False, 'minimum_trade_size': 1},
+            'BTC': {'stable_coin': False, 'is_crypto': True, 'currency_type': 'crypto', 'readable_name': 'Bitcoin',
+                    'long_only': False, 'minimum_trade_size': 0.001},
+            'ETH': {'stable_coin': False, 'is_crypto': True, 'currency_type': 'crypto', 'readable_name': 'Ether',
+                    'long_only': False, 'minimum_trade_size': 0.01},
+            'XRP': {'stable_coin': False, 'is_crypto': True, 'currency_type': 'crypto', 'readable_name': 'Ripple',
+                    'long_only': True, 'minimum_trade_size': 10},
+        }
+        self.accountInfo = {'risk_exposure': '0', 'max_risk_exposure': '10000000', 'btc_max_qty_per_trade': '100',
+                            'eth_max_qty_per_trade': '1000', 'xrp_max_qty_per_trade': '1000000'}
+        self.quotes = {}
+        self.trades = []
+        self.orders = {}
+        self.requests = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        super(MockExchange, self).__init__(('127.0.0.1', port), _Handler)
+
+    @property
+    def baseURL(self):
+        return 'http://127.0.0.1:%d' % self.server_port
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), name='MockExchange', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def failNext(self, code, endpoint=None, count=1):
+        """
+        Makes the next count requests (to endpoint if given) fail with code.
+        """
+        with self._lock:
+            self._failures.extend([(endpoint, code)] * count)
+
+    def _failure(self, endpoint):
+        with self._lock:
+            for i, (failEndpoint, code) in enumerate(self._failures):
+                if failEndpoint in (None, endpoint):
+                    del self._failures[i]
+                    return code
+
+    def respond(self, method, endpoint, body):
+        """
+        Returns (status, response) for a request.
+        """
+        with self._lock:
+            self.requests += 1
+        code = self._failure(endpoint)
+        if code is not None:
+            return self._error(code)
+        routes = {
+            ('GET', '/balance/'): lambda: self.balances,
+            ('GET', '/instruments/'): lambda: [{'name': name} for name in self.prices],
+            ('GET', '/account_info/'): lambda: self.accountInfo,
+            ('GET', '/currency/'): lambda: self.currencies,
+            ('GET', '/trade/'): lambda: self.trades,
+            ('POST', '/request_for_quote/'): lambda: self._rfq(body),
+            ('POST', '/order/'): lambda: self._order(body),
+        }
+        if (method, endpoint) not in routes:
+            return self._error(404 if endpoint not in {e for _, e in routes} else 405)
+        try:
+            return 200, routes[(method, endpoint)]()
+        except _Rejected as e:
+            return self._error(e.args[0])
+
+    @staticmethod
+    def _error(code):
+        if code < 1000:
+            return code, {'message': errors[code]}
+        return _apiErrorStatus, {'errors': [{'code': code, 'message': errors[code]}]}
+
+    def _checkQuantity(self, body):
+        for field in ('instrument', 'side', 'quantity'):
+            if field not in body:
+                raise _Rejected(1101)
+        if body['instrument'] not in self.prices:
+            raise _Rejected(1001)
+        if body['side'] not in ('buy', 'sell'):
+            raise _Rejected(1017)
+        try:
+            quantity = decimal.Decimal(str(body['quantity']))
+        except decimal.InvalidOperation:
+            raise _Rejected(1017)
+        if quantity.as_tuple().exponent < -4 and quantity != quantity.quantize(decimal.Decimal('0.0001')):
+            raise _Rejected(1015)
+        base = body['instrument'][:3]
+        if quantity < decimal.Decimal(str(self.currencies[base]['minimum_trade_size'])):
+            raise _Rejected(1019)
+        maximum = self.accountInfo.get(base.lower() + '_max_qty_per_trade')
+        if maximum is not None and quantity > decimal.Decimal(maximum):
+            raise _Rejected(1010)
+        return quantity
+
+    def _rfq(self, body):
+        quantity = self._checkQuantity(body)
+        created = _now()
+        quote = {
+            'valid_until': (created + datetime.timedelta(seconds=self.quoteValidity)).strftime(_format),
+            'rfq_id': str(uuid.uuid4()),
+            'client_rfq_id': body.get('client_rfq_id'),
+            'quantity': '%.10f' % quantity,
+            'side': body['side'],
+            'instrument': body['instrument'],
+            'price': '%.8f' % decimal.Decimal(self.prices[body['instrument']]),
+            'created': created.strftime(_format),
+        }
+        with self._lock:
+            self.quotes[(quote['instrument'], quote['side'], quote['price'], quote['valid_until'])] = quote
+        return quote
+
+    def _order(self, body):
+        quantity = self._checkQuantity(body)
+        for field in ('client_order_id', 'price', 'order_type', 'valid_until'):
+            if field not in body:
+                raise _Rejected(1101)
+        with self._lock:
+            if body['client_order_id'] in self.orders:  # idempotent retry
+                return self.orders[body['client_order_id']]
+        if body['order_type'] != 'FOK':
+            raise _Rejected(1023)
+        try:
+            validUntil = datetime.datetime.strptime(body['valid_until'], _format)
+        except ValueError:
+            raise _Rejected(1020)
+        with self._lock:
+            quote = self.quotes.get((body['instrument'], body['side'], body['price'], body['valid_until']))
+        if quote is None:
+            raise _Rejected(1005)
+        if _now() >= validUntil:
+            raise _Rejected(1007)
+        if decimal.Decimal(quote['quantity']) != quantity:
+            raise _Rejected(1006)
+        created = _now().strftime(_format)
+        orderId = str(uuid.uuid4())
+        trade = {
+            'instrument': body['instrument'],
+            'trade_id': str(uuid.uuid4()),
+            'origin': 'rest',
+            'rfq_id': quote['rfq_id'],
+            'created': created,
+            'price': body['price'],
+            'quantity': quote['quantity'],
+            'order': orderId,
+            'side': body['side'],
+            'executing_unit': 'risk-adding-strategy',
+        }
+        base, counter = body['instrument'][:3], body['instrument'][3:6]
+        sign = 1 if body['side'] == 'buy' else -1
+        notional = quantity * decimal.Decimal(body['price'])
+        with self._lock:
+            self.balances[base] = str(decimal.Decimal(self.balances.get(base, '0')) + sign * quantity)
+            self.balances[counter] = str(decimal.Decimal(self.balances.get(counter, '0')) - sign * notional)
+            self.trades.append(trade)
+            order = self.orders[body['client_order_id']] = {
+                'order_id': orderId,
+                'client_order_id': body['client_order_id'],
+                'quantity': quote['quantity'],
+                'side': body['side'],
+                'instrument': body['instrument'],
+                'price': body['price'],
+                'executed_price': body['price'],
+                'executing_unit': 'risk-adding-strategy',
+                'trades': [trade],
+                'created': created,
+            }
+        return order
+
+
+class _Rejected(Exception):
+    pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        if self.server.token is not None and self.headers.get('Authorization') != 'Token %s' % self.server.token:
+            status, response = self.server._error(401)
+        else:
+            status, response = self.server.respond(method, self.path, body)
+        latency = self.server.latency
+        if isinstance(latency, dict):
+            latency = latency.get(self.path, 0)
+        if latency:
+            time.sleep(latency)
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply('GET')
+
+    def do_POST(self):
+        self._reply('POST')
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,134 @@
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from requestConstants import (
+    baseAPI,
+    poolSize
+)
+
+# reference data that is the same for every account, account_info is fetched by each account
+sharedReferences = ('/instruments/', '/currency/')
+
+_header = struct.Struct('<Q')  # length of the JSON that follows
+
+
+class SharedSnapshot(object):
+    """
+    Reference data snapshot written once to a shared memory block and read by every worker process, so N accounts
+    cost one fetch of instruments and currencies instead of N.
+    """
+    def __init__(self, block):
+        self._block = block
+
+    @property
+    def name(self):
+        return self._block.name
+
+    @classmethod
+    def create(cls, snapshot):
+        data = json.dumps(snapshot).encode('utf-8')
+        block = shared_memory.SharedMemory(create=True, size=_header.size + len(data))
+        _header.pack_into(block.buf, 0, len(data))
+        block.buf[_header.size:_header.size + len(data)] = data
+        return cls(block)
+
+    @staticmethod
+    def read(name):
+        """
+        Decodes the snapshot in block name without taking ownership of it.
+        """
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            length, = _header.unpack_from(block.buf, 0)
+            return json.loads(bytes(block.buf[_header.size:_header.size + length]))
+        finally:
+            block.close()
+
+    def close(self):
+        self._block.close()
+        self._block.unlink()
+
+
+def _runAccount(account, snapshotName, baseURL, workers, handlerOptions):
+    """
+    Worker process: executes one account's basket with its own handler and connection pool.
+    """
+    from BatchExecutor import BatchExecutor
+    from RequestHandler import RequestHandler
+    start = time.perf_counter()
+    rH = RequestHandler(baseURL=baseURL, poolSize=workers, apiToken=account['apiToken'],
+                        referenceSnapshot=SharedSnapshot.read(snapshotName),
+                        orderJournalPath=account.get('orderJournal'), **handlerOptions)
+    try:
+        bE = BatchExecutor(rH, workers=workers)
+        basket = account['basket']
+        report = bE.execute(bE.load(basket) if isinstance(basket, str) else basket)
+        report['account'] = account['name']
+        report['pid'] = os.getpid()
+        report['reference_fetches'] = {request: stats['refreshes']
+                                       for request, stats in rH.getReferenceStats().items()}
+    finally:
+        rH.close()
+    report['process_seconds'] = time.perf_counter() - start
+    return report
+
+
+class MultiAccountRunner(object):
+    """
+    Executes the basket of every account in its own process, one RequestHandler and connection pool per account.
+    Instruments and currencies are fetched once by the parent and shared with the workers through shared memory.
+    accounts are dicts with name, apiToken and basket (a basket file or a list of orders), see
+    requestConstants.loadConfig. By default there is one process per account: workers spend most of their time waiting
+    on the API, so capping them at the number of cores would queue accounts behind each other.
+    """
+    def __init__(self, accounts, baseURL=baseAPI, workers=poolSize, processes=None, **handlerOptions):
+        self._accounts = accounts
+        self._baseURL = baseURL
+        self._workers = workers
+        self._processes = processes or len(accounts)
+        self._handlerOptions = handlerOptions
+
+    def _snapshot(self):
+        from RequestHandler import RequestHandler
+        rH = RequestHandler(baseURL=self._baseURL, apiToken=self._accounts[0]['apiToken'])
+        try:
+            return rH.getReferenceSnapshot(sharedReferences)
+        finally:
+            rH.close()
+
+    def run(self):
+        """
+        Returns the fill report of each account along with aggregate throughput.
+        """
+        start = time.perf_counter()
+        snapshot = SharedSnapshot.create(self._snapshot())
+        try:
+            # spawned rather than forked: the parent has transport and writer threads running
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=self._processes, mp_context=context) as executor:
+                futures = [executor.submit(_runAccount, account, snapshot.name, self._baseURL, self._workers,
+                                           self._handlerOptions) for account in self._accounts]
+                reports = []
+                for account, future in zip(self._accounts, futures):
+                    try:
+                        reports.append(future.result())
+                    except Exception as e:
+                        logging.error('Account %s failed: %s', account['name'], e)
+                        reports.append({'account': account['name'], 'error': repr(e), 'filled': 0, 'failed': None})
+        finally:
+            snapshot.close()
+        elapsed = time.perf_counter() - start
+        orders = sum(len(r['orders']) for r in reports if 'orders' in r)
+        return {
+            'accounts': reports,
+            'orders': orders,
+            'filled': sum(r['filled'] for r in reports),
+            'seconds': elapsed,
+            'orders_per_sec': orders / elapsed if elapsed else None,
+        }
@@ -0,0 +1,206 @@
+import concurrent.futures
+import datetime
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from Decoding import (
+    parseTimestamp,
+    toDecimal
+)
+
+_stop = object()
+_epoch = datetime.datetime(1970, 1, 1)
+
+# seconds a trade's created may lie outside the order's window, for clock differences with the API
+_clockSkew = 60
+
+# outcomes still to be settled: the order was never sent or we never learnt what happened to it
+_unresolved = ('pending', 'unknown')
+
+
+class OrderJournal(object):
+    """
+    Durable journal of orders in SQLite (WAL), keyed by client_order_id.
+    intent records the order before it is sent and only returns once committed, outcome records what happened to it.
+    Writes from all threads go through one writer thread that commits whatever is queued in a single transaction
+    (group commit), so concurrent orders share a commit. With synchronous NORMAL a commit survives a crash of the
+    process without an fsync per order; use FULL to also survive power loss.
+    """
+    def __init__(self, path='orders.db', synchronous='NORMAL'):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=%s' % synchronous)
+            self._db.execute('CREATE TABLE IF NOT EXISTS orders ('
+                             'client_order_id TEXT PRIMARY KEY, rfq_id TEXT, instrument TEXT NOT NULL, '
+                             'side TEXT NOT NULL, quantity TEXT NOT NULL, price TEXT NOT NULL, '
+                             'valid_until TEXT NOT NULL, payload TEXT NOT NULL, state TEXT NOT NULL, order_id TEXT, '
+                             'executed_price TEXT, created REAL NOT NULL, updated REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS orders_state ON orders (state)')
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='OrderJournal', daemon=True)
+        self._thread.start()
+
+    def _write(self, sql, params):
+        future = concurrent.futures.Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _stop for item in batch)
+            batch = [item for item in batch if item is not _stop]
+            try:
+                with self._lock, self._db:
+                    for sql, params, _ in batch:
+                        if sql:
+                            self._db.execute(sql, params)
+            except Exception as e:
+                logging.error('Unable to write order journal: %s', e)
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, _, future in batch:
+                    future.set_result(None)
+            if stop:
+                break
+
+    def intent(self, post_data, rfq_id=None):
+        """
+        Records an order about to be sent, returning once it is committed.
+        """
+        now = time.time()
+        self._write('INSERT OR IGNORE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?)',
+                    (post_data['client_order_id'], rfq_id, post_data['instrument'], post_data['side'],
+                     post_data['quantity'], post_data['price'], post_data['valid_until'], json.dumps(post_data),
+                     'pending', now, now)).result()
+
+    def outcome(self, client_order_id, state, order_id=None, executed_price=None):
+        """
+        Records what happened to an order: 'filled', 'rejected' (the API answered and nothing executed), 'expired'
+        (never executed and can no longer) or 'unknown' (no answer, it may have executed).
+        Queued behind the intent without waiting for the commit.
+        """
+        self._write('UPDATE orders SET state = ?, order_id = COALESCE(?, order_id), '
+                    'executed_price = COALESCE(?, executed_price), updated = ? WHERE client_order_id = ?',
+                    (state, order_id, executed_price, time.time(), client_order_id))
+
+    def flush(self):
+        """
+        Waits until everything queued so far is committed.
+        """
+        self._write(None, None).result()
+
+    def _select(self, where, params):
+        self.flush()
+        with self._lock:
+            cursor = self._db.execute('SELECT * FROM orders ' + where, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def get(self, client_order_id):
+        """
+        Journaled order as a dict with its payload decoded, None if unknown.
+        """
+        rows = self._select('WHERE client_order_id = ?', (client_order_id,))
+        if not rows:
+            return None
+        rows[0]['payload'] = json.loads(rows[0]['payload'])
+        return rows[0]
+
+    def orders(self, *states):
+        """
+        Journaled orders in any of states, oldest first, with their payload decoded.
+        """
+        rows = self._select('WHERE state IN (%s) ORDER BY created' % ', '.join('?' * len(states)), states)
+        for row in rows:
+            row['payload'] = json.loads(row['payload'])
+        return rows
+
+    def unresolved(self):
+        """
+        Orders never sent or whose outcome is unknown, oldest first.
+        """
+        return self.orders(*_unresolved)
+
+    def reconcile(self, trades, now=None):
+        """
+        Settles unresolved orders against executed trades (as returned by /trade/, covering the orders' quotes): an
+        order whose rfq_id traded is filled. Trades often come back with rfq_id 'null', so an order any trade could be
+        the execution of (see mayHaveTraded) is left unknown, neither expired nor retried: it must never be sent
+        again. Otherwise one whose quote has expired is expired and one still within its quote is left unresolved.
+        Returns the number of orders settled.
+        """
+        unresolved = self.unresolved()
+        if not unresolved:
+            return 0
+        trades = trades if isinstance(trades, list) else list(trades)
+        rfqIds = {o['rfq_id'] for o in unresolved}
+        byRfq = {t['rfq_id']: t for t in trades if t['rfq_id'] in rfqIds}
+        now = now or time.time()
+        settled = 0
+        for order in unresolved:
+            trade = byRfq.get(order['rfq_id'])
+            if trade is not None:
+                self.outcome(order['client_order_id'], 'filled', trade['order'], str(trade['price']))
+            elif self.mayHaveTraded(order, trades):
+                logging.warning('Order %s may have traded without its rfq_id, left unknown', order['client_order_id'])
+                if order['state'] != 'unknown':
+                    self.outcome(order['client_order_id'], 'unknown')
+                continue
+            elif _seconds(order['valid_until']) >= now:
+                continue
+            else:
+                self.outcome(order['client_order_id'], 'expired')
+            settled += 1
+        self.flush()
+        logging.info('%s of %s unresolved orders settled', settled, len(unresolved))
+        return settled
+
+    @staticmethod
+    def mayHaveTraded(order, trades):
+        """
+        Whether any of trades could be the execution of the journaled order: same instrument, side, quantity and price,
+        created within the order's quote, and no rfq_id or the order's own.
+        """
+        validUntil = _seconds(order['valid_until'])
+        return any(_matches(order, t, validUntil) for t in trades)
+
+    def close(self):
+        """
+        Commits everything queued so far and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_stop)
+            self._thread.join()
+        self._db.close()
+
+
+def _seconds(timestamp):
+    return (parseTimestamp(timestamp) - _epoch).total_seconds()
+
+
+def _matches(order, trade, validUntil):
+    """
+    See OrderJournal.mayHaveTraded.
+    """
+    if trade['rfq_id'] not in (None, 'null', order['rfq_id']):
+        return False
+    if trade['instrument'] != order['instrument'] or trade['side'] != order['side'] or \
+            toDecimal(trade['quantity']) != toDecimal(order['quantity']) or \
+            toDecimal(trade['price']) != toDecimal(order['price']):
+        return False
+    created = _seconds(trade['created'])
+    return order['created'] - _clockSkew <= created <= validUntil + _clockSkew
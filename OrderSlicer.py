@@ -0,0 +1,123 @@
+import decimal
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Decoding import toDecimal
+from TradeScheduler import TradeScheduler
+from requestConstants import (
+    errors,
+    poolSize,
+    quantityStep,
+    APIError,
+    APIErrors
+)
+
+_step = toDecimal(quantityStep)
+
+
+class OrderSlicer(object):
+    """
+    Executes a parent order too big for one trade as child RFQ and trade slices within the account's limits: at most
+    <base>_max_qty_per_trade from getAccountInfo, at least the minimum_trade_size from getCurrencies, and no more than
+    four decimals. Slices are as even as the decimals allow and each goes through TradeScheduler, so expired quotes
+    are re-quoted. They run concurrently on workers threads, or TWAP-paced, one every duration / slices seconds.
+    Once a slice is rejected outright by the API (or by the risk checks) the slices not yet sent are skipped.
+    """
+    def __init__(self, requestHandler, workers=poolSize):
+        self._requestHandler = requestHandler
+        self._scheduler = TradeScheduler(requestHandler)
+        self._workers = workers
+
+    def limits(self, instrument):
+        """
+        (minimum, maximum) quantity of one trade of instrument, either None when there is no limit.
+        """
+        base, _ = self._requestHandler.getPair(instrument)
+        maximum = self._requestHandler.getAccountInfo().get(base.lower() + '_max_qty_per_trade')
+        minimum = self._requestHandler.getCurrencies().get(base, {}).get('minimum_trade_size')
+        return (toDecimal(minimum) if minimum is not None else None,
+                toDecimal(maximum).quantize(_step, decimal.ROUND_DOWN) if maximum is not None else None)
+
+    def slices(self, instrument, quantity, count=1):
+        """
+        Splits quantity into count slices that each fit the limits of instrument: more if the maximum requires it,
+        fewer if they would fall under the minimum. Raises APIError with the code the API would have returned when
+        quantity cannot be split within the limits, ValueError if count is less than 1.
+        """
+        if count < 1:
+            raise ValueError('Invalid count ' + str(count) + '. At least one slice is needed.')
+        quantity = toDecimal(quantity)
+        if quantity is None or quantity <= 0:
+            raise ValueError('Invalid quantity ' + str(quantity) + '. Quantity must be numeric and greater than zero.')
+        if quantity % _step:
+            raise APIErrors[1015](1015, errors[1015])
+        minimum, maximum = self.limits(instrument)
+        steps = int(quantity / _step)
+        count = min(count, int(quantity / minimum) if minimum else steps) or 1
+        if maximum is not None:
+            count = max(count, math.ceil(quantity / maximum))
+        # every slice gets floor(quantity / count) steps and the first ones one more step each for the rest
+        size, rest = divmod(steps, count)
+        out = [(size + (i < rest)) * _step for i in range(count)]
+        if minimum is not None and out[-1] < minimum:
+            raise APIErrors[1019](1019, errors[1019])
+        return out
+
+    def _execute(self, instrument, side, quantity, skip):
+        start = time.perf_counter()
+        result = {'quantity': quantity}
+        if skip.is_set():
+            result['status'] = 'skipped'
+            return result
+        try:
+            data = self._scheduler.execute(instrument, side, str(quantity))
+            if data is None:
+                result['status'] = 'failed'
+            else:
+                result.update(status='filled', executed_price=toDecimal(data['executed_price']),
+                              client_order_id=data['client_order_id'], order_id=data['order_id'])
+        except Exception as e:
+            logging.error('Slice of %s %s %s failed: %s', side, quantity, instrument, e)
+            if isinstance(e, APIError) and not e.retriable:
+                skip.set()
+            result.update(status='error', error=repr(e))
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def execute(self, instrument, side, quantity, count=1, duration=None):
+        """
+        Trades quantity of instrument in about count slices (see slices), concurrently or, with duration, one slice
+        every duration / slices seconds. Returns a fill report with the slices in order, the quantity filled and its
+        volume weighted average price (vwap, None if nothing filled).
+        """
+        slices = self.slices(instrument, quantity, count)
+        self._requestHandler.validate(instrument, side, str(slices[0]))
+        interval = duration / len(slices) if duration else 0
+        skip = threading.Event()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self._workers, len(slices)),
+                                thread_name_prefix='OrderSlicer') as executor:
+            futures = []
+            for i, size in enumerate(slices):
+                if interval:
+                    time.sleep(max(0.0, start + i * interval - time.perf_counter()))
+                futures.append(executor.submit(self._execute, instrument, side, size, skip))
+            report = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        filled = [r for r in report if r['status'] == 'filled']
+        filledQuantity = sum((r['quantity'] for r in filled), decimal.Decimal(0))
+        notional = sum((r['quantity'] * r['executed_price'] for r in filled), decimal.Decimal(0))
+        return {
+            'instrument': instrument,
+            'side': side,
+            'quantity': toDecimal(quantity),
+            'slices': report,
+            'filled': len(filled),
+            'failed': len(report) - len(filled),
+            'filled_quantity': filledQuantity,
+            'vwap': notional / filledQuantity if filled else None,
+            'seconds': elapsed,
+        }
@@ -0,0 +1,194 @@
+import decimal
+import logging
+import threading
+import time
+
+from Decoding import toDecimal
+from requestConstants import (
+    ledgerDriftTolerance,
+    ledgerReconcileInterval
+)
+
+_zero = decimal.Decimal(0)
+_one = decimal.Decimal(1)
+
+
+class PositionLedger(object):
+    """
+    In memory balances per currency, applied incrementally from our own executed orders so reading a balance or the
+    risk exposure never costs a request.
+    /balance/ is fetched on first use, then only to reconcile: every reconcileInterval seconds (on access, or from the
+    background thread once started) and on the next access after drift was reported, e.g. when the API rejects an
+    order for a balance we believed we had.
+    fetchBalances returns the raw /balance/ response, split maps an instrument to its (base, counter) currencies.
+    """
+    def __init__(self, fetchBalances, split, reconcileInterval=ledgerReconcileInterval,
+                 tolerance=ledgerDriftTolerance, metrics=None):
+        self._fetchBalances = fetchBalances
+        self._split = split
+        self._reconcileInterval = reconcileInterval
+        self._tolerance = toDecimal(tolerance)
+        self._metrics = metrics
+        self._balances = None
+        self._short = set()
+        self._reconciled = None
+        self._drifted = False
+        self._prices = {}
+        self._fetching = 0  # reconciles waiting on /balance/
+        self._applied = []  # deltas applied while a reconcile was fetching, replayed onto what it fetched
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loaded(self):
+        """
+        Balances, reconciled first if they were never fetched, drifted, or are due and no background thread does it.
+        """
+        balances = self._balances
+        if balances is None or self._drifted or (self._thread is None and
+                                                 time.monotonic() - self._reconciled >= self._reconcileInterval):
+            balances = self.reconcile()
+        return balances
+
+    def reconcile(self):
+        """
+        Replaces the ledger with a fresh /balance/, logging and counting any currency that drifted by more than the
+        tolerance. Returns the balances.
+        Fills applied while /balance/ is fetched are replayed onto the fetched balances, so they are not lost until
+        the next reconcile.
+        """
+        with self._lock:
+            self._fetching += 1
+            start = len(self._applied)
+        try:
+            data = self._fetchBalances()
+            fetched = {ccy: toDecimal(balance) or _zero for ccy, balance in data.items()}
+        except Exception as e:
+            with self._lock:
+                self._endFetch()
+            raise e
+        with self._lock:
+            for deltas in self._applied[start:]:
+                for ccy, delta in deltas.items():
+                    fetched[ccy] = fetched.get(ccy, _zero) + delta
+            self._endFetch()
+            if self._balances is not None:
+                drifted = {ccy: (self._balances.get(ccy, _zero), fetched.get(ccy, _zero))
+                           for ccy in set(self._balances) | set(fetched)
+                           if abs(self._balances.get(ccy, _zero) - fetched.get(ccy, _zero)) > self._tolerance}
+                if drifted:
+                    logging.warning('Ledger drifted from /balance/ (ledger, API): %s', drifted)
+                    self._increment('ledger_drift', len(drifted))
+            self._balances = fetched
+            self._short = {ccy for ccy, balance in fetched.items() if balance < 0}
+            self._reconciled = time.monotonic()
+            self._drifted = False
+        self._increment('ledger_reconcile')
+        return fetched
+
+    def _endFetch(self):
+        self._fetching -= 1
+        if not self._fetching:
+            self._applied = []
+
+    def invalidate(self):
+        """
+        Reports drift: balances are reconciled on next access.
+        """
+        self._drifted = True
+
+    def _increment(self, name, count=1):
+        if self._metrics:
+            self._metrics.increment(name, count)
+
+    def balance(self, ccy, default=_zero):
+        return self._loaded().get(ccy, default)
+
+    def balances(self):
+        return dict(self._loaded())
+
+    def apply(self, order):
+        """
+        Applies an executed order (dict or Order record) to the balances. Ignored until balances were fetched, the
+        first fetch will include it.
+        """
+        if self._balances is None:
+            return
+        base, counter = self._split(order['instrument'])
+        deltas = self.deltas(base, counter, order['side'], toDecimal(order['quantity']),
+                             toDecimal(order['executed_price']))
+        with self._lock:
+            if self._balances is None:
+                return
+            if self._fetching:
+                self._applied.append(deltas)
+            for ccy, delta in deltas.items():
+                balance = self._balances[ccy] = self._balances.get(ccy, _zero) + delta
+                if balance < 0:
+                    self._short.add(ccy)
+                else:
+                    self._short.discard(ccy)
+
+    @staticmethod
+    def deltas(base, counter, side, quantity, price):
+        sign = 1 if side == 'buy' else -1
+        return {base: sign * quantity, counter: -sign * quantity * price}
+
+    def onQuote(self, quote):
+        """
+        Records the latest quoted price per instrument, used to value negative balances.
+        Only a dict store, instruments are resolved to currencies when the exposure is computed.
+        """
+        self._prices[quote.instrument] = quote.price
+
+    def _usdPrice(self, ccy):
+        if ccy == 'USD':
+            return _one
+        for instrument, price in list(self._prices.items()):
+            if self._split(instrument) == (ccy, 'USD'):
+                return price
+        return None
+
+    def exposure(self, deltas=None):
+        """
+        Risk exposure in USD, i.e. the sum of negative balances, optionally after applying deltas.
+        Only currencies with a negative balance or a delta are visited. Returns None if a negative balance has no
+        known USD price.
+        """
+        balances = self._loaded()
+        deltas = deltas or {}
+        total = _zero
+        for ccy in self._short | set(deltas):
+            balance = balances.get(ccy, _zero) + deltas.get(ccy, _zero)
+            if balance < 0:
+                price = self._usdPrice(ccy)
+                if price is None:
+                    return None
+                total -= balance * price
+        return total
+
+    def start(self, interval=None):
+        """
+        Starts reconciling from a background thread every interval seconds (reconcileInterval by default), so
+        access never waits on /balance/ once it was first fetched.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval or self._reconcileInterval,),
+                                        name='PositionLedger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                logging.warning('Unable to reconcile balances: %s', e)
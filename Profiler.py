@@ -0,0 +1,313 @@
+import collections
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+
+from Metrics import Histogram
+
+# sampled stacks of a session started by toggle without a path, named after its start time
+stacksPath = 'profile-%Y%m%d-%H%M%S.stacks'
+
+# phases of a request the summary splits time into, see Profiler.phase
+phases = ('network', 'decode', 'validation', 'logging')
+
+# modules whose frames put a sample in a phase, the frame nearest the leaf decides
+_sampleModules = (
+    ('logging', 'logging'),
+    ('decode', 'json'), ('decode', 'Decoding'), ('decode', 'orjson'), ('decode', 'jsonStream'),
+    ('network', 'socket'), ('network', 'ssl'), ('network', 'http'), ('network', 'urllib3'),
+    ('network', 'requests'), ('network', 'Transport'),
+    ('validation', 'RiskEngine'),
+)
+_sampleFunctions = {'_isValid': 'validation'}
+
+
+class _Null(object):
+    """
+    Context manager doing nothing, what every hook returns while profiling is off.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null = _Null()
+
+
+class _Timer(object):
+    __slots__ = ('_histogram', '_start', '_local')
+
+    def __init__(self, histogram, local=None):
+        self._histogram = histogram
+        self._local = local
+
+    def __enter__(self):
+        if self._local is not None:
+            self._local.depth = getattr(self._local, 'depth', 0) + 1
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+        if self._local is not None:
+            self._local.depth -= 1
+        return False
+
+
+class _Nested(_Timer):
+    """
+    Timer of an outermost call, also recorded in the total the phase shares are computed against.
+    """
+    __slots__ = ('_top',)
+
+    def __init__(self, histogram, top, local):
+        super(_Nested, self).__init__(histogram, local)
+        self._top = top
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self._start
+        self._histogram.record(elapsed)
+        self._top.record(elapsed)
+        self._local.depth -= 1
+        return False
+
+
+def profiled(func):
+    """
+    Decorator timing a method of an object with a _profiler, under the method's name.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self._profiler.enabled:
+            return func(self, *args, **kwargs)
+        with self._profiler.call(name):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def phased(phase):
+    """
+    Decorator timing a method of an object with a _profiler as phase.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not self._profiler.enabled:
+                return func(self, *args, **kwargs)
+            with self._profiler.phase(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Profiler(object):
+    """
+    Opt-in profiler of a trading session, switched on and off at runtime with enable and disable.
+    Hooks: call(name) times a method (see profiled) and phase(name) a part of a request, network, decode, validation
+    or logging (time spent in the root logger's handlers). Both are context managers, which the profiled and phased
+    decorators skip entirely while profiling is off. Phases can nest, e.g. validation includes the network time of a
+    reference data fetch on a cold cache.
+    With sampling, a background thread also records the stack of every thread each interval seconds and writes them
+    in collapsed stack format (frame;frame;frame count), which flamegraph.pl and speedscope read.
+    requestToggle is the signal handler to switch profiling on and off, see watch.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wrapped = []
+        self._path = None
+        self._stacksPath = None  # last path given to enable, reused by toggle
+        self._sampler = None
+        self._stop = threading.Event()
+        self._toggleRequested = False
+        self._watcher = None
+        self._unwatch = threading.Event()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = collections.defaultdict(Histogram)
+            self._top = Histogram()  # outermost calls only, so nested calls are not counted twice
+            self._phases = {phase: Histogram() for phase in phases}
+            self._stacks = collections.Counter()
+            self._samplePhases = collections.Counter()
+            self._started = time.monotonic()
+            self._stopped = None
+
+    def call(self, name):
+        if not self.enabled:
+            return _null
+        if getattr(self._local, 'depth', 0) == 0:
+            return _Nested(self._calls[name], self._top, self._local)
+        return _Timer(self._calls[name], self._local)
+
+    def phase(self, name):
+        if not self.enabled:
+            return _null
+        return _Timer(self._phases[name])
+
+    def enable(self, sampling=False, interval=0.005, path=None):
+        """
+        Starts a new profiling session, sampled too when sampling. path is where disable writes the sampled stacks.
+        """
+        if self.enabled:
+            return self
+        self.reset()
+        self._path = path
+        self._stacksPath = path or self._stacksPath
+        self.enabled = True
+        for handler in logging.getLogger().handlers:
+            if 'handle' not in vars(handler):
+                handler.handle = self._timedHandle(handler.handle)
+                self._wrapped.append(handler)
+        if sampling and self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, args=(interval,), name='Profiler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def disable(self):
+        """
+        Stops profiling, writes the sampled stacks if a path was given and returns the session summary.
+        """
+        if not self.enabled:
+            return self.summary()
+        self.enabled = False
+        self._stopped = time.monotonic()
+        for handler in self._wrapped:
+            del handler.handle
+        self._wrapped = []
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._path and self._stacks:
+            self.writeStacks(self._path)
+        return self.summary()
+
+    def toggle(self):
+        """
+        Enables sampled profiling if it is off, else disables it. Stacks go to the path last given to enable, else to
+        a new stacksPath file. Not for signal handlers, see requestToggle.
+        """
+        if self.enabled:
+            logging.warning('Profiling stopped: %s', self.disable())
+        else:
+            path = self._stacksPath or time.strftime(stacksPath)
+            self.enable(sampling=True, path=path)
+            logging.warning('Profiling started, sampled stacks will be written to %s', path)
+
+    def requestToggle(self, *args):
+        """
+        Signal handler toggling profiling, e.g. signal.signal(signal.SIGUSR1, profiler.requestToggle) once watch was
+        called. It only flags the request: toggle takes locks the interrupted thread may hold, so the watch thread
+        carries it out.
+        """
+        self._toggleRequested = True
+
+    def watch(self, interval=0.1):
+        """
+        Starts the thread toggling profiling within interval seconds of requestToggle, until unwatch.
+        """
+        if self._watcher is not None:
+            return self
+        self._unwatch.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='ProfilerToggle', daemon=True)
+        self._watcher.start()
+        return self
+
+    def unwatch(self):
+        if self._watcher is None:
+            return
+        self._unwatch.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval):
+        while not self._unwatch.wait(interval):
+            if self._toggleRequested:
+                self._toggleRequested = False
+                try:
+                    self.toggle()
+                except Exception as e:
+                    logging.error('Unable to toggle profiling: %s', e)
+
+    def _timedHandle(self, handle):
+        def timedHandle(record):
+            with self.phase('logging'):
+                return handle(record)
+        return timedHandle
+
+    def _sample(self, interval):
+        me = threading.get_ident()
+        frames = {}  # code: (name, phase)
+        while not self._stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                phase = None
+                while frame is not None:
+                    code = frame.f_code
+                    entry = frames.get(code)
+                    if entry is None:
+                        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                        entry = frames[code] = ('%s:%s' % (module, code.co_name), _samplePhase(code))
+                    stack.append(entry[0])
+                    phase = phase or entry[1]
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[';'.join(reversed(stack))] += 1
+                    self._samplePhases[phase or 'other'] += 1
+
+    def stacks(self):
+        """
+        Sampled stacks in collapsed format, one 'frame;frame;frame count' line each.
+        """
+        with self._lock:
+            return ''.join('%s %d\n' % (stack, count) for stack, count in self._stacks.most_common())
+
+    def writeStacks(self, path):
+        with open(path, 'w') as f:
+            f.write(self.stacks())
+
+    def summary(self):
+        """
+        Time per method and per phase of the current (or last) session, with each phase's share of the time spent
+        in profiled methods, and the share of samples per phase when sampling.
+        """
+        with self._lock:
+            total = self._top.total
+            out = {
+                'enabled': self.enabled,
+                'seconds': (self._stopped or time.monotonic()) - self._started,
+                'methods': {name: h.snapshot() for name, h in self._calls.items()},
+                'profiled_seconds': total / 1e9,
+                'phases': {phase: {'seconds': h.total / 1e9, 'count': h.count,
+                                   'share': h.total / total if total else None}
+                           for phase, h in self._phases.items()},
+            }
+            samples = sum(self._samplePhases.values())
+            if samples:
+                out['samples'] = {'count': samples,
+                                  'phases': {phase: count / samples for phase, count in self._samplePhases.items()}}
+            return out
+
+
+def _samplePhase(code):
+    phase = _sampleFunctions.get(code.co_name)
+    if phase:
+        return phase
+    path = code.co_filename
+    for phase, module in _sampleModules:
+        if os.sep + module + os.sep in path or path.endswith(os.sep + module + '.py'):
+            return phase
+    return None
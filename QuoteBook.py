@@ -0,0 +1,80 @@
+import heapq
+import threading
+import time
+
+
+class QuoteBook(object):
+    """
+    Thread-safe store of live quotes keyed by rfq_id, also reachable by client_rfq_id.
+    Expired quotes are evicted from a heap ordered on their monotonic expiry whenever a new quote is added, so eviction
+    only ever touches stale entries.
+    """
+    def __init__(self):
+        self._quotes = {}
+        self._clientIds = {}
+        self._expiry = []
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def add(self, quote, latest=True):
+        """
+        Stores quote, also as the one pop returns by default unless latest is False.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            self._quotes[quote.rfq_id] = quote
+            if quote.client_rfq_id:
+                self._clientIds[quote.client_rfq_id] = quote.rfq_id
+            heapq.heappush(self._expiry, (quote.expires, quote.rfq_id))
+            if latest:
+                self._latest = quote.rfq_id
+
+    def get(self, rfq_id):
+        """
+        Looks up a quote by rfq_id or client_rfq_id. Returns None if unknown.
+        """
+        with self._lock:
+            return self._quotes.get(self._clientIds.get(rfq_id, rfq_id))
+
+    def pop(self, rfq_id=None):
+        """
+        Removes and returns the quote for rfq_id (or client_rfq_id), or the most recent one if not given.
+        Returns None if there is no such quote.
+        """
+        with self._lock:
+            if rfq_id is None:
+                rfq_id = self._latest
+            quote = self._quotes.pop(self._clientIds.get(rfq_id, rfq_id), None)
+            if quote is not None:
+                self._clientIds.pop(quote.client_rfq_id, None)
+                if quote.rfq_id == self._latest:
+                    self._latest = None
+            return quote
+
+    def evict(self, now=None):
+        """
+        Drops expired quotes, now being a time.monotonic() reading.
+        """
+        with self._lock:
+            self._evict(now or time.monotonic())
+
+    def _evict(self, now):
+        """
+        Drops quotes whose expiry has passed. Heap entries for quotes already traded are simply discarded.
+        Must be called with the lock held.
+        """
+        while self._expiry and self._expiry[0][0] <= now:
+            _, rfq_id = heapq.heappop(self._expiry)
+            quote = self._quotes.get(rfq_id)
+            if quote is None:
+                continue
+            if quote.isLive(now):  # expiry moved since it was indexed
+                heapq.heappush(self._expiry, (quote.expires, rfq_id))
+                continue
+            del self._quotes[rfq_id]
+            self._clientIds.pop(quote.client_rfq_id, None)
+            if rfq_id == self._latest:
+                self._latest = None
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Records import Quote
+from requestConstants import quotePollInterval
+
+
+class QuotePoller(object):
+    """
+    Requests RFQs for a grid of (instrument, side, quantity) every interval seconds on a background thread and keeps
+    the latest quote of each in memory, so current prices are read without touching the network.
+    Quotes also go into the handler's quote book, a consumer can trade one with requestHandler.trade(quote.rfq_id)
+    while it is live, but they never become the quote trade() executes when no rfq_id is given.
+    Subscribers are called with each new quote from the polling threads.
+    """
+    def __init__(self, requestHandler, grid, interval=quotePollInterval, workers=None):
+        self._requestHandler = requestHandler
+        self._grid = [(instrument, side, str(quantity)) for instrument, side, quantity in grid]
+        self._interval = interval
+        self._workers = workers or len(self._grid)
+        self._quotes = {}  # (instrument, side, quantity): (quote, received)
+        self._top = {}  # (instrument, side): key of its latest quote
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _poll(self, key):
+        instrument, side, quantity = key
+        try:
+            data = self._requestHandler.RFQ(instrument, side, quantity, latest=False)
+        except Exception as e:
+            logging.warning('Unable to poll %s %s %s: %s', side, quantity, instrument, e)
+            self._requestHandler.increment('quote_poll_error')
+            return
+        quote = data if isinstance(data, Quote) else Quote.fromResponse(data)
+        with self._lock:
+            self._quotes[key] = (quote, time.monotonic())
+            self._top[(instrument, side)] = key
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(quote)
+            except Exception as e:
+                logging.error('Quote subscriber %s failed: %s', callback, e)
+
+    def pollOnce(self, executor=None):
+        """
+        Requests one quote for every grid entry, concurrently.
+        """
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='QuotePoller') as executor:
+                return self.pollOnce(executor)
+        for future in [executor.submit(self._poll, key) for key in self._grid]:
+            future.result()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='QuotePoller') as executor:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                self.pollOnce(executor)
+                self._stop.wait(max(0.0, self._interval - (time.monotonic() - start)))
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='QuotePoller', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def latest(self, instrument, side, quantity=None):
+        """
+        Latest quote for instrument and side (of that quantity if given, else of any quantity in the grid), None if
+        none was received yet. It may have expired, see Quote.isLive.
+        """
+        key = (instrument, side, str(quantity)) if quantity is not None else self._top.get((instrument, side))
+        entry = self._quotes.get(key)
+        return entry[0] if entry else None
+
+    def book(self):
+        """
+        Top of book per (instrument, side): latest price, valid_until, seconds since it was received and whether it
+        is still live.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = {top: self._quotes[key] for top, key in self._top.items()}
+        return {top: {'price': quote.price, 'quantity': quote.quantity, 'valid_until': quote.valid_until,
+                      'rfq_id': quote.rfq_id, 'age': now - received, 'live': quote.isLive(now)}
+                for top, (quote, received) in entries.items()}
+
+    def subscribe(self, callback):
+        """
+        Calls callback(quote) on every new quote. Returns a function that unsubscribes it.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    async def updates(self, maxsize=1000):
+        """
+        Async iterator over new quotes. If the consumer falls more than maxsize quotes behind, the oldest are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize)
+
+        def put(quote):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(quote)
+
+        unsubscribe = self.subscribe(lambda quote: loop.call_soon_threadsafe(put, quote))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            unsubscribe()
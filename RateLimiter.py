@@ -0,0 +1,122 @@
+import threading
+import time
+
+from requestConstants import (
+    concurrencyLimits,
+    endpointClasses,
+    rateLimits
+)
+
+# statuses telling us the API is overloaded
+_overloaded = (408, 429, 500, 503)
+
+
+def endpointClass(request):
+    return endpointClasses.get(request, 'reads')
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket allowing rate requests per second with bursts of up to burst requests.
+    """
+    def __init__(self, rate, burst):
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Takes a token, sleeping until one is available.
+        """
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter(object):
+    """
+    AIMD concurrency limit shared by all endpoint classes.
+    Each success adds 1 / limit (about one more slot per round trip of requests), an overloaded response or a latency
+    spike (spikeFactor times the smoothed latency) halves it, at most once per decreaseInterval seconds.
+    When the limit is reached, waiting requests are admitted by priority (lowest first).
+    """
+    def __init__(self, initial, minimum, maximum, spikeFactor=3.0, decreaseInterval=1.0):
+        self.limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._spikeFactor = spikeFactor
+        self._decreaseInterval = decreaseInterval
+        self._lastDecrease = 0.0
+        self._latency = None
+        self._inflight = 0
+        self._waiting = {}
+        self._condition = threading.Condition()
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    def _admissible(self, priority):
+        return self._inflight < int(self.limit) and not any(
+            count for p, count in self._waiting.items() if p < priority)
+
+    def acquire(self, priority):
+        with self._condition:
+            if not self._admissible(priority):
+                self._waiting[priority] = self._waiting.get(priority, 0) + 1
+                try:
+                    self._condition.wait_for(lambda: self._admissible(priority))
+                finally:
+                    self._waiting[priority] -= 1
+            self._inflight += 1
+
+    def release(self, status, latency):
+        """
+        Frees a slot and adapts the limit to the outcome: status is the HTTP status (None if the request failed to
+        complete) and latency its round trip in seconds.
+        """
+        with self._condition:
+            self._inflight -= 1
+            spike = latency is not None and self._latency is not None and \
+                latency > self._spikeFactor * self._latency
+            if status is None or status in _overloaded or spike:
+                now = time.monotonic()
+                if now - self._lastDecrease >= self._decreaseInterval:
+                    self.limit = max(self._minimum, self.limit / 2)
+                    self._lastDecrease = now
+            else:
+                self.limit = min(self._maximum, self.limit + 1 / self.limit)
+            if latency is not None and not spike:
+                self._latency = latency if self._latency is None else 0.9 * self._latency + 0.1 * latency
+            self._condition.notify_all()
+
+
+class RequestLimiter(object):
+    """
+    Client side rate limiting for the request layer: a token bucket per endpoint class (quotes, orders, reads) and an
+    adaptive concurrency limit giving orders priority over quotes and quotes over reads.
+    """
+    _priorities = {'orders': 0, 'quotes': 1, 'reads': 2}
+
+    def __init__(self, limits=rateLimits, concurrency=concurrencyLimits):
+        self._buckets = {cls: TokenBucket(rate, burst) for cls, (rate, burst) in limits.items()}
+        self.concurrency = AdaptiveLimiter(*concurrency)
+
+    def acquire(self, request):
+        cls = endpointClass(request)
+        self._buckets[cls].acquire()
+        self.concurrency.acquire(self._priorities[cls])
+
+    def release(self, request, status, latency):
+        self.concurrency.release(status, latency)
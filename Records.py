@@ -0,0 +1,139 @@
+import datetime
+import time
+
+from Decoding import (
+    parseTimestamp,
+    toDecimal
+)
+
+_epoch = datetime.datetime(1970, 1, 1)
+
+
+class _Record(object):
+    """
+    Base of the typed records returned instead of dicts. Prices and quantities are Decimal.
+    Fields can also be read as record['field'] so code written against the raw responses keeps working.
+    Records compare and hash by value over their fields, so they must not be changed once in a set or dict.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __hash__(self):
+        return hash((type(self),) + tuple(getattr(self, f) for f in self.__slots__))
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % (f, getattr(self, f)) for f in self.__slots__))
+
+    def asDict(self):
+        return {f: getattr(self, f) for f in self.__slots__}
+
+
+class Quote(_Record):
+    """
+    RFQ as returned by /request_for_quote/.
+    expires is valid_until on the time.monotonic() clock, so expiry checks neither build datetimes nor move with
+    wall clock adjustments.
+    """
+    __slots__ = ('rfq_id', 'client_rfq_id', 'instrument', 'side', 'quantity', 'price', 'valid_until',
+                 'valid_until_dateTime', 'expires')
+
+    def __init__(self, rfq_id, client_rfq_id, instrument, side, quantity, price, valid_until):
+        self.rfq_id = rfq_id
+        self.client_rfq_id = client_rfq_id
+        self.instrument = instrument
+        self.side = side
+        self.quantity = toDecimal(quantity)
+        self.price = toDecimal(price)
+        self.valid_until = valid_until
+        self.valid_until_dateTime = parseTimestamp(valid_until)
+        self.expires = time.monotonic() + (self.valid_until_dateTime - _epoch).total_seconds() - time.time()
+
+    @classmethod
+    def fromResponse(cls, data):
+        return cls(data['rfq_id'], data.get('client_rfq_id'), data['instrument'], data['side'], data['quantity'],
+                   data['price'], data['valid_until'])
+
+    def remaining(self, now=None):
+        """
+        Seconds until the quote expires, now being a time.monotonic() reading.
+        """
+        return self.expires - (now or time.monotonic())
+
+    def isLive(self, now=None):
+        return (now or time.monotonic()) < self.expires
+
+
+class Trade(_Record):
+    """
+    Executed trade as returned by /trade/ or within an order.
+    """
+    __slots__ = ('trade_id', 'instrument', 'side', 'quantity', 'price', 'created', 'rfq_id', 'order', 'origin',
+                 'executing_unit')
+
+    def __init__(self, trade_id, instrument, side, quantity, price, created, rfq_id=None, order=None, origin=None,
+                 executing_unit=None):
+        self.trade_id = trade_id
+        self.instrument = instrument
+        self.side = side
+        self.quantity = toDecimal(quantity)
+        self.price = toDecimal(price)
+        self.created = created
+        self.rfq_id = None if rfq_id == 'null' else rfq_id
+        self.order = None if order == 'null' else order
+        self.origin = origin
+        self.executing_unit = executing_unit
+
+    @classmethod
+    def fromResponse(cls, data):
+        return cls(data['trade_id'], data['instrument'], data['side'], data['quantity'], data['price'],
+                   data['created'], data.get('rfq_id'), data.get('order'), data.get('origin'),
+                   data.get('executing_unit'))
+
+
+class Order(_Record):
+    """
+    Order as returned by /order/. executed_price is None if the order did not execute.
+    """
+    __slots__ = ('order_id', 'client_order_id', 'instrument', 'side', 'quantity', 'price', 'executed_price',
+                 'created', 'trades')
+
+    def __init__(self, order_id, client_order_id, instrument, side, quantity, price, executed_price, created,
+                 trades=()):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.instrument = instrument
+        self.side = side
+        self.quantity = toDecimal(quantity)
+        self.price = toDecimal(price)
+        self.executed_price = toDecimal(executed_price)
+        self.created = created
+        self.trades = tuple(trades)
+
+    @classmethod
+    def fromResponse(cls, data):
+        return cls(data['order_id'], data['client_order_id'], data['instrument'], data['side'], data['quantity'],
+                   data['price'], data.get('executed_price'), data.get('created'),
+                   [Trade.fromResponse(t) for t in data.get('trades') or ()])
+
+
+class Balance(_Record):
+    """
+    Balance of one currency as returned by /balance/.
+    """
+    __slots__ = ('currency', 'amount')
+
+    def __init__(self, currency, amount):
+        self.currency = currency
+        self.amount = toDecimal(amount)
+
+    @classmethod
+    def fromResponse(cls, data):
+        return {ccy: cls(ccy, amount) for ccy, amount in data.items()}
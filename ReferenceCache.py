@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from Decoding import toDecimal
+from requestConstants import referenceTTLs
+
+
+def _instrumentNames(data):
+    return frozenset(n['name'] for n in data)
+
+
+def _minimumTradeSizes(data):
+    return {ccy: toDecimal(c['minimum_trade_size']) for ccy, c in data.items() if 'minimum_trade_size' in c}
+
+
+# lookups derived once per refresh rather than on every call
+_derived = {
+    '/instruments/': _instrumentNames,
+    '/currency/': _minimumTradeSizes,
+}
+
+
+class ReferenceCache(object):
+    """
+    TTL cache for slow moving reference data (instruments, currencies and account info).
+    fetch is the callable used to hit the API, normally RequestHandler._requestHandler.
+    Once the background refresher is started, entries are refreshed ahead of their TTL and stale entries keep being
+    served meanwhile, so callers only ever block on the very first fetch of an endpoint.
+    """
+    def __init__(self, fetch, ttls=referenceTTLs, snapshotPath=None):
+        self._fetch = fetch
+        self._ttls = ttls
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {request: {'hits': 0, 'misses': 0, 'refreshes': 0, 'lastRefreshSeconds': None,
+                                 'totalRefreshSeconds': 0.0} for request in ttls}
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshotPath = snapshotPath
+        self._pairs = {}
+        if snapshotPath and os.path.exists(snapshotPath):
+            self.load(snapshotPath)
+
+    def get(self, request):
+        """
+        Returns the raw API response for request, fetching it if missing or expired.
+        """
+        return self._entry(request)[0]
+
+    def derived(self, request):
+        """
+        Returns the lookup derived from request's response (e.g. set of instrument names).
+        """
+        return self._entry(request)[1]
+
+    def _entry(self, request):
+        entry = self._entries.get(request)
+        if entry is not None and (self._thread is not None or time.monotonic() - entry[2] < self._ttls[request]):
+            self._stats[request]['hits'] += 1
+            return entry
+        self._stats[request]['misses'] += 1
+        return self.refresh(request)
+
+    def refresh(self, request):
+        """
+        Fetches request from the API and stores it along with its derived lookup.
+        """
+        logging.info('Fetching %s...', request)
+        start = time.perf_counter()
+        data = self._fetch(request)
+        elapsed = time.perf_counter() - start
+        entry = (data, _derived[request](data) if request in _derived else None, time.monotonic())
+        with self._lock:
+            self._entries[request] = entry
+            stats = self._stats[request]
+            stats['refreshes'] += 1
+            stats['lastRefreshSeconds'] = elapsed
+            stats['totalRefreshSeconds'] += elapsed
+        return entry
+
+    def instruments(self):
+        return self.derived('/instruments/')
+
+    def minimumTradeSize(self, ccy):
+        """
+        Minimum trade size for ccy, None if the currency is unknown.
+        """
+        return self.derived('/currency/').get(ccy)
+
+    def pair(self, instrument):
+        """
+        Splits an instrument such as BTCUSD.SPOT into its (base, counter) currencies using the known currencies.
+        """
+        pair = self._pairs.get(instrument)
+        if pair is None:
+            name = instrument.split('.')[0]
+            currencies = self.get('/currency/')
+            pair = next(((name[:i], name[i:]) for i in range(1, len(name))
+                         if name[:i] in currencies and name[i:] in currencies), (name[:3], name[3:]))
+            self._pairs[instrument] = pair
+        return pair
+
+    def stats(self):
+        with self._lock:
+            return {request: dict(stats) for request, stats in self._stats.items()}
+
+    def start(self, interval=1.0, refreshAhead=0.8):
+        """
+        Starts the background refresher. Every interval seconds it refreshes each endpoint that has used up
+        refreshAhead of its TTL.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, refreshAhead), name='ReferenceCache',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background refresher if it runs and writes the snapshot when there is a snapshotPath, whether or not
+        the refresher was started.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self._snapshotPath and self._entries:
+            self.save(self._snapshotPath)
+
+    def _run(self, interval, refreshAhead):
+        while not self._stop.is_set():
+            for request, ttl in self._ttls.items():
+                entry = self._entries.get(request)
+                if entry is None or time.monotonic() - entry[2] >= ttl * refreshAhead:
+                    try:
+                        self.refresh(request)
+                    except Exception as e:
+                        logging.warning('Unable to refresh %s: %s', request, e)
+            self._stop.wait(interval)
+
+    def snapshot(self, requests=None):
+        """
+        Cached responses (of requests only if given) in the form restore takes.
+        """
+        with self._lock:
+            return {'saved': time.time(), 'data': {request: entry[0] for request, entry in self._entries.items()
+                                                   if requests is None or request in requests}}
+
+    def restore(self, snapshot):
+        """
+        Loads a snapshot taken by snapshot or save. Entries keep their age so expired ones are refreshed as usual.
+        """
+        fetched = time.monotonic() - max(time.time() - snapshot['saved'], 0)
+        with self._lock:
+            for request, data in snapshot['data'].items():
+                if request in self._ttls:
+                    self._entries[request] = (data, _derived[request](data) if request in _derived else None,
+                                              fetched)
+
+    def save(self, path):
+        """
+        Writes the cached responses to path so the next start can skip fetching them.
+        """
+        snapshot = self.snapshot()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """
+        Loads a snapshot written by save.
+        """
+        with open(path) as f:
+            self.restore(json.load(f))
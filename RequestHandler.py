@@ -1,208 +1,555 @@
 import datetime
 import logging
 import requests
-import uuid
+import secrets
+import time
 
 from requestConstants import (
     apiToken,
     baseAPI,
     errors,
-    APIError
+    minLatencySamples,
+    poolSize,
+    readRetries,
+    retryBackoff,
+    APIError,
+    APIErrors,
+    CircuitOpenError
 )
+from CircuitBreaker import CircuitBreaker
+from ReferenceCache import ReferenceCache
+from RiskEngine import RiskEngine
+from jsonStream import iterArray
+from Metrics import Metrics
+from PositionLedger import PositionLedger
+from Profiler import (
+    Profiler,
+    phased,
+    profiled
+)
+from RateLimiter import RequestLimiter
+from Decoding import (
+    decode,
+    toDecimal
+)
+from QuoteBook import QuoteBook
+from Records import (
+    Balance,
+    Order,
+    Quote,
+    Trade
+)
+from RequestJournal import RequestJournal
+from Transport import Transport
+
+# statuses worth retrying a GET for
+_retriable = (408, 500, 503)
+
+# API errors telling us the position ledger is out of line with the account
+_balanceCodes = (1011, 1012, 1013)
+
+_sides = frozenset(('buy', 'sell'))
+
+# fields every order shares, copied rather than rebuilt for each trade
+_orderTemplate = {
+    'order_type': 'FOK',
+    'acceptable_slippage_in_basis_points': '0.00',
+}
+
+
+def _clientId():
+    """
+    Random version 4 UUID string for client_rfq_id and client_order_id, formatted directly rather than through
+    uuid.UUID. The bits come from the OS (secrets), so ids are unpredictable and do not collide across processes.
+    """
+    h = '%032x' % (secrets.randbits(128) & ~(0xf000 << 64) & ~(0xc << 60) | (0x4000 << 64) | (0x8 << 60))
+    return '%s-%s-%s-%s-%s' % (h[:8], h[8:12], h[12:16], h[16:20], h[20:])
 
 
 class RequestHandler(object):
-    def __init__(self):
+    def __init__(self, baseURL=baseAPI, poolSize=poolSize, prewarm=False, refresh=False, snapshotPath=None,
+                 riskChecks=False, journalPath=None, rateLimit=False, typed=False, orderJournalPath=None,
+                 apiToken=apiToken, referenceSnapshot=None):
+        if not apiToken:
+            logging.warning("'apiToken' missing, set API_TOKEN or pass apiToken. Requests will be unauthorized.")
         self._headers = {'Authorization': 'Token %s' % apiToken}
-        self._instrument = None
-        self._side = None
-        self._quantity = None
-        self._price = None
-        self._valid_until = None
-        self._valid_until_dateTime = None
-        self._tradableInstruments = []
+        self._transport = Transport(self._headers, baseURL=baseURL, poolSize=poolSize, prewarm=prewarm)
+        self._journal = RequestJournal(journalPath) if journalPath else None
+        self._limiter = RequestLimiter() if rateLimit else None
+        self._metrics = Metrics()
+        self._profiler = Profiler()
+        self._quotes = QuoteBook()
+        self._referenceData = ReferenceCache(self._requestHandler, snapshotPath=snapshotPath)
+        if referenceSnapshot:
+            self._referenceData.restore(referenceSnapshot)
+        self._ledger = PositionLedger(lambda: self._requestHandler('/balance/'), self._referenceData.pair,
+                                      metrics=self._metrics)
+        if refresh:
+            self._referenceData.start()
+            self._ledger.start()
+        self._risk = RiskEngine(self._referenceData, self._ledger) if riskChecks else None
+        self._typed = typed
+        self._breakers = {}
         self._trades = []
+        self._orders = None
+        if orderJournalPath:
+            from OrderJournal import OrderJournal  # sqlite3 is only imported when journaling orders
+            self._orders = OrderJournal(orderJournalPath)
+            self._trades = [o['client_order_id'] for o in self._orders.orders('filled')]
+            if self._orders.unresolved():
+                try:
+                    self.reconcileOrders()
+                except Exception as e:
+                    logging.warning('Unable to reconcile orders on startup: %s', e)
 
     @staticmethod
-    def _isFloat(string):
+    def _errorCode(response):
         """
-        Checks if string is float
+        API errors come back as a 400 with their code in the body, anything else is identified by its HTTP status.
         """
-        try:
-            float(string)
-            return True
-        except ValueError:
-            return False
+        if response.status_code == 400:
+            try:
+                code = decode(response)['errors'][0]['code']
+                if isinstance(code, int):
+                    return code
+            except (ValueError, KeyError, IndexError, TypeError):
+                pass
+        return response.status_code
 
-    def _requestHandler(self, request, post_data=None):
+    def _send(self, request, post_data=None, stream=False):
+        """
+        Sends the request, through the rate limiter when enabled, retrying GETs the API was too busy to serve.
+        Orders and RFQs are never retried. Returns the response and its round trip in ns.
+        """
+        for attempt in range(readRetries + 1):
+            if attempt:
+                logging.info('Retrying %s after error code %s', request, response.status_code)
+                self._metrics.increment('retry')
+                time.sleep(retryBackoff * 2 ** (attempt - 1))
+            response = None
+            if self._limiter:
+                self._limiter.acquire(request)
+            start = time.perf_counter_ns()
+            try:
+                if post_data:
+                    response = self._transport.post(request, post_data)
+                else:
+                    response = self._transport.get(request, stream=stream)
+            finally:
+                latency = time.perf_counter_ns() - start
+                if self._limiter:
+                    self._limiter.release(request, response.status_code if response is not None else None,
+                                          latency / 1e9)
+            if post_data or response.status_code not in _retriable:
+                break
+            if stream:
+                response.close()
+        return response, latency
+
+    @profiled
+    def _requestHandler(self, request, post_data=None, stream=False):
         """
         Generic request handler to deal with most frequent connection and HTTP errors.
         All other errors would be caught by generic error handler
+        With stream the response is returned unread instead of its decoded json, caller has to close it.
+        Every request is written to the request journal when one is configured.
         """
+        sent = time.time()
+        latency = response = data = error = None
         try:
-            url = baseAPI + request
-            logging.info('url = ' + url)
+            logging.info('url = %s%s', self._transport.baseURL, request)
             if post_data:
-                logging.info('post_data = {post_data}'.format(post_data=post_data))
-                response = requests.post(url, json=post_data, headers=self._headers)
-            else:
-                response = requests.get(url, headers=self._headers)
-            if response.status_code in errors:
-                logging.info(
-                    'Error code {c}: {e}'.format(c=response.status_code, e=errors[response.status_code]))
-                if 400 >= response.status_code < 500:
-                    raise requests.exceptions.HTTPError
-                elif 500 >= response.status_code < 1000:
-                    raise requests.exceptions.ConnectionError
-                else:
-                    raise APIError
+                logging.info('post_data = %s', post_data)
+            breaker = self._breakers.get(request) or self._breakers.setdefault(
+                request, CircuitBreaker(request, metrics=self._metrics))
+            breaker.before()
+            try:
+                with self._profiler.phase('network'):
+                    response, latency = self._send(request, post_data, stream)
+            except Exception as e:
+                breaker.record(None)
+                raise e
+            self._metrics.observe(request, latency)
+            code = self._errorCode(response)
+            breaker.record(code)
+            if code in errors:
+                if stream:
+                    response.close()  # unread, so its pooled connection would never be released
+                logging.info('Error code %s: %s', code, errors[code])
+                self._metrics.increment('api_error_%d' % code)
+                if code in _balanceCodes:
+                    self._ledger.invalidate()
+                raise APIErrors[code](code, errors[code])
             else:
                 # response.raise_for_status()
-                return response.json()
+                if stream:
+                    return response
+                with self._profiler.phase('decode'):
+                    data = decode(response)
+                return data
         except Exception as e:
+            error = e
             raise e
+        finally:
+            if self._journal:
+                self._journal.record({
+                    'ts': sent,
+                    'method': 'POST' if post_data else 'GET',
+                    'endpoint': request,
+                    'payload': post_data,
+                    'status': response.status_code if response is not None else None,
+                    'latency_ns': latency,
+                    'client_rfq_id': post_data.get('client_rfq_id') if post_data else None,
+                    'client_order_id': post_data.get('client_order_id') if post_data else None,
+                    'response': None if stream else data,
+                    'error': repr(error) if error else None,
+                })
+
+    def getReferenceStats(self):
+        """
+        Returns hit, miss and refresh latency stats of the reference data cache.
+        """
+        return self._referenceData.stats()
 
-    def getBalances(self, ccy=None):
+    def getReferenceSnapshot(self, requests):
+        """
+        Returns the reference data of requests (e.g. '/instruments/'), fetched if not cached yet, in the form the
+        referenceSnapshot argument takes.
         """
-        Fetches balances from 
-        ccy is optional should
+        for request in requests:
+            self._referenceData.get(request)
+        return self._referenceData.snapshot(requests)
+
+    def close(self):
+        """
+        Stops the reference data refresher and ledger reconciliation, flushes the request and order journals and closes
+        pooled connections.
+        """
+        self._referenceData.stop()
+        self._ledger.stop()
+        self._profiler.unwatch()
+        self._profiler.disable()
+        if self._orders:
+            self._orders.close()
+        self._metrics.close()
+        if self._journal:
+            self._journal.close()
+        self._transport.close()
+
+    def enableProfiling(self, sampling=False, interval=0.005, path=None):
+        """
+        Starts profiling this handler at runtime: time per public method and in network, decode, validation and logging.
+        sampling also samples every thread's stack each interval seconds, written to path in collapsed stack format
+        (flame graph input) when profiling is disabled. See Profiler.
+        """
+        self._profiler.enable(sampling, interval, path)
+
+    def disableProfiling(self):
+        """
+        Stops profiling and returns the session summary.
+        """
+        return self._profiler.disable()
+
+    def isProfiling(self):
+        """
+        Whether a profiling session is running.
+        """
+        return self._profiler.enabled
+
+    def profilingSignalHandler(self):
+        """
+        Returns a signal handler starting or stopping sampled profiling, e.g.
+        signal.signal(signal.SIGUSR1, rH.profilingSignalHandler()). The handler only flags the request, a thread
+        started here carries it out until close, see Profiler.requestToggle.
+        """
+        self._profiler.watch()
+        return self._profiler.requestToggle
+
+    def getProfile(self):
+        """
+        Returns the summary of the current or last profiling session.
+        """
+        return self._profiler.summary()
+
+    def increment(self, name, count=1):
+        """
+        Adds count to the metrics counter name, for components built on the handler.
+        """
+        self._metrics.increment(name, count)
+
+    def getQuote(self, rfq_id):
+        """
+        Returns the quote for rfq_id (or client_rfq_id) from the quote book as a Quote record, None if it is unknown or
+        was traded.
+        """
+        return self._quotes.get(rfq_id)
+
+    def discardQuote(self, rfq_id):
+        """
+        Removes the quote for rfq_id (or client_rfq_id) from the quote book without trading it. Returns the quote, None
+        if there was none.
+        """
+        if rfq_id is None:
+            return None
+        return self._quotes.pop(rfq_id)
+
+    def validate(self, instrument, side, quantity):
+        """
+        Checks an order before it is quoted, as RFQ does: raises ValueError if instrument, side or quantity is invalid,
+        or APIError if pre-trade risk checks are enabled and would fail.
+        """
+        return self._isValid(instrument, side, quantity)
+
+    def getMetrics(self):
+        """
+        Returns latency histograms per endpoint, time left on quotes at order submission and event counters.
+        """
+        return self._metrics.snapshot()
+
+    def serveMetrics(self, port=9100):
+        """
+        Exposes metrics in Prometheus text format on http://127.0.0.1:port/metrics.
+        """
+        return self._metrics.serve(port)
+
+    def getConnectionStats(self):
+        """
+        Returns counts of new and reused keep-alive connections.
+        """
+        return self._transport.stats()
+
+    @profiled
+    def getBalances(self, ccy=None, refresh=False):
+        """
+        Returns balances, served from the position ledger which is updated from our own fills and reconciled with
+        /balance/ periodically, see PositionLedger.
+        ccy is optional, returns the balance of that currency only (None if there is none) in O(1).
+        refresh reconciles with /balance/ first.
         """
         try:
-            data = self._requestHandler('/balance/')
+            if refresh:
+                self._ledger.reconcile()
             if ccy:
-                return {ccy: data[ccy]} if ccy in data else None
-            else:
-                return data
+                amount = self._ledger.balance(ccy, None)
+                if amount is None:
+                    return None
+                return {ccy: Balance(ccy, amount) if self._typed else '{:f}'.format(amount)}
+            balances = self._ledger.balances()
+            if self._typed:
+                return {ccy: Balance(ccy, amount) for ccy, amount in balances.items()}
+            return {ccy: '{:f}'.format(amount) for ccy, amount in balances.items()}
         except Exception as e:
             raise e
 
-    def RFQ(self, instrument, side, quantity):
+    @profiled
+    def getRiskExposure(self):
         """
-        Calls RFQ and stored data within class to enable faster trading
+        Risk exposure in USD, i.e. the sum of negative balances valued at the latest quoted prices, from the position
+        ledger. None if a negative balance was not quoted against USD yet.
+        """
+        return self._ledger.exposure()
+
+    @profiled
+    def RFQ(self, instrument, side, quantity, latest=True):
+        """
+        Calls RFQ and stores the quote in the quote book to enable faster trading
+        With latest False the quote is not the one trade() executes by default, e.g. for quotes polled in the
+        background. Returns the response, or a Quote record when the handler is typed.
         """
         if self._isValid(instrument, side, quantity):
             post_data = {
                 'instrument': instrument,
                 'side': side,
                 'quantity': quantity,
-                'client_rfq_id': str(uuid.uuid4())
+                'client_rfq_id': _clientId()
             }
             try:
                 logging.info('Requesting RFQ...')
                 data = self._requestHandler('/request_for_quote/', post_data=post_data)
-                logging.info(' RFQ received {data}'.format(data=data))
-                self._instrument = data["instrument"]
-                self._side = data["side"]
-                self._quantity = data["quantity"]
-                self._price = data["price"]
-                self._valid_until = data["valid_until"]
-                self._valid_until_dateTime = datetime.datetime.strptime(data["valid_until"], '%Y-%m-%dT%H:%M:%S.%fZ')
-                return data
+                logging.info(' RFQ received %s', data)
+                quote = Quote.fromResponse(data)
+                self._quotes.add(quote, latest)
+                self._ledger.onQuote(quote)
+                return quote if self._typed else data
             except Exception as e:
                 raise e
 
-    def trade(self):
-        """
-        Executes the trade based on what is stored in class.
-        """
-        post_data = {
-            'instrument': self._instrument,
-            'side': self._side,
-            'quantity': self._quantity,
-            'client_order_id': str(uuid.uuid4()),
-            'price': self._price,
-            'order_type': 'FOK',
-            'valid_until': self._valid_until,
-            'acceptable_slippage_in_basis_points': '0.00',
-        }
-        if datetime.datetime.utcnow() < self._valid_until_dateTime:  # assuming 1 sec delay and UTC.
+    @profiled
+    def trade(self, rfq_id=None):
+        """
+        Executes the trade for a live quote in the quote book.
+        rfq_id may be either the rfq_id or client_rfq_id of the quote, defaults to the latest RFQ.
+        The quote is removed from the book whatever the outcome.
+        With an order journal, an order that failed without an answer from the API (e.g. timed out) is journaled as
+        unknown and can be settled with retryOrder(client_order_id) rather than traded again.
+        """
+        quote = self._quotes.pop(rfq_id)
+        if quote is None:
+            logging.error('Unable to trade as RFQ %s is unknown or already traded.', rfq_id)
+            return
+        remaining = quote.remaining()
+        if remaining > self.orderMargin().total_seconds():  # less the time the order needs to reach the API.
+            post_data = _orderTemplate.copy()
+            post_data['instrument'] = quote.instrument
+            post_data['side'] = quote.side
+            post_data['quantity'] = str(quote.quantity)
+            post_data['client_order_id'] = _clientId()
+            post_data['price'] = str(quote.price)
+            post_data['valid_until'] = quote.valid_until
             try:
+                if self._risk:
+                    with self._profiler.phase('validation'):
+                        self._risk.checkOrder(quote)
                 logging.info('Instructing trade...')
-                data = self._requestHandler('/order/', post_data=post_data)
-                logging.info(' Trade received {data}'.format(data=data))
+                self._metrics.quoteRemaining.record(remaining * 1e9)
+                data = self._sendOrder(post_data, quote.rfq_id)
+                logging.info(' Trade received %s', data)
                 if data['executed_price'] != 'null':
                     self._trades.append(data['client_order_id'])
-                    return data
+                    self._ledger.apply(data)
+                    return Order.fromResponse(data) if self._typed else data
                 else:
                     logging.error('Trade failed to execute. Please try again with RFQ.')
-                self._reset()  # reset RFQ specific values stored in class
             except Exception as e:
-                self._reset()
                 raise e
         else:
-            self._reset()
+            self._metrics.increment('rfq_out_of_date')
             logging.error('Unable to trade as RFQ is out of date.')
 
+    def _sendOrder(self, post_data, rfq_id):
+        """
+        Sends an order, journaled first when an order journal is configured so its outcome can be found after a crash.
+        """
+        if self._orders is None:
+            return self._requestHandler('/order/', post_data=post_data)
+        clientOrderId = post_data['client_order_id']
+        self._orders.intent(post_data, rfq_id)
+        try:
+            data = self._requestHandler('/order/', post_data=post_data)
+        except APIError as e:
+            # the API refused the order, unless it failed with a server error which may have come after it executed
+            serverError = e.code is not None and 500 <= e.code < 1000
+            self._orders.outcome(clientOrderId, 'unknown' if serverError else 'rejected')
+            raise e
+        except Exception as e:
+            self._orders.outcome(clientOrderId, 'unknown')
+            raise e
+        if data['executed_price'] != 'null':
+            self._orders.outcome(clientOrderId, 'filled', data['order_id'], data['executed_price'])
+        else:
+            self._orders.outcome(clientOrderId, 'rejected')
+        return data
+
+    @profiled
+    def reconcileOrders(self, trades=None):
+        """
+        Settles journaled orders with an unknown outcome against /trade/ (or trades already fetched from it), see
+        OrderJournal.reconcile. Returns the number of orders settled.
+        """
+        settled = self._orders.reconcile(self.iterTrades() if trades is None else trades)
+        if settled:
+            self._trades = [o['client_order_id'] for o in self._orders.orders('filled')]
+            self._ledger.invalidate()
+        return settled
+
+    @profiled
+    def retryOrder(self, client_order_id):
+        """
+        Settles an order whose outcome is unknown: checks /trade/ first, then sends it again with the same
+        client_order_id while its quote is still live. It is not sent again if any trade could be its execution, even
+        without its rfq_id (see OrderJournal.mayHaveTraded), it is left unknown instead.
+        Returns the journaled order once filled, None otherwise. Needs an order journal.
+        """
+        order = self._orders.get(client_order_id)
+        if order is None:
+            raise ValueError('Order ' + client_order_id + ' is not in the order journal.')
+        if order['state'] in ('pending', 'unknown'):
+            trades = list(self.iterTrades())
+            self.reconcileOrders(trades)
+            order = self._orders.get(client_order_id)
+            if order['state'] in ('pending', 'unknown') and self._orders.mayHaveTraded(order, trades):
+                logging.warning('Order %s not retried as a trade may be its execution.', client_order_id)
+                return None
+        if order['state'] in ('pending', 'unknown'):
+            logging.info('Retrying order %s...', client_order_id)
+            data = self._sendOrder(order['payload'], order['rfq_id'])
+            if data['executed_price'] != 'null':
+                self._trades.append(client_order_id)
+                self._ledger.apply(data)
+            order = self._orders.get(client_order_id)
+        return order if order['state'] == 'filled' else None
+
+    def orderMargin(self):
+        """
+        Time an order needs to reach the API, taken as the p99 /order/ round trip measured so far.
+        Zero until minLatencySamples orders have been sent.
+        """
+        latency = self._metrics.latency('/order/')
+        if latency.count < minLatencySamples:
+            return datetime.timedelta(0)
+        return datetime.timedelta(microseconds=latency.percentile(0.99) / 1000)
+
+    @phased('validation')
     def _isValid(self, instrument, side, quantity):
         """
         Checks the validity of instrument, side and quantity.
-        Throws ValueError if they are invalid.
+        Throws ValueError if they are invalid, or APIError if pre-trade risk checks are enabled and would fail.
         Note: checks one at a time for better error handling
         """
         out = True
         if instrument not in self._getInstruments():
             raise ValueError('Invalid instrument ' + instrument + '. Please check if instrument is tradable by '
                                                                   'calling _getInstruments.')
-        if side not in ['buy', 'sell']:
+        if side not in _sides:
             raise ValueError("Invalid side " + side + ". 'buy' or 'sell' are the only allowable side.")
-        if not self._isFloat(quantity) or float(quantity) < 0:
+        decimalQuantity = toDecimal(quantity)
+        if decimalQuantity is None or decimalQuantity < 0:
             raise ValueError('Invalid quantity ' + str(quantity) + ". Quantity must be numeric and greater than zero.")
+        if self._risk:
+            self._risk.check(instrument, side, quantity)
         return out
 
     def _getInstruments(self):
         """
-        Fetches list of tradable instruments.
-        Reuses if already fetched.
+        Returns the set of tradable instruments.
+        Served from the reference data cache.
         """
-        if len(self._tradableInstruments) == 0:
-            try:
-                logging.info('Fetching instruments...')
-                data = self._requestHandler('/instruments/')
-                logging.info(' instruments received {data}'.format(data=data))
-                self._tradableInstruments = [n['name'] for n in data]
-            except Exception as e:
-                raise e
-        return self._tradableInstruments
-
-    def _reset(self):
-        """
-        Resets stored values, ready for next RFQ
-        This may not be needed unless running in loop
-        """
-        self._instrument = None
-        self._side = None
-        self._quantity = None
-        self._price = None
-        self._valid_until = None
-        self._valid_until_dateTime = None
+        return self._referenceData.instruments()
 
+    @profiled
     def getAccountInfo(self):
         """
         Fetches account information related to trading: current risk exposure, maximum risk exposure and
         maximum quantity allowed per trade.
-        Note that the risk exposure can be computed by doing the sum of all of the negative balances in USD.
+        Note that the risk exposure can be computed by doing the sum of all of the negative balances in USD, which
+        getRiskExposure does from the position ledger.
+        Served from the reference data cache, so may be up to referenceTTLs['/account_info/'] seconds old.
         """
         try:
-            logging.info('Fetching account_info...')
-            data = self._requestHandler('/account_info/')
-            logging.info(' account_info received {data}'.format(data=data))
-            return data
+            return self._referenceData.get('/account_info/')
         except Exception as e:
             raise e
 
+    @profiled
     def getCurrencies(self):
         """
         Fetches all currencies supported by  and the minimum trade sizes.
         Note that “long_only” means that your balance in this currency cannot be negative.
+        Served from the reference data cache.
         """
         try:
-            logging.info('Fetching currency...')
-            data = self._requestHandler('/currency/')
-            logging.info(' currency received {data}'.format(data=data))
-            return data
+            return self._referenceData.get('/currency/')
         except Exception as e:
             raise e
 
+    def getPair(self, instrument):
+        """
+        Splits an instrument such as BTCUSD.SPOT into its (base, counter) currencies.
+        Served from the reference data cache.
+        """
+        return self._referenceData.pair(instrument)
+
+    @profiled
     def getAllTrades(self):
         """
         Fetches all your executed trades.
@@ -210,7 +557,21 @@ class RequestHandler(object):
         try:
             logging.info('Fetching trade...')
             data = self._requestHandler('/trade/')
-            logging.info(' trade received {data}'.format(data=data))
-            return data
+            logging.info(' trade received %s', data)
+            return [Trade.fromResponse(t) for t in data] if self._typed else data
         except Exception as e:
             raise e
+
+    def iterTrades(self, since=None):
+        """
+        Streams your executed trades one at a time without loading the whole response in memory.
+        since is a timestamp in the format of the trades' "created" field, only trades created at or after it are
+        yielded, so trades sharing the timestamp of the last one seen are not missed.
+        """
+        response = self._requestHandler('/trade/', stream=True)
+        try:
+            for trade in iterArray(response.iter_content(chunk_size=65536)):
+                if since is None or trade['created'] >= since:
+                    yield Trade.fromResponse(trade) if self._typed else trade
+        finally:
+            response.close()
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import queue
+import threading
+
+from requestConstants import (
+    journalBackups,
+    journalMaxBytes
+)
+
+_stop = object()
+
+
+class RequestJournal(object):
+    """
+    Structured journal of every request sent and response received, one JSON record per line.
+    record only enqueues, all encoding and file I/O happens on a background writer thread which flushes in batches
+    and rotates the file once it exceeds maxBytes, keeping backupCount older files as path.1, path.2, ...
+    """
+    def __init__(self, path, maxBytes=journalMaxBytes, backupCount=journalBackups, flushInterval=0.5):
+        self.path = path
+        self._maxBytes = maxBytes
+        self._backupCount = backupCount
+        self._flushInterval = flushInterval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='RequestJournal', daemon=True)
+        self._thread.start()
+
+    def record(self, record):
+        self._queue.put(record)
+
+    def _open(self):
+        f = open(self.path, 'a', encoding='utf-8')
+        return f, f.tell()
+
+    def _rotate(self):
+        for i in range(self._backupCount - 1, 0, -1):
+            if os.path.exists('%s.%d' % (self.path, i)):
+                os.replace('%s.%d' % (self.path, i), '%s.%d' % (self.path, i + 1))
+        if self._backupCount:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
+
+    def _run(self):
+        f, size = self._open()
+        try:
+            while True:
+                try:
+                    record = self._queue.get(timeout=self._flushInterval)
+                except queue.Empty:
+                    f.flush()
+                    continue
+                if record is _stop:
+                    break
+                try:
+                    line = json.dumps(record, default=str) + '\n'
+                except (TypeError, ValueError) as e:
+                    logging.warning('Unable to journal record: %s', e)
+                    continue
+                f.write(line)
+                size += len(line.encode('utf-8'))
+                if size >= self._maxBytes:
+                    f.close()
+                    self._rotate()
+                    f, size = self._open()
+                elif self._queue.empty():
+                    f.flush()
+        finally:
+            f.close()
+
+    def close(self):
+        """
+        Writes out everything queued so far and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_stop)
+            self._thread.join()
+
+
+def read(path):
+    """
+    Yields the records of a journal file.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
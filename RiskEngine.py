@@ -0,0 +1,68 @@
+import logging
+
+from Decoding import toDecimal
+from requestConstants import (
+    errors,
+    quantityStep,
+    APIErrors
+)
+
+_step = toDecimal(quantityStep)
+
+
+def _isTrue(value):
+    return str(value).lower() == 'true'
+
+
+class RiskEngine(object):
+    """
+    Local pre-trade checks mirroring the API's limit errors (1010, 1011, 1012, 1015 and 1019), evaluated against cached
+    account info and currencies and the position ledger's balances so breaches are rejected without a round trip.
+    Checks that need data we do not have locally (e.g. a USD price for a negative balance) are left to the API.
+    """
+    def __init__(self, referenceData, ledger):
+        self._referenceData = referenceData
+        self._ledger = ledger
+
+    @staticmethod
+    def _reject(code):
+        logging.info('Rejected locally with %s: %s', code, errors[code])
+        raise APIErrors[code](code, errors[code])
+
+    def check(self, instrument, side, quantity):
+        """
+        Checks quantity limits and, for sells, balances of long only currencies. Raises APIError with the code the API
+        would have returned.
+        """
+        quantity = toDecimal(quantity)
+        if quantity % _step:
+            self._reject(1015)
+        base, _ = self._referenceData.pair(instrument)
+        currencies = self._referenceData.get('/currency/')
+        minimum = self._referenceData.minimumTradeSize(base)
+        if minimum is not None and quantity < minimum:
+            self._reject(1019)
+        maximum = self._referenceData.get('/account_info/').get(base.lower() + '_max_qty_per_trade')
+        if maximum is not None and quantity > toDecimal(maximum):
+            self._reject(1010)
+        if side == 'sell' and _isTrue(currencies.get(base, {}).get('long_only')) and \
+                self._ledger.balance(base) < quantity:
+            self._reject(1011)
+        return True
+
+    def checkOrder(self, quote):
+        """
+        Checks what needs the quoted price: balance of a long only quote currency for buys and max risk exposure.
+        """
+        base, counter = self._referenceData.pair(quote.instrument)
+        currencies = self._referenceData.get('/currency/')
+        if quote.side == 'buy' and _isTrue(currencies.get(counter, {}).get('long_only')) and \
+                self._ledger.balance(counter) < quote.quantity * quote.price:
+            self._reject(1011)
+        maxExposure = self._referenceData.get('/account_info/').get('max_risk_exposure')
+        if maxExposure is not None:
+            exposure = self._ledger.exposure(self._ledger.deltas(base, counter, quote.side, quote.quantity,
+                                                                 quote.price))
+            if exposure is not None and exposure > toDecimal(maxExposure):
+                self._reject(1012)
+        return True
@@ -0,0 +1,174 @@
+import datetime
+import json
+import os
+
+import numpy as np
+
+import RequestJournal
+
+# columns kept per trade and their dtypes, str columns get the width of their longest value
+_columns = {
+    'created': 'datetime64[us]',
+    'instrument': np.int32,  # index into TradeAnalytics.instruments
+    'side': np.int8,  # 1 buy, -1 sell
+    'quantity': np.float64,
+    'price': np.float64,
+    'rfq_price': np.float64,  # NaN when the RFQ is not in the request journal
+    'trade_id': str,
+    'rfq_id': str,
+}
+
+
+def journalPrices(*paths):
+    """
+    rfq_id -> quoted price of every RFQ answered in the given request journal files (see RequestJournal).
+    """
+    prices = {}
+    for path in paths:
+        for record in RequestJournal.read(path):
+            response = record.get('response')
+            if record.get('endpoint') == '/request_for_quote/' and isinstance(response, dict) and \
+                    'rfq_id' in response:
+                prices[response['rfq_id']] = float(response['price'])
+    return prices
+
+
+def _float(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _created(value):
+    return value if isinstance(value, datetime.datetime) else value.rstrip('Z')
+
+
+def _rfqId(value):
+    return '' if value is None or value == 'null' else value
+
+
+class TradeAnalytics(object):
+    """
+    Executed trades as NumPy columns, one array per field, so aggregates over the history are computed vectorised
+    rather than by looping over dicts of strings. Prices and quantities are float64: fine for analysis, the ledger
+    and journals keep exact Decimals.
+    save writes the columns to a directory of .npy files, load memory-maps them back without parsing anything.
+    """
+    def __init__(self, columns, instruments):
+        self.columns = columns
+        self.instruments = list(instruments)
+
+    def __len__(self):
+        return len(self.columns['price'])
+
+    @classmethod
+    def fromTrades(cls, trades, rfqPrices=None):
+        """
+        Builds the columns from trades as returned by getAllTrades, iterTrades or TradeStore, response dicts or Trade
+        records. rfqPrices (rfq_id -> price, see journalPrices) gives each trade the price it was quoted.
+        """
+        trades = trades if isinstance(trades, list) else list(trades)
+        # coded through a dict rather than np.unique, which sorts every string; codes then follow sorted names
+        seen = {}
+        codes = np.array([seen.setdefault(t['instrument'], len(seen)) for t in trades], dtype=_columns['instrument'])
+        instruments = sorted(seen)
+        order = np.array([instruments.index(name) for name in seen], dtype=_columns['instrument'])
+        columns = {
+            'created': np.array([_created(t['created']) for t in trades], dtype=_columns['created']),
+            'instrument': order[codes] if len(codes) else codes,
+            'side': np.where(np.array([t['side'] == 'buy' for t in trades], dtype=bool), 1, -1).astype(np.int8),
+            'quantity': np.array([float(t['quantity']) for t in trades], dtype=np.float64),
+            'price': np.array([float(t['price']) for t in trades], dtype=np.float64),
+            'trade_id': np.array([t['trade_id'] for t in trades], dtype=str),
+            'rfq_id': np.array([_rfqId(t['rfq_id']) for t in trades], dtype=str),
+        }
+        analytics = cls(columns, instruments)
+        analytics.joinRFQPrices(rfqPrices or {})
+        return analytics
+
+    def joinRFQPrices(self, rfqPrices):
+        """
+        Sets rfq_price from rfq_id -> price, NaN for trades whose RFQ is unknown.
+        """
+        self.columns['rfq_price'] = np.array([rfqPrices.get(r, np.nan) for r in self.columns['rfq_id'].tolist()],
+                                             dtype=np.float64)
+
+    def save(self, path):
+        """
+        Writes every column to path/<column>.npy and the instruments to path/instruments.json.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _columns:
+            np.save(os.path.join(path, name + '.npy'), self.columns[name])
+        with open(os.path.join(path, 'instruments.json'), 'w') as f:
+            json.dump(self.instruments, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps columns written by save, read only.
+        """
+        with open(os.path.join(path, 'instruments.json')) as f:
+            instruments = json.load(f)
+        return cls({name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in _columns},
+                   instruments)
+
+    def _byInstrument(self, values, mask=None):
+        codes = self.columns['instrument']
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        return np.bincount(codes, weights=values, minlength=len(self.instruments))
+
+    def pnl(self, marks=None):
+        """
+        Per instrument net position, cash flow and average buy and sell prices, as TradeStore.pnlByInstrument.
+        If marks (instrument -> price) is given, pnl is the cash flow plus the position valued at the mark.
+        """
+        c = self.columns
+        notional = c['quantity'] * c['price']
+        buys = c['side'] > 0
+        position = self._byInstrument(c['side'] * c['quantity'])
+        cash = self._byInstrument(-c['side'] * notional)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averageBuy = self._byInstrument(notional, buys) / self._byInstrument(c['quantity'], buys)
+            averageSell = self._byInstrument(notional, ~buys) / self._byInstrument(c['quantity'], ~buys)
+        out = {}
+        for i, instrument in enumerate(self.instruments):
+            out[instrument] = {'position': float(position[i]), 'cash': float(cash[i]),
+                               'average_buy_price': _float(averageBuy[i]), 'average_sell_price': _float(averageSell[i])}
+            if marks and instrument in marks:
+                out[instrument]['pnl'] = float(cash[i] + position[i] * marks[instrument])
+        return out
+
+    def slippage(self):
+        """
+        Per instrument execution price against the RFQ price, over trades whose RFQ price is known: mean slippage and
+        notional weighted slippage in basis points, positive when the trade was worse than quoted, and its cost in the
+        quote currency.
+        """
+        c = self.columns
+        joined = ~np.isnan(c['rfq_price'])
+        worse = c['side'] * (c['price'] - c['rfq_price'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bps = worse / c['rfq_price'] * 1e4
+            count = self._byInstrument(np.ones(len(self)), joined)
+            notional = self._byInstrument(c['quantity'] * c['price'], joined)
+            mean = self._byInstrument(bps, joined) / count
+            weighted = self._byInstrument(bps * c['quantity'] * c['price'], joined) / notional
+        cost = self._byInstrument(worse * c['quantity'], joined)
+        return {instrument: {'trades': int(count[i]), 'mean_bps': _float(mean[i]), 'weighted_bps': _float(weighted[i]),
+                             'cost': float(cost[i])}
+                for i, instrument in enumerate(self.instruments) if count[i]}
+
+    def volumeByDay(self):
+        """
+        Trades, quantity and notional per instrument and UTC day, ordered by day then instrument.
+        """
+        c = self.columns
+        n = len(self.instruments)
+        days, day = np.unique(c['created'].astype('datetime64[D]'), return_inverse=True)
+        groups, group = np.unique(day.astype(np.int64) * n + c['instrument'], return_inverse=True)
+        trades = np.bincount(group, minlength=len(groups))
+        quantity = np.bincount(group, weights=c['quantity'], minlength=len(groups))
+        notional = np.bincount(group, weights=c['quantity'] * c['price'], minlength=len(groups))
+        return [{'day': str(days[g // n]), 'instrument': self.instruments[g % n], 'trades': int(trades[i]),
+                 'quantity': float(quantity[i]), 'notional': float(notional[i])}
+                for i, g in enumerate(groups.tolist())]
@@ -0,0 +1,70 @@
+import datetime
+import logging
+import time
+
+from requestConstants import (
+    requoteBackoff,
+    requoteRetries,
+    APIError
+)
+
+# quote is no longer valid, or its price moved: worth asking for a new one
+_requoteCodes = (1007, 1009, 1021)
+
+
+class TradeScheduler(object):
+    """
+    Executes RFQ and trade pairs, only sending orders that can reach the API before their quote expires.
+    Time left on a quote is compared with RequestHandler.orderMargin (measured /order/ latency) times safety; quotes
+    too close to expiry, orders rejected with an expired or moved price, and orders that did not execute are
+    re-quoted up to retries times with exponential backoff.
+    """
+    def __init__(self, requestHandler, retries=requoteRetries, backoff=requoteBackoff, safety=1.5):
+        self._requestHandler = requestHandler
+        self._retries = retries
+        self._backoff = backoff
+        self._safety = safety
+
+    def remaining(self, rfq_id):
+        """
+        Time left to trade the quote once the order latency is allowed for, None if it is not in the quote book.
+        """
+        quote = self._requestHandler.getQuote(rfq_id)
+        if quote is None:
+            return None
+        margin = self._requestHandler.orderMargin() * self._safety
+        return datetime.timedelta(seconds=quote.remaining()) - margin
+
+    def tradeable(self, rfq_id):
+        remaining = self.remaining(rfq_id)
+        return remaining is not None and remaining > datetime.timedelta(0)
+
+    def execute(self, instrument, side, quantity, rfq_id=None):
+        """
+        Trades instrument, side and quantity, starting from quote rfq_id if given and still tradeable.
+        Returns the executed order, or None once retries are exhausted.
+        """
+        for attempt in range(self._retries + 1):
+            if attempt:
+                self._requestHandler.increment('requote')
+                time.sleep(self._backoff * 2 ** (attempt - 1))
+            if rfq_id is None or not self.tradeable(rfq_id):
+                if rfq_id is not None:
+                    self._requestHandler.discardQuote(rfq_id)
+                rfq_id = self._requestHandler.RFQ(instrument, side, quantity)['rfq_id']
+                if not self.tradeable(rfq_id):
+                    logging.info('Quote %s expires before an order could reach the API, re-quoting.', rfq_id)
+                    self._requestHandler.discardQuote(rfq_id)
+                    rfq_id = None
+                    continue
+            try:
+                order = self._requestHandler.trade(rfq_id)
+            except APIError as e:
+                if e.code not in _requoteCodes:
+                    raise e
+                logging.info('Order rejected with %s, re-quoting.', e.code)
+                order = None
+            if order is not None:
+                return order
+            rfq_id = None
+        logging.error('Unable to trade %s %s %s after %d attempts.', side, quantity, instrument, self._retries + 1)
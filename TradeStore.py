@@ -0,0 +1,125 @@
+import json
+import logging
+import sqlite3
+import threading
+
+from Decoding import toDecimal
+
+_zero = toDecimal('0')
+
+
+def _raw(trade):
+    """
+    trade as returned by /trade/, from either the response dict or a Trade record (see RequestHandler typed).
+    """
+    if isinstance(trade, dict):
+        return trade
+    raw = trade.asDict()
+    for field in ('quantity', 'price'):
+        raw[field] = str(raw[field])
+    for field in ('rfq_id', 'order'):
+        if raw[field] is None:
+            raw[field] = 'null'
+    return raw
+
+
+class TradeStore(object):
+    """
+    Append-only local store of executed trades in SQLite.
+    sync only keeps trades newer than the last one stored, and aggregations run against the store rather than
+    downloading the history again.
+    """
+    def __init__(self, path='trades.db'):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS trades ('
+                             'trade_id TEXT PRIMARY KEY, created TEXT NOT NULL, instrument TEXT NOT NULL, '
+                             'side TEXT NOT NULL, quantity TEXT NOT NULL, price TEXT NOT NULL, rfq_id TEXT, '
+                             '"order" TEXT, raw TEXT NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS trades_created ON trades (created)')
+
+    def add(self, trades):
+        """
+        Stores trades, dicts or Trade records, ignoring ones already stored. Returns the number added.
+        """
+        trades = [_raw(t) for t in trades]
+        rows = [(t['trade_id'], t['created'], t['instrument'], t['side'], str(t['quantity']), str(t['price']),
+                 t.get('rfq_id'), t.get('order'), json.dumps(t)) for t in trades]
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany('INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            return self._db.total_changes - before
+
+    def lastCreated(self):
+        """
+        Timestamp of the most recent stored trade, None if the store is empty.
+        """
+        with self._lock:
+            return self._db.execute('SELECT MAX(created) FROM trades').fetchone()[0]
+
+    def sync(self, requestHandler, batchSize=1000):
+        """
+        Streams trades newer than the last stored one from the API and appends them in batches.
+        Returns the number of trades added.
+        """
+        added = 0
+        batch = []
+        for trade in requestHandler.iterTrades(since=self.lastCreated()):
+            batch.append(trade)
+            if len(batch) >= batchSize:
+                added += self.add(batch)
+                batch = []
+        added += self.add(batch)
+        logging.info('%s new trades stored', added)
+        return added
+
+    def __iter__(self, batchSize=1000):
+        """
+        Iterates stored trades, oldest first, as returned by the API, reading batchSize rows at a time.
+        """
+        last = ('', '')
+        while True:
+            with self._lock:
+                rows = self._db.execute('SELECT created, trade_id, raw FROM trades WHERE (created, trade_id) > (?, ?) '
+                                        'ORDER BY created, trade_id LIMIT ?', last + (batchSize,)).fetchall()
+            for row in rows:
+                yield json.loads(row[2])
+            if len(rows) < batchSize:
+                return
+            last = rows[-1][:2]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM trades').fetchone()[0]
+
+    def pnlByInstrument(self, marks=None):
+        """
+        Per instrument net position, cash flow and average buy and sell prices, as Decimals.
+        If marks (instrument -> price) is given, pnl is the cash flow plus the position valued at the mark.
+        Quantities and prices are stored as text and summed as Decimals, SQLite would sum them as floats.
+        """
+        with self._lock:
+            rows = self._db.execute('SELECT instrument, side, quantity, price FROM trades').fetchall()
+        totals = {}  # instrument: [position, cash, buy quantity, buy notional, sell quantity, sell notional]
+        for instrument, side, quantity, price in rows:
+            quantity, price = toDecimal(quantity), toDecimal(price)
+            total = totals.setdefault(instrument, [_zero] * 6)
+            buy = side == 'buy'
+            total[0] += quantity if buy else -quantity
+            total[1] += -quantity * price if buy else quantity * price
+            total[2 if buy else 4] += quantity
+            total[3 if buy else 5] += quantity * price
+        out = {}
+        for instrument, (position, cash, buyQuantity, buyNotional, sellQuantity, sellNotional) in totals.items():
+            out[instrument] = {'position': position, 'cash': cash,
+                               'average_buy_price': buyNotional / buyQuantity if buyQuantity else None,
+                               'average_sell_price': sellNotional / sellQuantity if sellQuantity else None}
+            if marks and instrument in marks:
+                out[instrument]['pnl'] = cash + position * toDecimal(marks[instrument])
+        return out
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,88 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from requestConstants import (
+    baseAPI,
+    poolSize,
+    timeouts
+)
+
+
+class Transport(object):
+    """
+    Keep-alive HTTP transport shared by everything a RequestHandler sends.
+    A single HTTPAdapter (one urllib3 connection pool per host) is shared across threads, while each thread gets
+    its own requests.Session mounted on it as sessions themselves are not thread-safe.
+    """
+    def __init__(self, headers, baseURL=baseAPI, poolSize=poolSize, prewarm=False):
+        self.baseURL = baseURL
+        self._headers = headers
+        self._poolSize = poolSize
+        self._adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+        self._local = threading.local()
+        if prewarm:
+            self.prewarm()
+
+    def _session(self):
+        """
+        Returns the calling thread's session, creating it on first use.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self._headers)
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            self._local.session = session
+        return session
+
+    @staticmethod
+    def _timeout(request):
+        """
+        (connect, read) timeout for the endpoint, falling back to the default one.
+        """
+        return timeouts.get(request, timeouts['default'])
+
+    def get(self, request, **kwargs):
+        return self._session().get(self.baseURL + request, timeout=self._timeout(request), **kwargs)
+
+    def post(self, request, post_data):
+        return self._session().post(self.baseURL + request, json=post_data, timeout=self._timeout(request))
+
+    def prewarm(self, connections=None):
+        """
+        Opens up to `connections` (defaults to pool size) keep-alive connections in parallel so the first RFQ
+        does not pay for TCP and TLS handshakes. Failures are logged and ignored.
+        """
+        def _open():
+            try:
+                self._session().head(self.baseURL, timeout=timeouts['default'])
+            except requests.exceptions.RequestException as e:
+                logging.warning('Unable to pre-warm connection to %s: %s', self.baseURL, e)
+
+        threads = [threading.Thread(target=_open) for _ in range(connections or self._poolSize)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stats(self):
+        """
+        Counts of connections opened and requests that reused an already open connection, across all hosts.
+        """
+        new = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:  # evicted by another thread meanwhile
+                continue
+            new += pool.num_connections
+            sent += pool.num_requests
+        return {'new': new, 'reused': max(sent - new, 0), 'requests': sent}
+
+    def close(self):
+        self._adapter.close()
@@ -0,0 +1,363 @@
+"""
+Benchmark suites for RequestHandler. Client benchmarks run against a local MockExchange so they measure
+serialization, connection handling and parsing rather than the venue.
+Results are appended to a JSONL file tagged with the git version and compared with the previous run.
+
+    python benchmark.py [client] [decode] [rfqPath] [accounts] [analytics] [--requests 200] [--concurrency 10]
+                        [--latency 0.002] [--trades 10000] [--accounts 4]
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import subprocess
+import time
+import timeit
+import uuid
+
+import Decoding
+from AsyncRequestHandler import AsyncRequestHandler
+from MockExchange import MockExchange
+import RequestHandler as handlerModule
+from Records import (
+    Quote,
+    Trade
+)
+from RequestHandler import RequestHandler
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    n = len(latencies)
+    return {
+        'ops': n,
+        'ops_per_sec': n / elapsed if elapsed else None,
+        'p50_ms': latencies[n // 2] / 1e6 if n else None,
+        'p99_ms': latencies[min(int(n * 0.99), n - 1)] / 1e6 if n else None,
+    }
+
+
+def _timeSerial(func, n):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter_ns()
+        func()
+        latencies.append(time.perf_counter_ns() - t)
+    return _summary(latencies, time.perf_counter() - start)
+
+
+def _rfqAndTrade(rH):
+    rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+    if rH.trade() is None:
+        raise RuntimeError('Trade did not execute')
+
+
+def benchSync(baseURL, n, concurrency):
+    """
+    One request at a time on a new connection each, as when calling requests.get/post directly.
+    """
+    rH = RequestHandler(baseURL=baseURL)
+    rH._headers['Connection'] = 'close'  # sessions are created lazily from these headers
+    rH._getInstruments()
+    results = {'rfq': _timeSerial(lambda: rH.RFQ('BTCUSD.SPOT', 'buy', '1'), n),
+               'rfq_trade': _timeSerial(lambda: _rfqAndTrade(rH), n)}
+    rH.close()
+    return results
+
+
+def benchPooled(baseURL, n, concurrency):
+    """
+    One request at a time over pre-warmed keep-alive connections.
+    """
+    rH = RequestHandler(baseURL=baseURL, prewarm=True)
+    rH._getInstruments()
+    results = {'rfq': _timeSerial(lambda: rH.RFQ('BTCUSD.SPOT', 'buy', '1'), n),
+               'rfq_trade': _timeSerial(lambda: _rfqAndTrade(rH), n)}
+    rH.close()
+    return results
+
+
+def benchConcurrent(baseURL, n, concurrency):
+    """
+    Up to concurrency requests in flight through AsyncRequestHandler.
+    """
+    async def _run(operation):
+        limit = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def _one():
+            async with limit:
+                t = time.perf_counter_ns()
+                await operation()
+                latencies.append(time.perf_counter_ns() - t)
+        start = time.perf_counter()
+        await asyncio.gather(*(_one() for _ in range(n)))
+        return _summary(latencies, time.perf_counter() - start)
+
+    async def _main():
+        async with AsyncRequestHandler(baseURL=baseURL, poolSize=concurrency, prewarm=True) as rH:
+            await rH.gatherRFQs([])
+
+            async def rfq():
+                await rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+
+            async def rfqAndTrade():
+                quote = await rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+                if await rH.trade(quote['rfq_id']) is None:
+                    raise RuntimeError('Trade did not execute')
+            return {'rfq': await _run(rfq), 'rfq_trade': await _run(rfqAndTrade)}
+    return asyncio.run(_main())
+
+
+def benchClient(args):
+    server = MockExchange(latency=args.latency).start()
+    try:
+        return {mode: bench(server.baseURL, args.requests, args.concurrency)
+                for mode, bench in (('sync', benchSync), ('pooled', benchPooled), ('concurrent', benchConcurrent))}
+    finally:
+        server.stop()
+
+
+def _tradePayload(n):
+    """
+    /trade/ response with n trades shaped like the API's.
+    """
+    return json.dumps([{
+        'created': '2020-02-28T11:%02d:%02d.%06dZ' % (i // 3600 % 60, i // 60 % 60, i % 1000000),
+        'price': '%.10f' % (10000 + i % 500 / 7.0),
+        'instrument': 'BTCUSD.SPOT',
+        'trade_id': str(uuid.uuid4()),
+        'origin': 'rest',
+        'rfq_id': str(uuid.uuid4()),
+        'order': str(uuid.uuid4()),
+        'side': 'buy' if i % 2 else 'sell',
+        'quantity': '%.10f' % (1 + i % 13 / 4.0),
+        'user': 'user@example.com',
+        'executing_unit': 'risk-adding-strategy',
+    } for i in range(n)]).encode('utf-8')
+
+
+def _best(func, repeat=5):
+    """
+    Best of repeat runs of func, in milliseconds.
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def benchDecode(args):
+    """
+    Decode time of a realistic /trade/ response: standard json with float conversion by the caller, as before,
+    against the Decoding backend producing Trade records with Decimal prices and quantities.
+    """
+    payload = _tradePayload(args.trades)
+    return {
+        'backend': Decoding.backend,
+        'trades': args.trades,
+        'bytes': len(payload),
+        'json_loads_ms': _best(lambda: json.loads(payload)),
+        'backend_loads_ms': _best(lambda: Decoding.loads(payload)),
+        'json_floats_ms': _best(lambda: [(float(t['price']), float(t['quantity'])) for t in json.loads(payload)]),
+        'records_ms': _best(lambda: [Trade.fromResponse(t) for t in Decoding.loads(payload)]),
+    }
+
+
+def _legacyQuotePath(data):
+    """
+    Per quote work of the RFQ and trade path before the hot path pass, kept for comparison.
+    """
+    if data['side'] not in ['buy', 'sell']:
+        raise ValueError('Invalid side ' + data['side'] + ". 'buy' or 'sell' are the only allowable side.")
+    validUntil = datetime.datetime.strptime(data['valid_until'], '%Y-%m-%dT%H:%M:%S.%fZ')
+    remaining = validUntil - datetime.datetime.utcnow()
+    post_data = {
+        'instrument': data['instrument'],
+        'side': data['side'],
+        'quantity': data['quantity'],
+        'client_order_id': str(uuid.uuid4()),
+        'price': data['price'],
+        'order_type': 'FOK',
+        'valid_until': data['valid_until'],
+        'acceptable_slippage_in_basis_points': '0.00',
+    }
+    return remaining > datetime.timedelta(0), post_data
+
+
+def _quotePath(data):
+    """
+    Per quote work of the RFQ and trade path as RequestHandler does it now.
+    """
+    if data['side'] not in handlerModule._sides:
+        raise ValueError('Invalid side')
+    quote = Quote.fromResponse(data)
+    post_data = handlerModule._orderTemplate.copy()
+    post_data['instrument'] = quote.instrument
+    post_data['side'] = quote.side
+    post_data['quantity'] = str(quote.quantity)
+    post_data['client_order_id'] = handlerModule._clientId()
+    post_data['price'] = str(quote.price)
+    post_data['valid_until'] = quote.valid_until
+    return quote.remaining() > 0, post_data
+
+
+def benchRFQPath(args):
+    """
+    CPU cost per quote of validation, timestamp parsing, expiry checking and order building, without any I/O.
+    The legacy path is timed without Decimal parsing, so the comparison understates the gain on the rest.
+    """
+    validUntil = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+    data = {'valid_until': validUntil.strftime('%Y-%m-%dT%H:%M:%S.%fZ'), 'rfq_id': str(uuid.uuid4()),
+            'client_rfq_id': str(uuid.uuid4()), 'quantity': '1.0000000000', 'side': 'buy',
+            'instrument': 'BTCUSD.SPOT', 'price': '700.00000000'}
+    n = args.requests * 100
+    legacy = _best(lambda: [_legacyQuotePath(data) for _ in range(n)]) * 1000 / n
+    current = _best(lambda: [_quotePath(data) for _ in range(n)]) * 1000 / n
+    timestamps = {
+        'strptime_us': _best(lambda: [datetime.datetime.strptime(data['valid_until'], '%Y-%m-%dT%H:%M:%S.%fZ')
+                                      for _ in range(n)]) * 1000 / n,
+        'parseTimestamp_us': _best(lambda: [Decoding.parseTimestamp(data['valid_until'])
+                                            for _ in range(n)]) * 1000 / n,
+    }
+    return dict(timestamps, quotes=n, legacy_us=legacy, current_us=current, speedup=legacy / current)
+
+
+def benchAccounts(args):
+    """
+    Aggregate orders/sec of MultiAccountRunner with 1, 2, 4... up to args.accounts accounts, each trading the same
+    basket of args.requests orders. Near linear scaling shows up as orders_per_sec growing with accounts until the
+    cores (or the mock exchange, which runs in this process) saturate.
+    """
+    from MultiAccountRunner import MultiAccountRunner
+    server = MockExchange(latency=args.latency).start()
+    basket = [{'instrument': instrument, 'side': 'buy', 'quantity': '1'}
+              for _, instrument in zip(range(args.requests), itertools.cycle(('BTCUSD.SPOT', 'ETHUSD.SPOT')))]
+    results = {}
+    try:
+        accounts = 1
+        while accounts <= args.accounts:
+            runner = MultiAccountRunner([{'name': 'account%d' % i, 'apiToken': 'bench', 'basket': basket}
+                                         for i in range(accounts)], baseURL=server.baseURL,
+                                        workers=args.concurrency, riskChecks=False)
+            report = runner.run()
+            results['accounts_%d' % accounts] = {'orders': report['orders'], 'seconds': report['seconds'],
+                                                 'orders_per_sec': report['orders_per_sec']}
+            accounts *= 2
+    finally:
+        server.stop()
+    return results
+
+
+def _legacyAnalytics(trades):
+    """
+    Position, cash and volume per instrument and day the way it was done before TradeAnalytics, in Python loops.
+    """
+    pnl = {}
+    volume = {}
+    for t in trades:
+        quantity, price = float(t['quantity']), float(t['price'])
+        sign = 1 if t['side'] == 'buy' else -1
+        entry = pnl.setdefault(t['instrument'], [0.0, 0.0])
+        entry[0] += sign * quantity
+        entry[1] -= sign * quantity * price
+        day = volume.setdefault((t['instrument'], t['created'][:10]), [0, 0.0, 0.0])
+        day[0] += 1
+        day[1] += quantity
+        day[2] += quantity * price
+    return pnl, volume
+
+
+def benchAnalytics(args):
+    """
+    P&L and volume per day over args.trades decoded trades: Python loops over dicts against TradeAnalytics, building
+    the columns once, and reloading them memory-mapped from the on-disk cache.
+    """
+    import tempfile
+    from TradeAnalytics import TradeAnalytics
+    trades = json.loads(_tradePayload(args.trades))
+    path = os.path.join(tempfile.mkdtemp(), 'trades.d')
+    TradeAnalytics.fromTrades(trades).save(path)
+
+    def vectorised(tA):
+        return tA.pnl(), tA.volumeByDay()
+    return {
+        'trades': args.trades,
+        'legacy_ms': _best(lambda: _legacyAnalytics(trades), repeat=3),
+        'build_ms': _best(lambda: TradeAnalytics.fromTrades(trades), repeat=3),
+        'load_ms': _best(lambda: TradeAnalytics.load(path)),
+        'aggregate_ms': _best(lambda: vectorised(TradeAnalytics.load(path))),
+    }
+
+
+suites = {
+    'client': benchClient,
+    'decode': benchDecode,
+    'rfqPath': benchRFQPath,
+    'accounts': benchAccounts,
+    'analytics': benchAnalytics,
+}
+
+
+def version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _previous(path, suite):
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record['suite'] == suite:
+                    previous = record
+    return previous
+
+
+def _compare(results, previous, prefix=''):
+    """
+    Yields (name, current, previous) for every numeric result also present in the previous run.
+    """
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _compare(value, (previous or {}).get(key), prefix + key + '.')
+        elif isinstance(value, (int, float)) and previous and isinstance(previous.get(key), (int, float)):
+            yield prefix + key, value, previous[key]
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Run RequestHandler benchmarks.')
+    parser.add_argument('suites', nargs='*', help='suites to run out of %s, defaults to client' % ', '.join(suites))
+    parser.add_argument('--requests', type=int, default=200, help='operations per mode')
+    parser.add_argument('--concurrency', type=int, default=10, help='requests in flight in concurrent mode')
+    parser.add_argument('--latency', type=float, default=0.002, help='mock exchange latency in seconds')
+    parser.add_argument('--trades', type=int, default=10000, help='trades in the decode payload')
+    parser.add_argument('--accounts', type=int, default=4, help='most accounts run by the accounts suite')
+    parser.add_argument('--results', default='benchmark_results.jsonl', help='file results are appended to')
+    args = parser.parse_args(argv)
+    for suite in args.suites:
+        if suite not in suites:
+            parser.error('unknown suite %s' % suite)
+    for suite in args.suites or ['client']:
+        results = suites[suite](args)
+        previous = _previous(args.results, suite)
+        record = {'suite': suite, 'version': version(), 'timestamp': datetime.datetime.utcnow().isoformat(),
+                  'args': vars(args), 'results': results}
+        with open(args.results, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(json.dumps(record, indent=2))
+        if previous:
+            print('Compared with %s:' % previous['version'])
+            for name, value, before in _compare(results, previous['results']):
+                change = (value - before) / before * 100 if before else 0.0
+                print('  %-40s %12.3f %12.3f %+7.1f%%' % (name, before, value, change))
+
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    main()
@@ -0,0 +1,38 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+
+def iterArray(chunks):
+    """
+    Incrementally parses a top level JSON array from an iterable of byte chunks, yielding one element at a time so
+    only the element being parsed is held in memory.
+    """
+    text = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and (buf[pos] in _whitespace or (started and buf[pos] == ',')):
+                pos += 1
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('Expected a JSON array, got %r' % buf[pos:pos + 20])
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                element, pos = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # element spans the next chunk
+            yield element
+    raise ValueError('Truncated JSON array')
@@ -1,23 +1,252 @@
-# import click
+"""
+Command line trading tool.
+
+    python main.py quote BTCUSD.SPOT buy 1 [--poll 1 --count 10]
+    python main.py trade BTCUSD.SPOT buy 1
+    python main.py slice BTCUSD.SPOT buy 250 [--slices 5 --duration 60]
+    python main.py balances [BTC USD]
+    python main.py trades [--since 2020-02-28T11:41:30.023467Z]
+    python main.py batch basket.csv [--workers 10]
+    python main.py analytics [--cache trades.d] [--journal requests.jsonl]
+    python main.py accounts [accounts.json] [--processes 4]
+    python main.py bench [client decode rfqPath]
+    python main.py interactive
+
+quote and trade read orders from stdin when no order is given, one per line as JSON ({"instrument": ..., "side": ...,
+"quantity": ...}) or as "instrument side quantity". Every command writes JSON lines to stdout, logs go to stderr.
+One RequestHandler (and its connection pool) serves the whole run. Only the modules a command needs are imported.
+--profile FILE profiles the run and writes sampled stacks to FILE for a flame graph, the summary goes to stderr.
+SIGUSR1 starts or stops profiling of a running command.
+"""
+import argparse
+import collections
+import json
 import logging
-import pprint
-from RequestHandler import RequestHandler
+import signal
+import sys
 
 logger = logging.getLogger(__name__)
 
 
-# @click.command("Primitive Text Based Trading Tool for ")
-# @click.option("--instrument", default="BTCUSD.SPOT", help="Which instrument do you want to trade?")
-# @click.option("--side", default="buy", help="Do you want to buy or sell them?")
-# @click.option("--quantity", default=1, help="How many units to trade?")
-# def main(instrument, side, quantity):
-def main():
+def _handler(args, **kwargs):
+    """
+    The handler for the whole run. Read only commands skip prewarming, risk checks and the order journal.
+    """
+    from RequestHandler import RequestHandler
+    trading = args.func in (quote, trade, sliceOrder, batch, interactive)
+    options = dict(prewarm=trading, riskChecks=trading and not args.no_risk, rateLimit=True,
+                   orderJournalPath=args.order_journal if trading else None)
+    if args.base_url:
+        options['baseURL'] = args.base_url
+    options.update(kwargs)
+    return RequestHandler(**options)
+
+
+def _default(value):
+    return value.asDict() if hasattr(value, 'asDict') else str(value)
+
+
+def _emit(record):
+    sys.stdout.write(json.dumps(record, default=_default) + '\n')
+    sys.stdout.flush()
+
+
+def _orders(args):
+    """
+    Orders given on the command line, else read from stdin.
+    """
+    if args.instrument:
+        if not (args.side and args.quantity):
+            raise SystemExit('instrument, side and quantity are all required')
+        yield {'instrument': args.instrument, 'side': args.side, 'quantity': args.quantity}
+        return
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            order = json.loads(line)
+        else:
+            order = dict(zip(('instrument', 'side', 'quantity'), line.split()))
+        yield {'instrument': order.get('instrument'), 'side': str(order.get('side')).lower(),
+               'quantity': str(order.get('quantity'))}
+
+
+def _stream(func, items, workers):
+    """
+    Applies func to items on workers threads, yielding (item, result, error) in input order with at most 2 * workers
+    items in flight, so stdin is consumed as a stream.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cli') as executor:
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            while len(pending) >= 2 * workers or (pending and pending[0][1].done()):
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
+
+
+def quote(args, rH):
+    if args.poll:
+        return poll(args, rH)
+    failed = 0
+    for order, data, error in _stream(lambda o: rH.RFQ(o['instrument'], o['side'], o['quantity']), _orders(args),
+                                      args.workers):
+        if error is not None:
+            failed += 1
+            _emit(dict(order, error=str(error)))
+        else:
+            _emit(data)
+    return 1 if failed else 0
+
+
+_quoteFields = ('rfq_id', 'client_rfq_id', 'instrument', 'side', 'quantity', 'price', 'valid_until')
+
+
+def poll(args, rH):
+    """
+    Streams quotes for the orders given every args.poll seconds, args.count of them or until interrupted.
+    """
+    import queue
+    from QuotePoller import QuotePoller
+    grid = [(o['instrument'], o['side'], o['quantity']) for o in _orders(args)]
+    quotes = queue.SimpleQueue()
+    poller = QuotePoller(rH, grid, interval=args.poll)
+    poller.subscribe(lambda q: quotes.put({f: q[f] for f in _quoteFields}))
+    poller.start()
+    try:
+        emitted = 0
+        while not args.count or emitted < args.count:
+            _emit(quotes.get())
+            emitted += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
+    return 0
+
+
+def trade(args, rH):
+    from TradeScheduler import TradeScheduler
+    scheduler = TradeScheduler(rH)
+    failed = 0
+    for order, data, error in _stream(lambda o: scheduler.execute(o['instrument'], o['side'], o['quantity']),
+                                      _orders(args), args.workers):
+        if error is not None or data is None:
+            failed += 1
+            _emit(dict(order, status='failed', error=str(error) if error else None))
+        else:
+            _emit(dict(order, status='filled', order=data))
+    return 1 if failed else 0
+
+
+def sliceOrder(args, rH):
+    """
+    Executes one order in slices within the account's limits, prints one JSON line per slice then the summary with
+    its volume weighted average price.
+    """
+    from OrderSlicer import OrderSlicer
+    report = OrderSlicer(rH, workers=args.workers).execute(args.instrument, args.side, args.quantity,
+                                                           count=args.slices, duration=args.duration)
+    for child in report.pop('slices'):
+        _emit(child)
+    _emit(report)
+    return 1 if report['failed'] else 0
+
+
+def balances(args, rH):
+    if args.currencies:
+        for ccy in args.currencies:
+            _emit(rH.getBalances(ccy) or {ccy: None})
+    else:
+        _emit(rH.getBalances())
+    return 0
+
+
+def trades(args, rH):
+    for data in rH.iterTrades(since=args.since):
+        _emit(data)
+    return 0
+
+
+def analytics(args, rH):
+    """
+    Prints P&L, slippage against RFQ prices and volume per day over the trade history, one JSON line per instrument
+    (and day), tagged with its report. The history is read from the --cache directory when there is one, else
+    downloaded and cached there.
+    """
+    import os
+    from TradeAnalytics import TradeAnalytics, journalPrices
+    rfqPrices = journalPrices(*args.journal) if args.journal else {}
+    if args.cache and os.path.exists(args.cache) and not args.refresh:
+        tA = TradeAnalytics.load(args.cache)
+        if rfqPrices:
+            tA.joinRFQPrices(rfqPrices)
+    else:
+        tA = TradeAnalytics.fromTrades(rH.iterTrades(), rfqPrices)
+        if args.cache:
+            tA.save(args.cache)
+    for instrument, pnl in tA.pnl().items():
+        _emit(dict(pnl, report='pnl', instrument=instrument))
+    for instrument, slippage in tA.slippage().items():
+        _emit(dict(slippage, report='slippage', instrument=instrument))
+    for volume in tA.volumeByDay():
+        _emit(dict(volume, report='volume'))
+    return 0
+
+
+def batch(args, rH):
+    """
+    Executes every order of a basket file and prints one JSON line per order, then a summary line.
+    """
+    from BatchExecutor import BatchExecutor
+    bE = BatchExecutor(rH, workers=args.workers)
+    report = bE.execute(bE.load(args.path))
+    for order in report.pop('orders'):
+        _emit(order)
+    _emit(report)
+    return 1 if report['failed'] else 0
+
+
+def accounts(args):
+    """
+    Executes the basket of every account of a config file (see requestConstants.loadConfig), one process per account,
+    and prints each account's summary then the aggregate.
+    """
+    from MultiAccountRunner import MultiAccountRunner
+    from requestConstants import loadConfig
+    config = loadConfig(args.config)
+    runner = MultiAccountRunner(config['accounts'], baseURL=args.base_url or config['baseURL'], workers=args.workers,
+                                processes=args.processes, riskChecks=not args.no_risk, rateLimit=True)
+    report = runner.run()
+    failed = report['filled'] < report['orders']
+    for account in report.pop('accounts'):
+        account.pop('orders', None)
+        failed = failed or 'error' in account
+        _emit(account)
+    _emit(report)
+    return 1 if failed else 0
+
+
+def interactive(args, rH):
+    """
+    Prompts for one order, shows the quote and trades it once confirmed.
+    """
+    import pprint
     try:
         print('Welcome to Text Based Trading Tool for .')
         instrument = input("Which instrument do you want to trade?")
         side = input("Do you want to buy or sell them?")
         quantity = input("How many units to trade?")
-        rH = RequestHandler()
         rfq = rH.RFQ(instrument, side, quantity)
         pprint.pprint(rfq)
         inTrade = input("Do you wish to trade? (y/n)")
@@ -31,9 +260,112 @@ def main():
             print('Thank you for trading. Goodbye!')
     except RuntimeError as e:
         logger.critical("Trade failed: %s" % e)
+    return 0
+
+
+def _positive(value):
+    """
+    argparse type of counts, an int of at least 1.
+    """
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise argparse.ArgumentTypeError('%r is not a positive integer' % value)
+    return count
+
+
+def _parser():
+    parser = argparse.ArgumentParser(description="Primitive Text Based Trading Tool")
+    parser.add_argument("--base-url", help="API base URL, defaults to baseAPI")
+    parser.add_argument("--order-journal", default="orders.db", help="order journal file")
+    parser.add_argument("--no-risk", action="store_true", help="skip local pre-trade risk checks")
+    parser.add_argument("--log-level", default="WARNING", help="logging level, logs go to stderr")
+    parser.add_argument("--profile", metavar="FILE", help="profile the run, sampled stacks are written to FILE")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    for name, func, help in (("quote", quote, "request quotes"), ("trade", trade, "quote and trade orders")):
+        command = commands.add_parser(name, help=help + ", from stdin if no order is given")
+        command.add_argument("instrument", nargs="?")
+        command.add_argument("side", nargs="?", choices=["buy", "sell"])
+        command.add_argument("quantity", nargs="?")
+        command.add_argument("--workers", type=int, default=4, help="orders processed concurrently")
+        command.set_defaults(func=func)
+    commands.choices["quote"].add_argument("--poll", type=float, help="keep requesting quotes every POLL seconds")
+    commands.choices["quote"].add_argument("--count", type=int, help="stop polling after COUNT quotes")
+
+    command = commands.add_parser("slice", help="trade an order in slices within the max quantity per trade")
+    command.add_argument("instrument")
+    command.add_argument("side", choices=["buy", "sell"])
+    command.add_argument("quantity")
+    command.add_argument("--slices", type=_positive, default=1, help="slices wanted, more if the limits require it")
+    command.add_argument("--duration", type=float, help="spread the slices evenly over DURATION seconds (TWAP)")
+    command.add_argument("--workers", type=int, default=4, help="slices executed concurrently")
+    command.set_defaults(func=sliceOrder)
+
+    command = commands.add_parser("balances", help="show balances")
+    command.add_argument("currencies", nargs="*")
+    command.set_defaults(func=balances)
+
+    command = commands.add_parser("trades", help="stream executed trades")
+    command.add_argument("--since", help="only trades created at or after this timestamp")
+    command.set_defaults(func=trades)
+
+    command = commands.add_parser("analytics", help="P&L, slippage and volume per day over the trade history")
+    command.add_argument("--cache", help="directory the trade history is cached in and memory-mapped from")
+    command.add_argument("--refresh", action="store_true", help="download the trade history even if cached")
+    command.add_argument("--journal", action="append", help="request journal to read RFQ prices from, repeatable")
+    command.set_defaults(func=analytics)
+
+    command = commands.add_parser("batch", help="execute a CSV, JSON or JSONL basket of instrument, side, quantity")
+    command.add_argument("path")
+    command.add_argument("--workers", type=int, default=10, help="orders executed concurrently")
+    command.set_defaults(func=batch)
+
+    command = commands.add_parser("accounts", help="execute the basket of every account, one process per account")
+    command.add_argument("config", nargs="?", help="accounts file, defaults to $API_CONFIG or $API_TOKEN")
+    command.add_argument("--workers", type=int, default=10, help="orders executed concurrently per account")
+    command.add_argument("--processes", type=int, help="worker processes, defaults to one per account")
+    command.set_defaults(func=accounts)
+
+    command = commands.add_parser("bench", help="run benchmarks, arguments are passed on to benchmark.py",
+                                  add_help=False)
+    command.set_defaults(func=None)
+
+    command = commands.add_parser("interactive", help="prompt for one order")
+    command.set_defaults(func=interactive)
+    return parser
+
+
+def main(argv=None):
+    parser = _parser()
+    args, rest = parser.parse_known_args(argv)
+    if args.command == "bench":
+        import benchmark
+        benchmark.main(rest, prog="main.py bench")
+        return 0
+    if rest:
+        parser.error("unrecognized arguments: %s" % " ".join(rest))
+    if args.command is None:
+        parser.print_help()
+        return 2
+    logging.basicConfig(stream=sys.stderr, level=args.log_level.upper())
+    if args.command == "accounts":
+        return accounts(args)
+    rH = _handler(args, poolSize=args.workers) if hasattr(args, "workers") else _handler(args)
+    previous = signal.signal(signal.SIGUSR1, rH.profilingSignalHandler()) if hasattr(signal, "SIGUSR1") else None
+    if args.profile:
+        rH.enableProfiling(sampling=True, path=args.profile)
+    try:
+        return args.func(args, rH)
+    finally:
+        if rH.isProfiling():
+            sys.stderr.write(json.dumps(rH.disableProfiling(), default=_default) + '\n')
+        if previous is not None:
+            signal.signal(signal.SIGUSR1, previous)
+        rH.close()
 
 
 if __name__ == "__main__":
-    logging.basicConfig()
-    logging.getLogger("").setLevel(logging.INFO)
-    main()
+    sys.exit(main())
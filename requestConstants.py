@@ -1,12 +1,84 @@
-apiToken = '' #add a token
-assert apiToken, "'apiToken' missing in Constants. Please add an apiToken above."
+import json
+import os
+
+import requests
+
+# account defaults, read from the environment rather than edited here. See loadConfig for several accounts.
+apiToken = os.environ.get('API_TOKEN', '')
+baseAPI = os.environ.get('API_BASE_URL', 'https://api.uat..net')  # could be change to Prod as part of go live
+
+poolSize = 10  # keep-alive connections kept open per host
+
+# (connect, read) timeouts in seconds per endpoint, 'default' is used for anything not listed
+timeouts = {
+    'default': (3.05, 10),
+    '/request_for_quote/': (3.05, 5),
+    '/order/': (3.05, 10),
+    '/trade/': (3.05, 30),
+}
+
+# client side rate limiting, see RateLimiter. Anything not listed in endpointClasses is a 'reads' endpoint.
+endpointClasses = {'/request_for_quote/': 'quotes', '/order/': 'orders'}
+rateLimits = {'orders': (10, 20), 'quotes': (20, 40), 'reads': (5, 10)}  # (requests per second, burst)
+concurrencyLimits = (4, 1, 32)  # initial, minimum and maximum requests in flight
+readRetries = 2  # times a GET is retried after a 408, 500 or 503
+retryBackoff = 0.1  # seconds before the first retry, doubling on each retry
+
+# circuit breaker per endpoint, see CircuitBreaker
+breakerThreshold = 0.5  # share of failed requests in the window that opens the circuit
+breakerMinRequests = 10  # requests in the window before the error rate is considered
+breakerWindow = 10.0  # seconds of requests the error rate is computed over
+breakerCooldown = 5.0  # seconds an open circuit fails fast before letting a probe through
+
+minLatencySamples = 20  # /order/ round trips measured before they are used to decide if a quote is still tradable
+requoteRetries = 3  # times TradeScheduler re-quotes after an expired or rejected quote
+requoteBackoff = 0.05  # seconds TradeScheduler waits before the first re-quote, doubling on each retry
+
+quantityStep = '0.0001'  # smallest quantity increment, the API rejects more decimals with 1015
+
+quotePollInterval = 1.0  # seconds between rounds of RFQs in QuotePoller
+
+ledgerReconcileInterval = 300  # seconds between /balance/ fetches reconciling the position ledger
+ledgerDriftTolerance = '0.00000001'  # balance difference with /balance/ reported as drift
+
+journalMaxBytes = 64 * 1024 * 1024  # request journal is rotated once it reaches this size
+journalBackups = 5  # rotated request journals kept
+
+# seconds reference data is served from cache before it is fetched again
+referenceTTLs = {
+    '/instruments/': 3600,
+    '/currency/': 3600,
+    '/account_info/': 5,
+}
+
+
+def loadConfig(path=None):
+    """
+    Reads the accounts to trade for from a JSON file, path or else $API_CONFIG, of the form
+    {"baseURL": ..., "accounts": [{"name": ..., "apiToken": ..., "basket": ...}, ...]}.
+    Without a file, the only account is one using $API_TOKEN.
+    Raises ValueError if an account has no apiToken or no basket, as is the case of that default account.
+    """
+    path = path or os.environ.get('API_CONFIG')
+    if path:
+        with open(path) as f:
+            config = json.load(f)
+    else:
+        config = {'accounts': [{'name': 'default', 'apiToken': apiToken}]}
+    config.setdefault('baseURL', baseAPI)
+    for i, account in enumerate(config['accounts']):
+        account.setdefault('name', 'account%d' % (i + 1))
+        if not account.get('apiToken'):
+            raise ValueError("'apiToken' missing for account %s." % account['name'])
+        if not account.get('basket'):
+            raise ValueError("'basket' missing for account %s." % account['name'])
+    return config
 
-baseAPI = 'https://api.uat..net'  # could be change to Prod as part of go live
 
 # https://en.wikipedia.org/wiki/List_of_HTTP_status_codes
 errors = {
     400: 'Bad Request –- Incorrect parameters.',
-    401: 'Unauthorized – Wrong Token apiToken %s.' % apiToken,
+    401: 'Unauthorized – Wrong Token apiToken.',
     403: 'Forbidden: add your external IP address to allow list.',
     404: 'Not Found – The specified endpoint could not be found.. Please check documentation https://docs..com.',
     405: 'Method Not Allowed – You tried to access an endpoint with an invalid method. Please check documentation '
@@ -47,11 +119,55 @@ errors = {
     1100: 'Other error.'
 }
 
-APIErrors = {}
+# errors worth trying again later, anything else in errors is fatal for the request that got it
+retriableErrors = frozenset((408, 500, 503, 1007, 1009, 1016, 1018, 1021, 1200))
+
+# errors telling us the API is down for everyone, they open the circuit breaker of the endpoint straight away
+maintenanceErrors = frozenset((1016, 1200))
 
 
 class APIError(Exception):
     """
-    Empty class to throw API errors
+    Class to throw API errors, raised with the error code and its message from errors
     """
-    pass
+    retriable = False
+
+    @property
+    def code(self):
+        return self.args[0] if self.args else None
+
+
+class RetriableAPIError(APIError):
+    """
+    The API could not serve the request now but may later: overloaded, in maintenance, or the quote moved on.
+    """
+    retriable = True
+
+
+class FatalAPIError(APIError):
+    """
+    The request itself was refused and sending it again will not help.
+    """
+
+
+class CircuitOpenError(RetriableAPIError):
+    """
+    Raised locally, without a request, while the circuit breaker of the endpoint is open.
+    """
+
+
+def _errorClass(code):
+    """
+    Builds the class raised for code: retriable or fatal, and for HTTP statuses also the requests exception it used
+    to be (HTTPError for 4xx, ConnectionError for 5xx) so existing handlers keep catching it.
+    """
+    bases = (RetriableAPIError,) if code in retriableErrors else (FatalAPIError,)
+    if 400 <= code < 500:
+        bases += (requests.exceptions.HTTPError,)
+    elif 500 <= code < 600:
+        bases += (requests.exceptions.ConnectionError,)
+    return type('APIError%d' % code, bases, {'__doc__': errors[code], '__module__': __name__})
+
+
+# error class per code, e.g. except APIErrors[1007] or except RetriableAPIError
+APIErrors = {code: _errorClass(code) for code in errors}
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from json import dumps
+from mock import patch
+from AsyncRequestHandler import AsyncRequestHandler
+from unittest import TestCase
+
+
+def _quote(url, json, timeout):
+    time.sleep(0.1)
+    response = type('Response', (), {})()
+    response.status_code = 200
+    response.content = dumps(dict(json, rfq_id=json['client_rfq_id'], price='1.00000000',
+                                  valid_until='2020-02-28T11:41:30.023467Z')).encode()
+    return response
+
+
+class TestAsyncRequestHandler(TestCase):
+    def test_getBalances(self):
+        with patch('requests.Session.get') as mRequest:
+            mRequest.return_value.status_code = 200
+            mRequest.return_value.content = dumps({"USD": "0"}).encode()
+
+            async def run():
+                async with AsyncRequestHandler() as rH:
+                    return await rH.getBalances("USD")
+            self.assertEqual(asyncio.run(run()), {"USD": "0"})
+
+    def test_gatherRFQs(self):
+        get = [{"name": "BTCUSD.SPOT"}, {"name": "ETHUSD.SPOT"}, {"name": "BTCEUR.SPOT"}]
+        with patch('requests.Session.get') as mGet:
+            with patch('requests.Session.post', side_effect=_quote):
+                mGet.return_value.status_code = 200
+                mGet.return_value.content = dumps(get).encode()
+
+                async def run():
+                    async with AsyncRequestHandler() as rH:
+                        return await rH.gatherRFQs([("BTCUSD.SPOT", "buy", "1"),
+                                                    ("ETHUSD.SPOT", "sell", "2"),
+                                                    ("BTCEUR.SPOT", "buy", "3")])
+                start = time.perf_counter()
+                quotes = asyncio.run(run())
+                self.assertLess(time.perf_counter() - start, 0.25)
+                self.assertEqual([q['instrument'] for q in quotes], ["BTCUSD.SPOT", "ETHUSD.SPOT", "BTCEUR.SPOT"])
+                self.assertEqual(mGet.call_count, 1)
+
+    def test_gatherRFQs_invalid(self):
+        get = [{"name": "BTCUSD.SPOT"}]
+        with patch('requests.Session.get') as mGet:
+            with patch('requests.Session.post', side_effect=_quote):
+                mGet.return_value.status_code = 200
+                mGet.return_value.content = dumps(get).encode()
+
+                async def run():
+                    async with AsyncRequestHandler() as rH:
+                        return await rH.gatherRFQs([("BTCUSD.SPOT", "buy", "1"), ("XRPUSD.SPOT", "buy", "1")])
+                quotes = asyncio.run(run())
+                self.assertEqual(quotes[0]['instrument'], "BTCUSD.SPOT")
+                self.assertIsInstance(quotes[1], ValueError)
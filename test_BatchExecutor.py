@@ -0,0 +1,56 @@
+import os
+import tempfile
+from BatchExecutor import BatchExecutor
+from MockExchange import MockExchange
+from RequestHandler import RequestHandler
+from unittest import TestCase
+
+
+class TestBatchExecutor(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+        self.rH = RequestHandler(baseURL=self.server.baseURL)
+        self.bE = BatchExecutor(self.rH, workers=4)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.rH.close()
+        self.server.stop()
+
+    def test_load(self):
+        csvPath = os.path.join(self.dir, 'basket.csv')
+        with open(csvPath, 'w') as f:
+            f.write('instrument,side,quantity\nBTCUSD.SPOT, Buy ,1\nETHUSD.SPOT,sell,2.5\n')
+        jsonlPath = os.path.join(self.dir, 'basket.jsonl')
+        with open(jsonlPath, 'w') as f:
+            f.write('{"instrument": "BTCUSD.SPOT", "side": "buy", "quantity": 1}\n'
+                    '{"instrument": "ETHUSD.SPOT", "side": "sell", "quantity": "2.5"}\n')
+        expected = [{'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1'},
+                    {'instrument': 'ETHUSD.SPOT', 'side': 'sell', 'quantity': '2.5'}]
+        self.assertEqual(self.bE.load(csvPath), expected)
+        self.assertEqual(self.bE.load(jsonlPath), expected)
+        jsonPath = os.path.join(self.dir, 'basket.json')
+        with open(jsonPath, 'w') as f:
+            f.write('[{"instrument": "BTCUSD.SPOT", "side": "buy", "quantity": 1},\n'
+                    ' {"instrument": "ETHUSD.SPOT", "side": "sell", "quantity": "2.5"}]\n')
+        self.assertEqual(self.bE.load(jsonPath), expected)
+
+    def test_validate(self):
+        basket = [{'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1'},
+                  {'instrument': 'DOGEUSD.SPOT', 'side': 'buy', 'quantity': '1'},
+                  {'instrument': 'ETHUSD.SPOT', 'side': 'hold', 'quantity': '1'}]
+        with self.assertRaises(ValueError) as e:
+            self.bE.execute(basket)
+        self.assertIn('order 2', str(e.exception))
+        self.assertIn('order 3', str(e.exception))
+        self.assertEqual(self.server.trades, [])
+
+    def test_execute(self):
+        basket = [{'instrument': i, 'side': 'buy', 'quantity': q}
+                  for i, q in (('XRPUSD.SPOT', '10'), ('BTCUSD.SPOT', '1'), ('XRPUSD.SPOT', '20'),
+                               ('ETHUSD.SPOT', '1'), ('XRPUSD.SPOT', '30'))]
+        report = self.bE.execute(basket)
+        self.assertEqual(report['filled'], len(basket))
+        self.assertEqual([o['instrument'] for o in report['orders']], [o['instrument'] for o in basket])
+        xrp = [t for t in self.server.trades if t['instrument'] == 'XRPUSD.SPOT']
+        self.assertEqual([t['quantity'] for t in xrp], ['10.0000000000', '20.0000000000', '30.0000000000'])
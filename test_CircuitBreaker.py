@@ -0,0 +1,78 @@
+import requests
+import time
+from CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from Metrics import Metrics
+from MockExchange import MockExchange
+from RequestHandler import RequestHandler
+from requestConstants import APIErrors, CircuitOpenError, FatalAPIError, RetriableAPIError
+from unittest import TestCase
+
+
+class TestCircuitBreaker(TestCase):
+    def test_errorRate(self):
+        metrics = Metrics()
+        cB = CircuitBreaker('/balance/', threshold=0.5, minRequests=4, window=10, cooldown=0.05, metrics=metrics)
+        for code in (200, 503, 1010, 200, None):
+            cB.before()
+            cB.record(code)
+        self.assertEqual(cB.state, CLOSED)
+        cB.before()
+        cB.record(500)
+        self.assertEqual(cB.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            cB.before()
+        time.sleep(0.06)
+        cB.before()
+        self.assertEqual(cB.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            cB.before()  # a single probe at a time
+        cB.record(None)
+        self.assertEqual(cB.state, OPEN)
+        time.sleep(0.06)
+        cB.before()
+        cB.record(200)
+        self.assertEqual(cB.state, CLOSED)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['circuits'], {'/balance/': 'closed'})
+        self.assertEqual(snapshot['counters']['circuit_open'], 2)
+        self.assertEqual(snapshot['counters']['circuit_rejected'], 2)
+        self.assertIn('circuit_open{endpoint="/balance/"} 0', metrics.prometheus())
+
+    def test_window(self):
+        cB = CircuitBreaker('/balance/', threshold=0.6, minRequests=3, window=0.05)
+        cB.record(503)
+        time.sleep(0.06)
+        cB.record(503)
+        cB.record(200)
+        self.assertEqual(cB.state, CLOSED)
+
+    def test_maintenance(self):
+        cB = CircuitBreaker('/order/')
+        cB.record(1200)
+        self.assertEqual(cB.state, OPEN)
+
+    def test_errors(self):
+        self.assertTrue(issubclass(APIErrors[400], requests.exceptions.HTTPError))
+        self.assertTrue(issubclass(APIErrors[400], FatalAPIError))
+        self.assertTrue(issubclass(APIErrors[503], requests.exceptions.ConnectionError))
+        self.assertTrue(APIErrors[503].retriable)
+        self.assertTrue(issubclass(APIErrors[1007], RetriableAPIError))
+        self.assertFalse(APIErrors[1010].retriable)
+        self.assertEqual(APIErrors[1010](1010, 'Quantity too big').code, 1010)
+
+    def test_requestHandler(self):
+        server = MockExchange().start()
+        rH = RequestHandler(baseURL=server.baseURL)
+        try:
+            server.failNext(1200, '/balance/')
+            with self.assertRaises(APIErrors[1200]):
+                rH.getBalances()
+            requests = server.requests
+            with self.assertRaises(CircuitOpenError):
+                rH.getBalances()
+            self.assertEqual(server.requests, requests)
+            self.assertEqual(rH.getMetrics()['circuits'], {'/balance/': 'open'})
+            self.assertIn('ETHUSD.SPOT', rH._getInstruments())
+        finally:
+            rH.close()
+            server.stop()
@@ -0,0 +1,35 @@
+import time
+from JournalReplay import ReplayServer, replay
+from unittest import TestCase
+
+records = [
+    {'ts': 0.0, 'method': 'GET', 'endpoint': '/balance/', 'payload': None, 'status': 200,
+     'latency_ns': 20000000, 'response': {"USD": "0"}},
+    {'ts': 0.05, 'method': 'POST', 'endpoint': '/order/', 'payload': {"client_order_id": "a"}, 'status': 400,
+     'latency_ns': 1000000, 'response': {"errors": []}},
+    {'ts': 0.06, 'method': 'GET', 'endpoint': '/trade/', 'payload': None, 'status': None, 'latency_ns': None,
+     'response': None},
+]
+
+
+class TestJournalReplay(TestCase):
+    def test_replay(self):
+        server = ReplayServer(records).start()
+        try:
+            start = time.perf_counter()
+            summary = replay(records, server.baseURL)
+            elapsed = time.perf_counter() - start
+        finally:
+            server.stop()
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['mismatches'], [])
+        self.assertGreaterEqual(summary['latency_ns'][0], 20000000)
+        self.assertGreaterEqual(elapsed, 0.05)
+
+    def test_exhausted(self):
+        server = ReplayServer(records[:1]).start()
+        try:
+            summary = replay(records[:1] * 2, server.baseURL)
+        finally:
+            server.stop()
+        self.assertEqual(summary['mismatches'], [{'endpoint': '/balance/', 'status': 404, 'journaled_status': 200}])
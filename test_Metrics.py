@@ -0,0 +1,50 @@
+import requests
+from mock import patch
+from Metrics import Histogram, Metrics, measureOverhead
+from RequestHandler import RequestHandler
+from unittest import TestCase
+
+
+class TestMetrics(TestCase):
+    def test_histogram(self):
+        h = Histogram()
+        for value in range(1, 100001):
+            h.record(value * 1000)
+        snapshot = h.snapshot()
+        self.assertEqual(snapshot['count'], 100000)
+        self.assertEqual(snapshot['min'], 1000)
+        self.assertEqual(snapshot['max'], 100000000)
+        self.assertAlmostEqual(snapshot['p50'], 50000000, delta=50000000 / 32)
+        self.assertAlmostEqual(snapshot['p99'], 99000000, delta=99000000 / 32)
+        self.assertAlmostEqual(snapshot['p999'], 99900000, delta=99900000 / 32)
+
+    def test_histogram_empty(self):
+        self.assertIsNone(Histogram().snapshot()['p99'])
+
+    def test_prometheus(self):
+        m = Metrics()
+        m.observe('/order/', 2097152)
+        m.increment('rfq_out_of_date')
+        text = m.prometheus()
+        self.assertIn('request_latency_seconds{endpoint="/order/",quantile="0.99"} 0.002097152', text)
+        self.assertIn('request_latency_seconds_count{endpoint="/order/"} 1', text)
+        self.assertIn('rfq_out_of_date_total 1', text)
+        server = m.serve(port=0)
+        try:
+            response = requests.get('http://127.0.0.1:%d/metrics' % server.server_port)
+            self.assertEqual(response.text, m.prometheus())
+        finally:
+            m.close()
+
+    def test_requestHandler(self):
+        with patch('requests.Session.get') as mRequest:
+            mRequest.return_value.status_code = 1007
+            rH = RequestHandler()
+            with self.assertRaises(Exception):
+                rH._requestHandler('/balance/')
+            snapshot = rH.getMetrics()
+            self.assertEqual(snapshot['latency_ns']['/balance/']['count'], 1)
+            self.assertEqual(snapshot['counters'], {'api_error_1007': 1})
+
+    def test_overhead(self):
+        self.assertLess(measureOverhead(10000), 20000)
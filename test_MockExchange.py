@@ -0,0 +1,158 @@
+import os
+import requests
+import shutil
+import tempfile
+import time
+import benchmark
+from mock import patch
+from MockExchange import MockExchange
+from RequestHandler import RequestHandler
+from requestConstants import APIError
+from unittest import TestCase
+
+
+class TestMockExchange(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+        self.rH = RequestHandler(baseURL=self.server.baseURL)
+
+    def tearDown(self):
+        self.rH.close()
+        self.server.stop()
+
+    def test_rfqAndTrade(self):
+        quote = self.rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+        self.assertEqual(quote['price'], '10000.00000000')
+        order = self.rH.trade()
+        self.assertEqual(order['executed_price'], '10000.00000000')
+        self.assertEqual(float(self.rH.getBalances('BTC')['BTC']), 101)
+        self.assertEqual(len(self.rH.getAllTrades()), 1)
+        self.assertEqual(self.rH.getConnectionStats()['new'], 1)
+
+    def test_quoteBook(self):
+        quote = self.rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+        self.assertEqual(self.rH.getQuote(quote['client_rfq_id']).rfq_id, quote['rfq_id'])
+        self.assertIsNone(self.rH.discardQuote(None))
+        self.assertEqual(self.rH.discardQuote(quote['rfq_id']).rfq_id, quote['rfq_id'])
+        self.assertIsNone(self.rH.getQuote(quote['rfq_id']))
+        self.assertIsNone(self.rH.trade())
+
+    def test_ledger(self):
+        self.assertEqual(self.rH.getBalances('BTC'), {'BTC': '100'})
+        for _ in range(3):
+            self.rH.RFQ('BTCUSD.SPOT', 'sell', '1')
+            self.rH.trade()
+        self.assertEqual(self.rH.getBalances('BTC'), {'BTC': '97.0000000000'})
+        self.assertEqual(self.rH.getMetrics()['latency_ns']['/balance/']['count'], 1)
+        self.assertEqual(float(self.rH.getBalances(refresh=True)['USD']), 1030000)
+        self.assertNotIn('ledger_drift', self.rH.getMetrics()['counters'])
+
+    def test_orderJournal(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'orders.db')
+        rH = RequestHandler(baseURL=self.server.baseURL, orderJournalPath=path)
+        post = rH._transport.post
+
+        def lostRequest(request, post_data):
+            raise requests.exceptions.ConnectionError
+
+        def lostResponse(request, post_data):
+            post(request, post_data)
+            raise requests.exceptions.ReadTimeout
+
+        try:
+            for failure in (lostRequest, lostResponse):
+                rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+                with patch.object(rH._transport, 'post', side_effect=failure):
+                    with self.assertRaises(requests.exceptions.RequestException):
+                        rH.trade()
+            first, second = [o['client_order_id'] for o in rH._orders.unresolved()]
+            # the first never reached the exchange and is sent again, the second executed and is left to the restart
+            with patch.object(rH, 'reconcileOrders'):
+                self.assertEqual(rH.retryOrder(first)['state'], 'filled')
+            self.assertEqual(len(self.server.trades), 2)
+            rH.close()
+            rH = RequestHandler(baseURL=self.server.baseURL, orderJournalPath=path)
+            self.assertEqual(rH._orders.get(second)['state'], 'filled')
+            self.assertEqual(sorted(rH._trades), sorted([first, second]))
+            self.assertEqual(rH.retryOrder(first)['state'], 'filled')
+            self.assertEqual(len(self.server.trades), 2)
+        finally:
+            rH.close()
+            shutil.rmtree(directory)
+
+    def test_retryOrder_nullRfq(self):
+        directory = tempfile.mkdtemp()
+        rH = RequestHandler(baseURL=self.server.baseURL, orderJournalPath=os.path.join(directory, 'orders.db'))
+        post = rH._transport.post
+
+        def lostResponse(request, post_data):
+            post(request, post_data)
+            raise requests.exceptions.ReadTimeout
+
+        try:
+            rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+            with patch.object(rH._transport, 'post', side_effect=lostResponse):
+                with self.assertRaises(requests.exceptions.RequestException):
+                    rH.trade()
+            self.server.trades[-1]['rfq_id'] = 'null'
+            client_order_id = rH._orders.unresolved()[0]['client_order_id']
+            self.assertIsNone(rH.retryOrder(client_order_id))
+            self.assertEqual(rH._orders.get(client_order_id)['state'], 'unknown')
+            self.assertEqual(len(self.server.trades), 1)
+        finally:
+            rH.close()
+            shutil.rmtree(directory)
+
+    def test_reference(self):
+        self.assertIn('ETHUSD.SPOT', self.rH._getInstruments())
+        self.assertEqual(self.rH.getCurrencies()['BTC']['minimum_trade_size'], 0.001)
+        self.assertEqual(self.rH.getAccountInfo()['btc_max_qty_per_trade'], '100')
+
+    def test_referenceSnapshot(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'reference.json')
+        rH = RequestHandler(baseURL=self.server.baseURL, snapshotPath=path)
+        rH._getInstruments()
+        rH.close()
+        self.assertTrue(os.path.exists(path))
+        sent = self.server.requests
+        rH = RequestHandler(baseURL=self.server.baseURL, snapshotPath=path)
+        self.assertIn('ETHUSD.SPOT', rH._getInstruments())
+        rH.close()
+        self.assertEqual(self.server.requests, sent)
+        shutil.rmtree(directory)
+
+    def test_apiErrors(self):
+        with self.assertRaises(APIError) as e:
+            self.rH.RFQ('BTCUSD.SPOT', 'buy', '1000')
+        self.assertEqual(e.exception.code, 1010)
+        with self.assertRaises(APIError) as e:
+            self.rH.RFQ('BTCUSD.SPOT', 'buy', '1.00001')
+        self.assertEqual(e.exception.code, 1015)
+        self.server.failNext(1200)
+        with self.assertRaises(APIError) as e:
+            self.rH.getBalances()
+        self.assertEqual(e.exception.code, 1200)
+
+    def test_httpErrors(self):
+        self.server.failNext(400, '/balance/')
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.rH.getBalances()
+        self.assertIsNotNone(self.rH.getBalances())
+
+    def test_expiry(self):
+        self.server.quoteValidity = 0.2
+        quote = self.rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+        # the client still believes the quote is live, the exchange does not
+        self.rH._quotes.get(quote['rfq_id']).expires += 10
+        time.sleep(0.25)
+        with self.assertRaises(APIError) as e:
+            self.rH.trade()
+        self.assertEqual(e.exception.code, 1007)
+
+    def test_benchmark(self):
+        results = benchmark.benchPooled(self.server.baseURL, 5, 2)
+        self.assertEqual(results['rfq']['ops'], 5)
+        results = benchmark.benchConcurrent(self.server.baseURL, 5, 2)
+        self.assertEqual(results['rfq_trade']['ops'], 5)
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+from MockExchange import MockExchange
+from MultiAccountRunner import MultiAccountRunner, SharedSnapshot
+from requestConstants import loadConfig
+from unittest import TestCase
+
+
+class TestMultiAccountRunner(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_sharedSnapshot(self):
+        snapshot = {'saved': 1.0, 'data': {'/instruments/': [{'name': 'BTCUSD.SPOT'}]}}
+        shared = SharedSnapshot.create(snapshot)
+        try:
+            self.assertEqual(SharedSnapshot.read(shared.name), snapshot)
+        finally:
+            shared.close()
+
+    def test_loadConfig(self):
+        path = os.path.join(tempfile.mkdtemp(), 'accounts.json')
+        with open(path, 'w') as f:
+            json.dump({'accounts': [{'apiToken': 'a', 'basket': 'a.csv'},
+                                    {'name': 'desk', 'apiToken': 'b', 'basket': 'b.csv'}]}, f)
+        config = loadConfig(path)
+        self.assertEqual([a['name'] for a in config['accounts']], ['account1', 'desk'])
+        self.assertIn('baseURL', config)
+        with open(path, 'w') as f:
+            json.dump({'accounts': [{'name': 'desk', 'basket': 'b.csv'}]}, f)
+        with self.assertRaises(ValueError):
+            loadConfig(path)
+        with open(path, 'w') as f:
+            json.dump({'accounts': [{'name': 'desk', 'apiToken': 'b'}]}, f)
+        with self.assertRaisesRegex(ValueError, 'basket'):
+            loadConfig(path)
+
+    def test_run(self):
+        accounts = [{'name': 'account%d' % i, 'apiToken': 'token%d' % i,
+                     'basket': [{'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1'},
+                                {'instrument': 'ETHUSD.SPOT', 'side': 'sell', 'quantity': str(i + 1)}]}
+                    for i in range(2)]
+        report = MultiAccountRunner(accounts, baseURL=self.server.baseURL, workers=2, processes=2).run()
+        self.assertEqual((report['orders'], report['filled']), (4, 4))
+        self.assertEqual([r['account'] for r in report['accounts']], ['account0', 'account1'])
+        self.assertEqual(len(self.server.trades), 4)
+        for r in report['accounts']:
+            # instruments and currencies came from the shared snapshot
+            self.assertEqual(r['reference_fetches']['/instruments/'], 0)
+            self.assertEqual(r['reference_fetches']['/currency/'], 0)
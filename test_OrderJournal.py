@@ -0,0 +1,81 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+from OrderJournal import OrderJournal
+from unittest import TestCase
+
+
+def _order(client_order_id, seconds=10):
+    valid_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+    return {'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1.0000000000', 'price': '700.00000000',
+            'client_order_id': client_order_id, 'order_type': 'FOK',
+            'valid_until': valid_until.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'acceptable_slippage_in_basis_points': '0.00'}
+
+
+def _trade(rfq_id, order, price='700.00000000', quantity='1.0000000000', seconds=-2):
+    created = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+    return {'created': created.strftime('%Y-%m-%dT%H:%M:%S.%fZ'), 'price': price, 'instrument': 'BTCUSD.SPOT',
+            'trade_id': 'trade_' + order, 'origin': 'rest', 'rfq_id': rfq_id, 'quantity': quantity, 'order': order,
+            'side': 'buy', 'user': 'Some User'}
+
+
+class TestOrderJournal(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'orders.db')
+        self.oJ = OrderJournal(self.path)
+
+    def tearDown(self):
+        self.oJ.close()
+        shutil.rmtree(self.directory)
+
+    def test_intent(self):
+        order = _order('a')
+        self.oJ.intent(order, 'rfq_a')
+        self.oJ.intent(_order('a', 20), 'rfq_a')
+        self.assertEqual(self.oJ.get('a')['state'], 'pending')
+        self.assertEqual(self.oJ.get('a')['payload'], order)
+        self.oJ.outcome('a', 'filled', 'order_a', '700.00000000')
+        self.oJ.close()
+        self.oJ = OrderJournal(self.path)
+        order = self.oJ.get('a')
+        self.assertEqual((order['state'], order['order_id']), ('filled', 'order_a'))
+        self.assertIsNone(self.oJ.get('b'))
+        self.assertEqual(self.oJ.unresolved(), [])
+
+    def test_groupCommit(self):
+        threads = [threading.Thread(target=self.oJ.intent, args=(_order(str(i)),)) for i in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.oJ.unresolved()), 50)
+
+    def test_reconcile(self):
+        self.oJ.intent(_order('filled'), 'rfq_filled')
+        self.oJ.intent(_order('expired', -1), 'rfq_expired')
+        self.oJ.intent(_order('live'), 'rfq_live')
+        for client_order_id in ('filled', 'expired', 'live'):
+            self.oJ.outcome(client_order_id, 'unknown')
+        trades = [_trade('rfq_other', 'order_other', price='1'), _trade('rfq_filled', 'order_filled'),
+                  _trade('null', 'order_smaller', quantity='0.5000000000')]
+        self.assertEqual(self.oJ.reconcile(trades), 2)
+        self.assertEqual(self.oJ.get('filled')['order_id'], 'order_filled')
+        self.assertEqual(self.oJ.get('expired')['state'], 'expired')
+        self.assertEqual([o['client_order_id'] for o in self.oJ.unresolved()], ['live'])
+
+    def test_reconcile_nullRfq(self):
+        self.oJ.intent(_order('lost', -1), 'rfq_lost')
+        self.oJ.outcome('lost', 'unknown')
+        # the order executed but its response was lost, and /trade/ does not say which RFQ the trade was for
+        self.assertEqual(self.oJ.reconcile([_trade('null', 'order_lost')]), 0)
+        self.assertEqual(self.oJ.get('lost')['state'], 'unknown')
+        self.oJ.intent(_order('live'), 'rfq_live')
+        self.assertEqual(self.oJ.reconcile([_trade('null', 'order_live')]), 0)
+        self.assertEqual(self.oJ.get('live')['state'], 'unknown')  # not pending, so it is not sent again
+        # a trade of another RFQ is not this order's
+        self.assertEqual(self.oJ.reconcile([_trade('rfq_other', 'order_other')]), 1)
+        self.assertEqual(self.oJ.get('lost')['state'], 'expired')
@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+from mock import Mock
+from MockExchange import MockExchange
+from OrderSlicer import OrderSlicer
+from RequestHandler import RequestHandler
+from requestConstants import APIErrors
+from unittest import TestCase
+
+
+class TestOrderSlicer(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+        self.rH = RequestHandler(baseURL=self.server.baseURL)
+        self.oS = OrderSlicer(self.rH, workers=4)
+
+    def tearDown(self):
+        self.rH.close()
+        self.server.stop()
+
+    def test_slices(self):
+        self.assertEqual(self.oS.limits('BTCUSD.SPOT'), (Decimal('0.001'), Decimal('100')))
+        self.assertEqual(self.oS.slices('BTCUSD.SPOT', '250'),
+                         [Decimal('83.3334'), Decimal('83.3333'), Decimal('83.3333')])
+        self.assertEqual(self.oS.slices('BTCUSD.SPOT', '0.0030', count=5), [Decimal('0.0010')] * 3)
+        self.assertEqual(self.oS.slices('ETHUSD.SPOT', '2', count=4), [Decimal('0.5')] * 4)
+        requests = self.server.requests
+        with self.assertRaises(APIErrors[1015]):
+            self.oS.slices('BTCUSD.SPOT', '250.00001')
+        with self.assertRaises(APIErrors[1019]):
+            self.oS.slices('BTCUSD.SPOT', '0.0005')
+        with self.assertRaises(ValueError):
+            self.oS.slices('BTCUSD.SPOT', '1', count=-1)
+        self.assertEqual(self.server.requests, requests)
+
+    def test_execute(self):
+        report = self.oS.execute('BTCUSD.SPOT', 'buy', '250')
+        self.assertEqual((report['filled'], report['failed']), (3, 0))
+        self.assertEqual(report['filled_quantity'], Decimal('250'))
+        self.assertEqual(report['vwap'], Decimal('10000'))
+        self.assertEqual(sum(Decimal(t['quantity']) for t in self.server.trades), Decimal('250'))
+
+    def test_twap(self):
+        start = time.perf_counter()
+        report = self.oS.execute('ETHUSD.SPOT', 'sell', '4', count=4, duration=0.2)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+        self.assertEqual(report['filled'], 4)
+        self.assertEqual(len(self.server.trades), 4)
+
+    def test_vwap(self):
+        self.oS._scheduler = Mock()
+        self.oS._scheduler.execute.side_effect = [
+            {'executed_price': '100', 'client_order_id': 'a', 'order_id': 'a'},
+            {'executed_price': '130', 'client_order_id': 'b', 'order_id': 'b'},
+            None,
+        ]
+        report = self.oS.execute('ETHUSD.SPOT', 'buy', '6', count=3, duration=0.01)
+        self.assertEqual([s['status'] for s in report['slices']], ['filled', 'filled', 'failed'])
+        self.assertEqual(report['filled_quantity'], Decimal('4'))
+        self.assertEqual(report['vwap'], Decimal('115'))
+
+    def test_skip(self):
+        self.oS = OrderSlicer(self.rH, workers=1)
+        self.server.failNext(1001, '/order/')
+        report = self.oS.execute('BTCUSD.SPOT', 'buy', '300')
+        self.assertEqual([s['status'] for s in report['slices']], ['error', 'skipped', 'skipped'])
+        self.assertIsNone(report['vwap'])
+        self.assertEqual(self.server.trades, [])
@@ -0,0 +1,81 @@
+import time
+from decimal import Decimal
+from mock import Mock
+from Metrics import Metrics
+from PositionLedger import PositionLedger
+from Records import Quote
+from unittest import TestCase
+
+
+def _split(instrument):
+    return instrument[:3], instrument[3:6]
+
+
+class TestPositionLedger(TestCase):
+    def setUp(self):
+        self.fetchBalances = Mock(return_value={"BTC": "2", "USD": "1000", "EUR": "100"})
+        self.metrics = Metrics()
+        self.ledger = PositionLedger(self.fetchBalances, _split, metrics=self.metrics)
+
+    def test_apply(self):
+        self.ledger.onQuote(Quote('rfq', 'client_rfq', 'BTCUSD.SPOT', 'sell', '1', '10000',
+                                  '2020-02-28T11:41:30.023467Z'))
+        self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1', 'executed_price': '1000'})
+        self.assertEqual(self.ledger.balance('BTC'), Decimal('2'))  # fills before the first fetch are in it
+        self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1', 'executed_price': '3000'})
+        self.assertEqual(self.ledger.balance('BTC'), Decimal('3'))
+        self.assertEqual(self.ledger.balance('USD'), Decimal('-2000'))
+        self.assertIsNone(self.ledger.balance('ETH', None))
+        self.assertEqual(self.ledger.exposure(), Decimal('2000'))
+        self.assertEqual(self.ledger.exposure({'BTC': Decimal('-4')}), Decimal('12000'))
+        self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'sell', 'quantity': '1', 'executed_price': '3000'})
+        self.assertEqual(self.ledger.exposure(), 0)
+        self.assertEqual(self.fetchBalances.call_count, 1)
+
+    def test_exposure_unpriced(self):
+        self.ledger.balances()
+        self.ledger.apply({'instrument': 'BTCEUR.SPOT', 'side': 'buy', 'quantity': '1', 'executed_price': '3000'})
+        self.assertIsNone(self.ledger.exposure())
+
+    def test_reconcile(self):
+        self.ledger.balances()
+        self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1', 'executed_price': '100'})
+        self.fetchBalances.return_value = {"BTC": "3", "USD": "900", "EUR": "50"}
+        self.ledger.invalidate()
+        self.assertEqual(self.ledger.balance('EUR'), Decimal('50'))
+        self.assertEqual(self.fetchBalances.call_count, 2)
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual(counters['ledger_drift'], 1)
+        self.assertEqual(counters['ledger_reconcile'], 2)
+
+    def test_reconcile_concurrentFill(self):
+        self.ledger.balances()
+
+        def fetchBalances():
+            # a fill applied while /balance/ is in flight, after the API took its snapshot
+            self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1', 'executed_price': '100'})
+            return {"BTC": "2", "USD": "1000", "EUR": "100"}
+        self.fetchBalances.side_effect = fetchBalances
+        self.ledger.reconcile()
+        self.assertEqual(self.ledger.balance('BTC'), Decimal('3'))
+        self.assertEqual(self.ledger.balance('USD'), Decimal('900'))
+        self.assertNotIn('ledger_drift', self.metrics.snapshot()['counters'])
+        self.assertEqual(self.ledger._applied, [])
+
+    def test_reconcileInterval(self):
+        ledger = PositionLedger(self.fetchBalances, _split, reconcileInterval=0.05)
+        ledger.balances()
+        ledger.balances()
+        self.assertEqual(self.fetchBalances.call_count, 1)
+        time.sleep(0.06)
+        ledger.balances()
+        self.assertEqual(self.fetchBalances.call_count, 2)
+
+    def test_start(self):
+        ledger = PositionLedger(self.fetchBalances, _split, reconcileInterval=0.05)
+        ledger.balances()
+        ledger.start()
+        time.sleep(0.12)
+        ledger.balances()
+        ledger.stop()
+        self.assertGreaterEqual(self.fetchBalances.call_count, 2)
@@ -0,0 +1,115 @@
+import logging
+import os
+import tempfile
+import time
+from mock import patch
+from MockExchange import MockExchange
+from Profiler import Profiler, phased, profiled
+from RequestHandler import RequestHandler
+from unittest import TestCase
+
+
+class _Profiled(object):
+    def __init__(self):
+        self._profiler = Profiler()
+
+    @profiled
+    def outer(self):
+        time.sleep(0.01)
+        return self.inner()
+
+    @profiled
+    def inner(self):
+        return self.network()
+
+    @phased('network')
+    def network(self):
+        time.sleep(0.01)
+        return 1
+
+
+class TestProfiler(TestCase):
+    def test_hooks(self):
+        p = _Profiled()
+        p.outer()
+        self.assertEqual(p._profiler.summary()['methods'], {})
+        p._profiler.enable()
+        self.assertEqual(p.outer(), 1)
+        summary = p._profiler.disable()
+        self.assertEqual(summary['methods']['outer']['count'], 1)
+        self.assertEqual(summary['methods']['inner']['count'], 1)
+        self.assertGreaterEqual(summary['profiled_seconds'], 0.02)
+        self.assertLess(summary['profiled_seconds'], summary['methods']['outer']['max'] / 1e9 + 0.001)
+        self.assertAlmostEqual(summary['phases']['network']['share'], 0.5, delta=0.2)
+        p.outer()
+        self.assertEqual(p._profiler.summary()['methods']['outer']['count'], 1)
+
+    def test_logging(self):
+        handler = logging.NullHandler()
+        logger = logging.getLogger()
+        logger.addHandler(handler)
+        try:
+            profiler = Profiler().enable()
+            logger.warning('profiled')
+            profiler.disable()
+            self.assertNotIn('handle', vars(handler))
+        finally:
+            logger.removeHandler(handler)
+        self.assertGreaterEqual(profiler.summary()['phases']['logging']['count'], 1)
+
+    def test_sampling(self):
+        path = os.path.join(tempfile.mkdtemp(), 'stacks.txt')
+        profiler = Profiler().enable(sampling=True, interval=0.001, path=path)
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            sum(range(1000))
+        summary = profiler.disable()
+        self.assertGreater(summary['samples']['count'], 0)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('test_Profiler:test_sampling' in line for line in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(';', stack)
+
+    def test_requestToggle(self):
+        directory = tempfile.mkdtemp()
+        profiler = Profiler().watch(interval=0.005)
+
+        def waitFor(enabled):
+            deadline = time.monotonic() + 1
+            while profiler.enabled != enabled and time.monotonic() < deadline:
+                time.sleep(0.005)
+            return profiler.enabled
+
+        try:
+            with patch('Profiler.stacksPath', os.path.join(directory, 'profile-%H%M%S.stacks')):
+                with profiler._lock:  # a signal landing while the interrupted thread holds the lock returns at once
+                    profiler.requestToggle(10, None)
+                self.assertTrue(waitFor(True))
+                deadline = time.monotonic() + 0.05
+                while time.monotonic() < deadline:
+                    sum(range(1000))
+                profiler.requestToggle(10, None)
+                self.assertFalse(waitFor(False))
+        finally:
+            profiler.unwatch()
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_requestHandler(self):
+        server = MockExchange(latency=0.005).start()
+        rH = RequestHandler(baseURL=server.baseURL)
+        try:
+            rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+            rH.enableProfiling()
+            rH.trade(rH.RFQ('BTCUSD.SPOT', 'buy', '1')['rfq_id'])
+            summary = rH.disableProfiling()
+        finally:
+            rH.close()
+            server.stop()
+        self.assertEqual(summary['methods']['RFQ']['count'], 1)
+        self.assertEqual(summary['methods']['_requestHandler']['count'], 2)
+        self.assertEqual(summary['phases']['network']['count'], 2)
+        self.assertEqual(summary['phases']['decode']['count'], 2)
+        self.assertEqual(summary['phases']['validation']['count'], 1)
+        self.assertGreater(summary['phases']['network']['share'], 0.5)
@@ -0,0 +1,46 @@
+import datetime
+import time
+from QuoteBook import QuoteBook
+from Records import Quote
+from unittest import TestCase
+
+
+def _quote(rfq_id, seconds):
+    valid_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+    return Quote(rfq_id, 'client_' + rfq_id, 'BTCUSD.SPOT', 'buy', '1.0', '700.00000000',
+                 valid_until.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+
+
+class TestQuoteBook(TestCase):
+    def test_get(self):
+        qB = QuoteBook()
+        qB.add(_quote('a', 15))
+        self.assertEqual(qB.get('a').rfq_id, 'a')
+        self.assertEqual(qB.get('client_a').rfq_id, 'a')
+        self.assertIsNone(qB.get('b'))
+
+    def test_pop(self):
+        qB = QuoteBook()
+        qB.add(_quote('a', 15))
+        qB.add(_quote('b', 15))
+        self.assertEqual(qB.pop().rfq_id, 'b')
+        self.assertIsNone(qB.pop())
+        self.assertEqual(qB.pop('client_a').rfq_id, 'a')
+        self.assertEqual(len(qB), 0)
+
+    def test_add_notLatest(self):
+        qB = QuoteBook()
+        qB.add(_quote('a', 15))
+        qB.add(_quote('b', 15), latest=False)
+        self.assertEqual(qB.get('b').rfq_id, 'b')
+        self.assertEqual(qB.pop().rfq_id, 'a')
+
+    def test_evict(self):
+        qB = QuoteBook()
+        qB.add(_quote('a', -1))
+        qB.add(_quote('b', 15))
+        self.assertIsNone(qB.get('a'))
+        self.assertEqual(len(qB), 1)
+        qB.evict(time.monotonic() + 30)
+        self.assertEqual(len(qB), 0)
+        self.assertIsNone(qB.pop())
@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+import time
+from decimal import Decimal
+from mock import Mock
+from QuotePoller import QuotePoller
+from unittest import TestCase
+
+
+def _rfq(instrument, side, quantity, latest=True):
+    valid_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+    _rfq.count += 1
+    return {'valid_until': valid_until.strftime('%Y-%m-%dT%H:%M:%S.%fZ'), 'rfq_id': 'rfq_%d' % _rfq.count,
+            'client_rfq_id': 'client_%d' % _rfq.count, 'quantity': quantity, 'side': side,
+            'instrument': instrument, 'price': '%d.00' % (_rfq.count + (100 if side == 'buy' else 0))}
+
+
+_rfq.count = 0
+
+grid = [('BTCUSD.SPOT', 'buy', '1'), ('BTCUSD.SPOT', 'sell', '1'), ('ETHUSD.SPOT', 'buy', '10')]
+
+
+class TestQuotePoller(TestCase):
+    def setUp(self):
+        self.rH = Mock()
+        self.rH.RFQ.side_effect = _rfq
+
+    def test_pollOnce(self):
+        qP = QuotePoller(self.rH, grid)
+        self.assertIsNone(qP.latest('BTCUSD.SPOT', 'buy'))
+        received = []
+        unsubscribe = qP.subscribe(received.append)
+        qP.pollOnce()
+        self.assertEqual(len(received), 3)
+        self.rH.RFQ.assert_called_with('ETHUSD.SPOT', 'buy', '10', latest=False)
+        quote = qP.latest('BTCUSD.SPOT', 'buy')
+        self.assertEqual(quote, qP.latest('BTCUSD.SPOT', 'buy', '1'))
+        self.assertTrue(quote.isLive())
+        book = qP.book()
+        self.assertEqual(set(book), {('BTCUSD.SPOT', 'buy'), ('BTCUSD.SPOT', 'sell'), ('ETHUSD.SPOT', 'buy')})
+        self.assertEqual(book[('ETHUSD.SPOT', 'buy')]['quantity'], Decimal('10'))
+        self.assertTrue(book[('BTCUSD.SPOT', 'sell')]['live'])
+        unsubscribe()
+        qP.pollOnce()
+        self.assertEqual(len(received), 3)
+        self.assertNotEqual(qP.latest('BTCUSD.SPOT', 'buy'), quote)
+
+    def test_pollError(self):
+        self.rH.RFQ.side_effect = ValueError('Invalid instrument')
+        qP = QuotePoller(self.rH, grid)
+        qP.pollOnce()
+        self.assertEqual(qP.book(), {})
+        self.rH.increment.assert_called_with('quote_poll_error')
+
+    def test_start(self):
+        qP = QuotePoller(self.rH, grid, interval=0.02).start()
+        time.sleep(0.1)
+        qP.stop()
+        self.assertGreaterEqual(self.rH.RFQ.call_count, 9)
+
+    def test_updates(self):
+        qP = QuotePoller(self.rH, grid, interval=0.01)
+
+        async def collect():
+            updates = qP.updates()
+            first = asyncio.ensure_future(updates.__anext__())
+            await asyncio.sleep(0)
+            qP.start()
+            quotes = [await first] + [await updates.__anext__() for _ in range(4)]
+            await updates.aclose()
+            return quotes
+
+        try:
+            quotes = asyncio.run(collect())
+        finally:
+            qP.stop()
+        self.assertEqual(len({q.rfq_id for q in quotes}), 5)
+        self.assertEqual(qP._subscribers, [])
@@ -0,0 +1,72 @@
+import requests
+import threading
+import time
+from MockExchange import MockExchange
+from RateLimiter import AdaptiveLimiter, RequestLimiter, TokenBucket, endpointClass
+from RequestHandler import RequestHandler
+from unittest import TestCase
+
+
+class TestRateLimiter(TestCase):
+    def test_tokenBucket(self):
+        tB = TokenBucket(100, 5)
+        start = time.perf_counter()
+        for _ in range(15):
+            tB.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+
+    def test_aimd(self):
+        aL = AdaptiveLimiter(4, 1, 8, decreaseInterval=0)
+        for _ in range(20):
+            aL.acquire(0)
+            aL.release(200, 0.01)
+        self.assertGreater(aL.limit, 6)
+        aL.acquire(0)
+        aL.release(503, 0.01)
+        self.assertLess(aL.limit, 4)
+        limit = aL.limit
+        aL.acquire(0)
+        aL.release(200, 0.5)
+        self.assertEqual(aL.limit, max(1, limit / 2))
+
+    def test_priority(self):
+        aL = AdaptiveLimiter(1, 1, 1)
+        aL.acquire(0)
+        admitted = []
+
+        def wait(priority):
+            aL.acquire(priority)
+            admitted.append(priority)
+            aL.release(200, 0.01)
+        threads = [threading.Thread(target=wait, args=(2,))]
+        threads[0].start()
+        time.sleep(0.05)
+        threads.append(threading.Thread(target=wait, args=(0,)))
+        threads[1].start()
+        time.sleep(0.05)
+        aL.release(200, 0.01)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(admitted, [0, 2])
+
+    def test_endpointClass(self):
+        self.assertEqual(endpointClass('/order/'), 'orders')
+        self.assertEqual(endpointClass('/request_for_quote/'), 'quotes')
+        self.assertEqual(endpointClass('/trade/'), 'reads')
+
+    def test_retry(self):
+        server = MockExchange().start()
+        try:
+            rH = RequestHandler(baseURL=server.baseURL, rateLimit=True)
+            server.failNext(503, '/balance/')
+            self.assertIn('USD', rH.getBalances())
+            self.assertEqual(rH.getMetrics()['counters']['retry'], 1)
+            self.assertIsInstance(rH._limiter, RequestLimiter)
+            self.assertEqual(rH._limiter.concurrency.inflight, 0)
+            server.failNext(503, '/request_for_quote/')
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                rH.RFQ('BTCUSD.SPOT', 'buy', '1')
+            self.assertEqual(rH.getMetrics()['counters']['retry'], 1)
+            rH.close()
+        finally:
+            server.stop()
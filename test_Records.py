@@ -0,0 +1,66 @@
+import datetime
+import time
+from decimal import Decimal
+from Decoding import decode, parseTimestamp, toDecimal
+from mock import Mock
+from Records import Balance, Order, Quote, Trade
+from unittest import TestCase
+
+
+class TestDecoding(TestCase):
+    def test_decode(self):
+        response = Mock()
+        response.content = b'{"price": "700.00000000"}'
+        self.assertEqual(decode(response), {'price': '700.00000000'})
+
+    def test_toDecimal(self):
+        self.assertEqual(toDecimal('0.1'), Decimal('0.1'))
+        self.assertEqual(toDecimal(0.1), Decimal('0.1'))
+        self.assertEqual(toDecimal(5), Decimal(5))
+        for value in (None, 'null', 'abc', 'NaN', 'inf', []):
+            self.assertIsNone(toDecimal(value))
+
+    def test_parseTimestamp(self):
+        for value in ('2020-02-28T11:41:30.023467Z', '2018-02-13T16:47:40.123Z', '2018-02-13T16:47:40.1Z'):
+            self.assertEqual(parseTimestamp(value), datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ'))
+
+
+class TestRecords(TestCase):
+    trade = {'created': '2018-02-13T16:47:40.123Z', 'price': '10000.0000000000', 'instrument': 'BTCUSD.SPOT',
+             'trade_id': 't1', 'origin': 'rest', 'rfq_id': 'null', 'order': 'o1', 'side': 'buy',
+             'quantity': '0.0100000000', 'executing_unit': 'risk-adding-strategy'}
+
+    def test_trade(self):
+        trade = Trade.fromResponse(self.trade)
+        self.assertEqual(trade.price, Decimal('10000'))
+        self.assertEqual(trade['quantity'], Decimal('0.01'))
+        self.assertIsNone(trade.rfq_id)
+        self.assertEqual(trade, Trade.fromResponse(dict(self.trade)))
+        self.assertEqual(len({trade, Trade.fromResponse(dict(self.trade))}), 1)
+        self.assertEqual(trade.asDict()['trade_id'], 't1')
+        with self.assertRaises(KeyError):
+            trade['user']
+        with self.assertRaises(AttributeError):
+            trade.user = 'someone'
+
+    def test_quote(self):
+        validUntil = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+        quote = Quote('r1', 'c1', 'BTCUSD.SPOT', 'buy', '1.0', '700.00',
+                      validUntil.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+        self.assertAlmostEqual(quote.remaining(), 10, delta=0.5)
+        self.assertTrue(quote.isLive())
+        self.assertFalse(quote.isLive(time.monotonic() + 11))
+
+    def test_order(self):
+        data = {'order_id': 'o1', 'client_order_id': 'c1', 'instrument': 'BTCUSD.SPOT', 'side': 'buy',
+                'quantity': '0.01', 'price': '10000.00', 'executed_price': 'null',
+                'created': '2018-02-13T16:47:40.123Z', 'trades': [self.trade]}
+        order = Order.fromResponse(data)
+        self.assertIsNone(order.executed_price)
+        self.assertEqual(order.trades[0].trade_id, 't1')
+        self.assertEqual(hash(order), hash(Order.fromResponse(data)))
+
+    def test_balance(self):
+        balances = Balance.fromResponse({'USD': '2.5', 'BTC': '0'})
+        self.assertEqual(balances['USD'].amount, Decimal('2.5'))
+        self.assertEqual(balances['BTC']['currency'], 'BTC')
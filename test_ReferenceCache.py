@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+from decimal import Decimal
+from mock import Mock
+from ReferenceCache import ReferenceCache
+from unittest import TestCase
+
+responses = {
+    '/instruments/': [{"name": "BTCUSD.SPOT"}, {"name": "ETHUSD.SPOT"}],
+    '/currency/': {"BTC": {"long_only": 'false', "minimum_trade_size": 0.001}},
+    '/account_info/': {"risk_exposure": "10000.15", "max_risk_exposure": "50000"},
+}
+
+
+class TestReferenceCache(TestCase):
+    def test_get(self):
+        fetch = Mock(side_effect=responses.get)
+        rC = ReferenceCache(fetch)
+        self.assertEqual(rC.instruments(), {"BTCUSD.SPOT", "ETHUSD.SPOT"})
+        self.assertEqual(rC.minimumTradeSize("BTC"), Decimal("0.001"))
+        self.assertIsNone(rC.minimumTradeSize("XRP"))
+        self.assertEqual(rC.get('/instruments/'), responses['/instruments/'])
+        self.assertEqual(fetch.call_count, 2)
+        stats = rC.stats()['/instruments/']
+        self.assertEqual((stats['hits'], stats['misses'], stats['refreshes']), (1, 1, 1))
+
+    def test_ttl(self):
+        fetch = Mock(side_effect=responses.get)
+        rC = ReferenceCache(fetch, ttls={'/account_info/': 0})
+        rC.get('/account_info/')
+        rC.get('/account_info/')
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_background(self):
+        fetch = Mock(side_effect=responses.get)
+        rC = ReferenceCache(fetch, ttls={'/account_info/': 0.01})
+        rC.start(interval=0.005)
+        time.sleep(0.1)
+        self.assertGreater(fetch.call_count, 1)
+        rC.get('/account_info/')
+        self.assertEqual(rC.stats()['/account_info/']['misses'], 0)
+        rC.stop()
+
+    def test_snapshot(self):
+        path = os.path.join(tempfile.mkdtemp(), 'reference.json')
+        rC = ReferenceCache(Mock(side_effect=responses.get), snapshotPath=path)
+        rC.instruments()
+        rC.save(path)
+        fetch = Mock()
+        self.assertEqual(ReferenceCache(fetch, snapshotPath=path).instruments(), {"BTCUSD.SPOT", "ETHUSD.SPOT"})
+        fetch.assert_not_called()
+
+    def test_restore(self):
+        rC = ReferenceCache(Mock(side_effect=responses.get))
+        rC.instruments()
+        rC.get('/account_info/')
+        snapshot = rC.snapshot(('/instruments/',))
+        self.assertEqual(list(snapshot['data']), ['/instruments/'])
+        fetch = Mock(side_effect=responses.get)
+        restored = ReferenceCache(fetch)
+        restored.restore(snapshot)
+        self.assertEqual(restored.instruments(), {"BTCUSD.SPOT", "ETHUSD.SPOT"})
+        fetch.assert_not_called()
+        restored.get('/account_info/')
+        fetch.assert_called_once_with('/account_info/')
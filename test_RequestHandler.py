@@ -1,47 +1,52 @@
-import datetime
+import time
+import json
+import uuid
+from decimal import Decimal
 import requests
-from mock import patch
-from RequestHandler import RequestHandler
+from mock import PropertyMock, patch
+from RequestHandler import RequestHandler, _clientId
 from requestConstants import APIError
 from unittest import TestCase
 
 
 class TestRequestHandler(TestCase):
-    def test_isFloat(self):
-        rH = RequestHandler()
-        self.assertTrue(rH._isFloat('3.1415'))
-        self.assertFalse(rH._isFloat('3+6j'))
+    def test_clientId(self):
+        ids = {_clientId() for _ in range(1000)}
+        self.assertEqual(len(ids), 1000)
+        for clientId in ids:
+            self.assertEqual(uuid.UUID(clientId).version, 4)
+            self.assertEqual(str(uuid.UUID(clientId)), clientId)
 
     def test_requestHandler(self):
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = {"USD": "0"}
+            mRequest.return_value.content = json.dumps({"USD": "0"}).encode()
             rH = RequestHandler()
             self.assertEqual(rH._requestHandler('/balance/'), {"USD": "0"})
 
     def test_requestHandler_Post(self):
-        with patch('requests.post') as mRequest:
+        with patch('requests.Session.post') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = {"USD": "0"}
+            mRequest.return_value.content = json.dumps({"USD": "0"}).encode()
             rH = RequestHandler()
             self.assertEqual(rH._requestHandler('/request_for_quote/', {"USD": "0"}), {"USD": "0"})
 
     def test_requestHandler_HTTPError(self):
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 400
             rH = RequestHandler()
             with self.assertRaises(requests.exceptions.HTTPError):
                 rH._requestHandler('/balance/')
 
     def test_requestHandler_ConnectionError(self):
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 500
             rH = RequestHandler()
             with self.assertRaises(requests.exceptions.ConnectionError):
                 rH._requestHandler('/balance/')
 
     def test_requestHandler_APIError(self):
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 1010
             rH = RequestHandler()
             with self.assertRaises(APIError):
@@ -49,21 +54,23 @@ class TestRequestHandler(TestCase):
 
     def test_getBalances(self):
         out = {"USD": "0",}
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = out
+            mRequest.return_value.content = json.dumps(out).encode()
             rH = RequestHandler()
             self.assertEqual(rH.getBalances(), out)
             self.assertEqual(rH.getBalances("USD"), {"USD": "0"})
 
     def test_getInstruments(self):
         out = [{ "name": "BTCUSD.CFD"},]
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = out
+            mRequest.return_value.content = json.dumps(out).encode()
             rH = RequestHandler()
             self.assertEqual(rH._getInstruments(),
-                             ['BTCUSD.CFD'])
+                             {'BTCUSD.CFD'})
+            rH._getInstruments()
+            self.assertEqual(mRequest.call_count, 1)
 
     def test_RFQ(self):
         get = [{"name": "BTCUSD.SPOT"},]
@@ -77,18 +84,19 @@ class TestRequestHandler(TestCase):
             "price": "1.00000000",
             "created": "2020-02-28T11:41:15.023467Z"
         }
-        with patch('requests.get') as mGet:
-            with patch('requests.post') as mPost:
+        with patch('requests.Session.get') as mGet:
+            with patch('requests.Session.post') as mPost:
                 mGet.return_value.status_code = 200
-                mGet.return_value.json.return_value = get
+                mGet.return_value.content = json.dumps(get).encode()
                 mPost.return_value.status_code = 200
-                mPost.return_value.json.return_value = post
+                mPost.return_value.content = json.dumps(post).encode()
                 rH = RequestHandler()
                 self.assertEqual(rH.RFQ("BTCUSD.SPOT", "buy", "1.0"), post)
-                self.assertEqual(rH._price, "1.00000000")
+                self.assertEqual(rH._quotes.get("some_unique_ID").price, Decimal("1.00000000"))
+                self.assertEqual(rH._quotes.get("some_unique_client_id").price, Decimal("1.00000000"))
 
     def test_trade(self):
-        get = [{ "name": "BTCUSD.CFD"},]
+        get = [{ "name": "BTCUSD.SPOT"},]
         post = {
             "valid_until": "2020-02-28T11:41:30.023467Z",
             "rfq_id": "d4e41399-e7a1-4576-9b46-349420040e1a",
@@ -125,21 +133,24 @@ class TestRequestHandler(TestCase):
             "created": "2018-02-06T16:07:50.122206Z"
         }
 
-        with patch('requests.get') as mGet:
-            with patch('requests.post') as mPost:
+        with patch('requests.Session.get') as mGet:
+            with patch('requests.Session.post') as mPost:
                 mGet.return_value.status_code = 200
-                mGet.return_value.json.return_value = get
+                mGet.return_value.content = json.dumps(get).encode()
                 mPost.return_value.status_code = 200
-                mPost.return_value.json.side_effect = [post, trade]
+                type(mPost.return_value).content = PropertyMock(side_effect=[json.dumps(post).encode(),
+                                                                             json.dumps(trade).encode()])
                 rH = RequestHandler()
                 rH.RFQ("BTCUSD.SPOT", "buy", "1.0")
-                self.assertEqual(rH._price, "700.00000000")
-                rH._valid_until_dateTime = datetime.datetime.utcnow() + datetime.timedelta(seconds=15)
+                quote = rH._quotes.get("d4e41399-e7a1-4576-9b46-349420040e1a")
+                self.assertEqual(quote.price, Decimal("700.00000000"))
+                quote.expires = time.monotonic() + 15
                 rH.trade()
                 self.assertEqual(rH._trades, ["d4e41399-e7a1-4576-9b46-349420040e1a"])
+                self.assertEqual(len(rH._quotes), 0)
 
     def test_trade_fail(self):
-        get = [{ "name": "BTCUSD.CFD"},]
+        get = [{ "name": "BTCUSD.SPOT"},]
         post = {
             "valid_until": "2020-02-28T11:41:30.023467Z",
             "rfq_id": "d4e41399-e7a1-4576-9b46-349420040e1a",
@@ -176,40 +187,42 @@ class TestRequestHandler(TestCase):
             "created": "2018-02-06T16:07:50.122206Z"
         }
 
-        with patch('requests.get') as mGet:
-            with patch('requests.post') as mPost:
+        with patch('requests.Session.get') as mGet:
+            with patch('requests.Session.post') as mPost:
                 mGet.return_value.status_code = 200
-                mGet.return_value.json.return_value = get
+                mGet.return_value.content = json.dumps(get).encode()
                 mPost.return_value.status_code = 200
-                mPost.return_value.json.side_effect = [post, trade]
+                type(mPost.return_value).content = PropertyMock(side_effect=[json.dumps(post).encode(),
+                                                                             json.dumps(trade).encode()])
                 rH = RequestHandler()
                 rH.RFQ("BTCUSD.SPOT", "buy", "1.0")
-                self.assertEqual(rH._price, "700.00000000")
+                self.assertEqual(rH._quotes.get("d4e41399-e7a1-4576-9b46-349420040e1a").price, Decimal("700.00000000"))
+                self.assertIsNone(rH.trade())
                 self.assertIsNone(rH.trade())
 
     def test_isValid_instrument(self):
         get = [{ "name": "BTCUSD.CFD"},]
-        with patch('requests.get') as mGet:
+        with patch('requests.Session.get') as mGet:
             mGet.return_value.status_code = 200
-            mGet.return_value.json.return_value = get
+            mGet.return_value.content = json.dumps(get).encode()
             with self.assertRaises(ValueError):
                 rH = RequestHandler()
                 rH._isValid('BTCUSD', 'buy', '1')
 
     def test_isValid_side(self):
         get = [{ "name": "BTCUSD.CFD"},]
-        with patch('requests.get') as mGet:
+        with patch('requests.Session.get') as mGet:
             mGet.return_value.status_code = 200
-            mGet.return_value.json.return_value = get
+            mGet.return_value.content = json.dumps(get).encode()
             with self.assertRaises(ValueError):
                 rH = RequestHandler()
                 rH._isValid('BCHUSD.SPOT', 'funny_side', '1')
 
     def test_isValid_quantity(self):
         get = [{ "name": "BTCUSD.CFD"},]
-        with patch('requests.get') as mGet:
+        with patch('requests.Session.get') as mGet:
             mGet.return_value.status_code = 200
-            mGet.return_value.json.return_value = get
+            mGet.return_value.content = json.dumps(get).encode()
             with self.assertRaises(ValueError):
                 rH = RequestHandler()
                 rH._isValid('XRPUSD.SPOT', 'buy', '3+6j')
@@ -221,9 +234,9 @@ class TestRequestHandler(TestCase):
             "btc_max_qty_per_trade": "100",
             "ust_max_qty_per_trade": "600000"
         }
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = out
+            mRequest.return_value.content = json.dumps(out).encode()
             rH = RequestHandler()
             self.assertEqual(rH.getAccountInfo(), out)
 
@@ -238,9 +251,9 @@ class TestRequestHandler(TestCase):
                 "minimum_trade_size": 0.001
             }
         }
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = out
+            mRequest.return_value.content = json.dumps(out).encode()
             rH = RequestHandler()
             self.assertEqual(rH.getCurrencies(), out)
 
@@ -262,8 +275,38 @@ class TestRequestHandler(TestCase):
             },
         ]
 
-        with patch('requests.get') as mRequest:
+        with patch('requests.Session.get') as mRequest:
             mRequest.return_value.status_code = 200
-            mRequest.return_value.json.return_value = out
+            mRequest.return_value.content = json.dumps(out).encode()
             rH = RequestHandler()
             self.assertEqual(rH.getAllTrades(), out)
+
+    def test_iterTrades(self):
+        out = b'[{"created": "2016-09-27T11:27:46.599039Z", "trade_id": "a"}, ' \
+              b'{"created": "2016-09-28T11:27:46.599039Z", "trade_id": "b"}]'
+        with patch('requests.Session.get') as mRequest:
+            mRequest.return_value.status_code = 200
+            mRequest.return_value.iter_content.side_effect = lambda chunk_size: iter([out[:30], out[30:]])
+            rH = RequestHandler()
+            self.assertEqual([t['trade_id'] for t in rH.iterTrades()], ['a', 'b'])
+            self.assertEqual([t['trade_id'] for t in rH.iterTrades(since="2016-09-27T11:27:46.599039Z")], ['a', 'b'])
+            self.assertEqual([t['trade_id'] for t in rH.iterTrades(since="2016-09-27T11:27:46.599040Z")], ['b'])
+            self.assertTrue(mRequest.return_value.close.called)
+
+    def test_iterTrades_error(self):
+        with patch('requests.Session.get') as mRequest:
+            mRequest.return_value.status_code = 403
+            rH = RequestHandler()
+            with self.assertRaises(APIError):
+                list(rH.iterTrades())
+            self.assertTrue(mRequest.return_value.close.called)
+
+    def test_requestHandler_APIError_body(self):
+        with patch('requests.Session.post') as mRequest:
+            mRequest.return_value.status_code = 400
+            mRequest.return_value.content = json.dumps(
+                {"errors": [{"code": 1011, "message": "Not enough balance."}]}).encode()
+            rH = RequestHandler()
+            with self.assertRaises(APIError) as e:
+                rH._requestHandler('/order/', {"client_order_id": "a"})
+            self.assertEqual(e.exception.code, 1011)
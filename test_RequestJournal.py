@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+import RequestJournal
+from mock import patch
+from RequestHandler import RequestHandler
+from unittest import TestCase
+
+
+class TestRequestJournal(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'journal.jsonl')
+
+    def test_record(self):
+        rJ = RequestJournal.RequestJournal(self.path)
+        rJ.record({'endpoint': '/balance/', 'status': 200})
+        rJ.record({'endpoint': '/order/', 'status': 400})
+        rJ.close()
+        self.assertEqual([r['endpoint'] for r in RequestJournal.read(self.path)], ['/balance/', '/order/'])
+
+    def test_rotate(self):
+        rJ = RequestJournal.RequestJournal(self.path, maxBytes=100, backupCount=2)
+        for i in range(10):
+            rJ.record({'endpoint': '/balance/', 'i': i, 'padding': 'x' * 40})
+        rJ.close()
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertTrue(os.path.exists(self.path + '.2'))
+        self.assertFalse(os.path.exists(self.path + '.3'))
+        self.assertEqual([r['i'] for r in RequestJournal.read(self.path + '.2')], [6, 7])
+        self.assertEqual([r['i'] for r in RequestJournal.read(self.path + '.1')], [8, 9])
+        self.assertEqual(list(RequestJournal.read(self.path)), [])
+
+    def test_requestHandler(self):
+        with patch('requests.Session.post') as mRequest:
+            mRequest.return_value.status_code = 200
+            mRequest.return_value.content = json.dumps({"rfq_id": "a"}).encode()
+            rH = RequestHandler(journalPath=self.path)
+            rH._requestHandler('/request_for_quote/', {"client_rfq_id": "b"})
+            rH.close()
+        record, = RequestJournal.read(self.path)
+        self.assertEqual(record['endpoint'], '/request_for_quote/')
+        self.assertEqual(record['method'], 'POST')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['client_rfq_id'], 'b')
+        self.assertEqual(record['response'], {"rfq_id": "a"})
+        self.assertGreater(record['latency_ns'], 0)
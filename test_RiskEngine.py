@@ -0,0 +1,56 @@
+from decimal import Decimal
+from mock import Mock
+from PositionLedger import PositionLedger
+from Records import Quote
+from ReferenceCache import ReferenceCache
+from RiskEngine import RiskEngine
+from requestConstants import APIErrors, FatalAPIError
+from unittest import TestCase
+
+responses = {
+    '/currency/': {
+        "BTC": {"long_only": 'true', "minimum_trade_size": 0.001},
+        "USD": {"long_only": 'false', "minimum_trade_size": 1},
+        "EUR": {"long_only": 'true', "minimum_trade_size": 1},
+    },
+    '/account_info/': {"risk_exposure": "0", "max_risk_exposure": "50000", "btc_max_qty_per_trade": "100"},
+}
+
+
+def _quote(instrument, side, quantity, price):
+    return Quote('rfq', 'client_rfq', instrument, side, quantity, price, '2020-02-28T11:41:30.023467Z')
+
+
+class TestRiskEngine(TestCase):
+    def setUp(self):
+        self.fetchBalances = Mock(return_value={"BTC": "2", "USD": "1000", "EUR": "100"})
+        referenceData = ReferenceCache(Mock(side_effect=responses.get))
+        self.ledger = PositionLedger(self.fetchBalances, referenceData.pair)
+        self.rE = RiskEngine(referenceData, self.ledger)
+
+    def assertRejected(self, code, func, *args):
+        with self.assertRaises(APIErrors[code]) as e:
+            func(*args)
+        self.assertEqual(e.exception.code, code)
+        self.assertIsInstance(e.exception, FatalAPIError)
+
+    def test_check(self):
+        self.assertTrue(self.rE.check('BTCUSD.SPOT', 'buy', '1'))
+        self.assertRejected(1019, self.rE.check, 'BTCUSD.SPOT', 'buy', '0.0001')
+        self.assertRejected(1010, self.rE.check, 'BTCUSD.SPOT', 'buy', '101')
+        self.assertRejected(1015, self.rE.check, 'BTCUSD.SPOT', 'buy', '1.00001')
+        self.assertTrue(self.rE.check('BTCUSD.SPOT', 'buy', '1.00010000'))
+        self.assertRejected(1011, self.rE.check, 'BTCUSD.SPOT', 'sell', '3')
+        self.assertTrue(self.rE.check('BTCUSD.SPOT', 'sell', '2'))
+
+    def test_checkOrder(self):
+        self.assertTrue(self.rE.checkOrder(_quote('BTCUSD.SPOT', 'buy', '1', '10000')))
+        self.assertRejected(1012, self.rE.checkOrder, _quote('BTCUSD.SPOT', 'buy', '10', '10000'))
+        self.assertRejected(1011, self.rE.checkOrder, _quote('BTCEUR.SPOT', 'buy', '1', '10000'))
+
+    def test_checkAfterFill(self):
+        self.assertTrue(self.rE.check('BTCUSD.SPOT', 'sell', '2'))
+        self.ledger.apply({'instrument': 'BTCUSD.SPOT', 'side': 'sell', 'quantity': '1', 'executed_price': '3000'})
+        self.assertRejected(1011, self.rE.check, 'BTCUSD.SPOT', 'sell', '2')
+        self.assertEqual(self.ledger.balance('USD'), Decimal('4000'))
+        self.assertEqual(self.fetchBalances.call_count, 1)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import numpy as np
+from Records import Trade
+from TradeAnalytics import TradeAnalytics, journalPrices
+from TradeStore import TradeStore
+from unittest import TestCase
+
+
+def _trade(trade_id, created, side, quantity, price, instrument="BTCUSD.SPOT", rfq_id='null'):
+    return {"trade_id": trade_id, "created": created, "instrument": instrument, "side": side,
+            "quantity": quantity, "price": price, "rfq_id": rfq_id, "order": 'null'}
+
+
+trades = [
+    _trade("a", "2020-02-28T11:41:15.023467Z", "buy", "2.0000000000", "700.00000000", rfq_id="r1"),
+    _trade("b", "2020-02-28T11:42:15.023467Z", "sell", "1.0000000000", "800.00000000", rfq_id="r2"),
+    _trade("c", "2020-02-29T11:43:15.023467Z", "buy", "1.0000000000", "50.00000000", "ETHUSD.SPOT"),
+    _trade("d", "2020-02-29T12:43:15.023467Z", "sell", "1.0000000000", "810.00000000", rfq_id="r3"),
+]
+
+
+class TestTradeAnalytics(TestCase):
+    def test_pnl(self):
+        tS = TradeStore(':memory:')
+        tS.add(trades)
+        marks = {'BTCUSD.SPOT': 750.0}
+        expected = tS.pnlByInstrument(marks)
+        pnl = TradeAnalytics.fromTrades(trades).pnl(marks)
+        self.assertEqual(set(pnl), set(expected))
+        for instrument, values in expected.items():
+            for key, value in values.items():
+                if value is None:
+                    self.assertIsNone(pnl[instrument][key])
+                else:
+                    self.assertAlmostEqual(pnl[instrument][key], float(value))
+
+    def test_records(self):
+        tA = TradeAnalytics.fromTrades([Trade.fromResponse(t) for t in trades], {'r1': 699.0})
+        expected = TradeAnalytics.fromTrades(trades, {'r1': 699.0})
+        self.assertEqual(tA.pnl(), expected.pnl())
+        self.assertEqual(tA.columns['rfq_id'].tolist(), ['r1', 'r2', '', 'r3'])
+        self.assertEqual(tA.slippage(), expected.slippage())
+
+    def test_slippage(self):
+        tA = TradeAnalytics.fromTrades(trades, {'r1': 699.0, 'r2': 800.0, 'r3': 820.0})
+        slippage = tA.slippage()
+        self.assertEqual(list(slippage), ['BTCUSD.SPOT'])
+        btc = slippage['BTCUSD.SPOT']
+        self.assertEqual(btc['trades'], 3)
+        # bought 2 at 700 quoted 699, sold 1 at 810 quoted 820
+        self.assertAlmostEqual(btc['cost'], 2 * 1 + 10)
+        self.assertAlmostEqual(btc['mean_bps'], (1 / 699.0 + 10 / 820.0) * 1e4 / 3)
+        self.assertEqual(TradeAnalytics.fromTrades(trades).slippage(), {})
+
+    def test_volumeByDay(self):
+        volume = TradeAnalytics.fromTrades(trades).volumeByDay()
+        self.assertEqual([(v['day'], v['instrument'], v['trades']) for v in volume],
+                         [('2020-02-28', 'BTCUSD.SPOT', 2), ('2020-02-29', 'BTCUSD.SPOT', 1),
+                          ('2020-02-29', 'ETHUSD.SPOT', 1)])
+        self.assertAlmostEqual(volume[0]['notional'], 2200.0)
+        self.assertEqual(TradeAnalytics.fromTrades([]).volumeByDay(), [])
+
+    def test_cache(self):
+        path = os.path.join(tempfile.mkdtemp(), 'trades.d')
+        TradeAnalytics.fromTrades(trades, {'r1': 699.0}).save(path)
+        tA = TradeAnalytics.load(path)
+        self.assertIsInstance(tA.columns['price'], np.memmap)
+        self.assertEqual(len(tA), 4)
+        self.assertEqual(tA.columns['trade_id'].tolist(), ['a', 'b', 'c', 'd'])
+        self.assertEqual(tA.pnl(), TradeAnalytics.fromTrades(trades).pnl())
+        self.assertEqual(tA.slippage()['BTCUSD.SPOT']['trades'], 1)
+
+    def test_journalPrices(self):
+        path = os.path.join(tempfile.mkdtemp(), 'requests.jsonl')
+        with open(path, 'w') as f:
+            for record in ({'endpoint': '/request_for_quote/', 'response': {'rfq_id': 'r1', 'price': '699.00000000'}},
+                           {'endpoint': '/request_for_quote/', 'response': None, 'error': 'APIError(1001)'},
+                           {'endpoint': '/order/', 'response': {'rfq_id': 'r2', 'price': '1'}}):
+                f.write(json.dumps(record) + '\n')
+        self.assertEqual(journalPrices(path), {'r1': 699.0})
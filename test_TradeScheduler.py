@@ -0,0 +1,43 @@
+from MockExchange import MockExchange
+from RequestHandler import RequestHandler
+from TradeScheduler import TradeScheduler
+from requestConstants import APIError
+from unittest import TestCase
+
+
+class TestTradeScheduler(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+        self.rH = RequestHandler(baseURL=self.server.baseURL)
+        self.tS = TradeScheduler(self.rH, retries=2, backoff=0.001)
+
+    def tearDown(self):
+        self.rH.close()
+        self.server.stop()
+
+    def test_execute(self):
+        order = self.tS.execute('BTCUSD.SPOT', 'buy', '1')
+        self.assertEqual(order['executed_price'], '10000.00000000')
+        self.assertNotIn('requote', self.rH.getMetrics()['counters'])
+
+    def test_execute_quote(self):
+        rfq_id = self.rH.RFQ('BTCUSD.SPOT', 'buy', '1')['rfq_id']
+        self.assertTrue(self.tS.tradeable(rfq_id))
+        self.assertEqual(self.tS.execute('BTCUSD.SPOT', 'buy', '1', rfq_id=rfq_id)['trades'][0]['rfq_id'], rfq_id)
+        self.assertEqual(len(self.server.trades), 1)
+
+    def test_requote(self):
+        self.server.failNext(1009, '/order/')
+        self.assertIsNotNone(self.tS.execute('BTCUSD.SPOT', 'buy', '1'))
+        self.assertEqual(self.rH.getMetrics()['counters']['requote'], 1)
+
+    def test_expired(self):
+        self.server.quoteValidity = -1
+        self.assertIsNone(self.tS.execute('BTCUSD.SPOT', 'buy', '1'))
+        self.assertNotIn('/order/', self.rH.getMetrics()['latency_ns'])
+        self.assertEqual(len(self.rH._quotes), 0)
+
+    def test_fatal(self):
+        self.server.failNext(1011, '/order/')
+        with self.assertRaises(APIError):
+            self.tS.execute('BTCUSD.SPOT', 'buy', '1')
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from mock import Mock
+from Records import Trade
+from TradeStore import TradeStore
+from unittest import TestCase
+
+
+def _trade(trade_id, created, side, quantity, price, instrument="BTCUSD.SPOT"):
+    return {"trade_id": trade_id, "created": created, "instrument": instrument, "side": side,
+            "quantity": quantity, "price": price, "rfq_id": 'null', "order": 'null'}
+
+
+trades = [
+    _trade("a", "2020-02-28T11:41:15.023467Z", "buy", "2.0000000000", "700.00000000"),
+    _trade("b", "2020-02-28T11:42:15.023467Z", "sell", "1.0000000000", "800.00000000"),
+    _trade("c", "2020-02-28T11:43:15.023467Z", "buy", "1.0000000000", "50.00000000", "ETHUSD.SPOT"),
+]
+
+
+class TestTradeStore(TestCase):
+    def test_add(self):
+        tS = TradeStore(':memory:')
+        self.assertEqual(tS.add(trades[:2]), 2)
+        self.assertEqual(tS.add(trades), 1)
+        self.assertEqual(len(tS), 3)
+        self.assertEqual(tS.lastCreated(), "2020-02-28T11:43:15.023467Z")
+        self.assertEqual(list(tS.__iter__(batchSize=2)), trades)
+
+    def test_add_records(self):
+        tS = TradeStore(':memory:')
+        self.assertEqual(tS.add([Trade.fromResponse(t) for t in trades]), 3)
+        stored = list(tS)
+        self.assertEqual([t['quantity'] for t in stored], [t['quantity'] for t in trades])
+        self.assertEqual(stored[0]['rfq_id'], 'null')
+        self.assertEqual(tS.pnlByInstrument()["BTCUSD.SPOT"]['cash'], Decimal('-600'))
+
+    def test_sync(self):
+        tS = TradeStore(':memory:')
+        tS.add(trades[:1])
+        rH = Mock()
+        rH.iterTrades.return_value = iter(trades[1:])
+        self.assertEqual(tS.sync(rH, batchSize=1), 2)
+        rH.iterTrades.assert_called_once_with(since="2020-02-28T11:41:15.023467Z")
+
+    def test_pnlByInstrument(self):
+        tS = TradeStore(':memory:')
+        tS.add(trades)
+        pnl = tS.pnlByInstrument(marks={"BTCUSD.SPOT": 900.0})
+        self.assertEqual(pnl["BTCUSD.SPOT"]['position'], 1.0)
+        self.assertEqual(pnl["BTCUSD.SPOT"]['cash'], -600.0)
+        self.assertEqual(pnl["BTCUSD.SPOT"]['average_buy_price'], 700.0)
+        self.assertEqual(pnl["BTCUSD.SPOT"]['pnl'], 300.0)
+        self.assertNotIn('pnl', pnl["ETHUSD.SPOT"])
+        self.assertIsNone(pnl["ETHUSD.SPOT"]['average_sell_price'])
+
+    def test_pnlExact(self):
+        tS = TradeStore(':memory:')
+        tS.add([_trade("a", "2020-02-28T11:41:15.023467Z", "buy", "0.1000000000", "0.10000000"),
+                _trade("b", "2020-02-28T11:42:15.023467Z", "buy", "0.2000000000", "0.10000000")])
+        pnl = tS.pnlByInstrument()["BTCUSD.SPOT"]
+        self.assertEqual(pnl['position'], Decimal('0.3'))
+        self.assertEqual(pnl['cash'], Decimal('-0.03'))
@@ -0,0 +1,65 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+
+from Transport import Transport
+from requestConstants import timeouts
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"USD": "0"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.baseURL = 'http://127.0.0.1:%d' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reusesConnection(self):
+        t = Transport({}, baseURL=self.baseURL, poolSize=2)
+        self.assertEqual(t.get('/balance/').json(), {"USD": "0"})
+        self.assertEqual(t.get('/balance/').json(), {"USD": "0"})
+        self.assertEqual(t.stats(), {'new': 1, 'reused': 1, 'requests': 2})
+        t.close()
+
+    def test_prewarm(self):
+        t = Transport({}, baseURL=self.baseURL, poolSize=1, prewarm=True)
+        t.get('/balance/')
+        self.assertEqual(t.stats()['new'], 1)
+        self.assertEqual(t.stats()['reused'], 1)
+        t.close()
+
+    def test_sessionPerThread(self):
+        t = Transport({'Authorization': 'Token x'}, baseURL=self.baseURL)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(t._session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], t._session())
+        self.assertIs(sessions[0].get_adapter(self.baseURL), t._session().get_adapter(self.baseURL))
+        self.assertEqual(t._session().headers['Authorization'], 'Token x')
+
+    def test_timeout(self):
+        self.assertEqual(Transport._timeout('/order/'), timeouts['/order/'])
+        self.assertEqual(Transport._timeout('/balance/'), timeouts['default'])
@@ -0,0 +1,24 @@
+import json
+from jsonStream import iterArray
+from unittest import TestCase
+
+
+def _chunks(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestJsonStream(TestCase):
+    def test_iterArray(self):
+        out = [{"trade_id": str(i), "price": "700.0000000000", "user": "usér"} for i in range(50)]
+        data = json.dumps(out, ensure_ascii=False).encode('utf-8')
+        for size in (1, 7, 4096):
+            self.assertEqual(list(iterArray(_chunks(data, size))), out)
+
+    def test_iterArray_empty(self):
+        self.assertEqual(list(iterArray([b' [ ', b'] '])), [])
+
+    def test_iterArray_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterArray([b'{"USD": "0"}']))
+        with self.assertRaises(ValueError):
+            list(iterArray([b'[{"USD": "0"}, {"EUR"']))
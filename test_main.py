@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import main
+from mock import patch
+from MockExchange import MockExchange
+from unittest import TestCase
+
+
+class TestMain(TestCase):
+    def setUp(self):
+        self.server = MockExchange().start()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def run_main(self, *argv, stdin=''):
+        out = io.StringIO()
+        with patch('sys.stdin', io.StringIO(stdin)), patch('sys.stdout', out):
+            code = main.main(['--base-url', self.server.baseURL, '--order-journal',
+                              os.path.join(self.directory, 'orders.db')] + list(argv))
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_balances(self):
+        self.assertEqual(self.run_main('balances', 'BTC', 'ZZZ'), (0, [{'BTC': '100'}, {'ZZZ': None}]))
+
+    def test_quote(self):
+        code, out = self.run_main('quote', stdin='BTCUSD.SPOT buy 1\n\n'
+                                                 '{"instrument": "ETHUSD.SPOT", "side": "sell", "quantity": 2}\n'
+                                                 'FOO buy 1\n')
+        self.assertEqual(code, 1)
+        self.assertEqual([o['instrument'] for o in out], ['BTCUSD.SPOT', 'ETHUSD.SPOT', 'FOO'])
+        self.assertEqual(out[1]['quantity'], '2.0000000000')
+        self.assertIn('Invalid instrument', out[2]['error'])
+
+    def test_poll(self):
+        code, out = self.run_main('quote', 'BTCUSD.SPOT', 'buy', '1', '--poll', '0.01', '--count', '3')
+        self.assertEqual(len({o['rfq_id'] for o in out}), 3)
+        self.assertEqual(out[0]['price'], '10000.00000000')
+
+    def test_trade(self):
+        code, out = self.run_main('trade', 'BTCUSD.SPOT', 'sell', '1')
+        self.assertEqual((code, out[0]['status']), (0, 'filled'))
+        code, out = self.run_main('trades')
+        self.assertEqual(len(out), 1)
+        self.assertEqual(self.run_main('balances', 'BTC')[1], [{'BTC': '99.0000000000'}])
+
+    def test_accounts(self):
+        path = os.path.join(self.directory, 'accounts.json')
+        with open(path, 'w') as f:
+            json.dump({'accounts': [{'name': 'desk', 'apiToken': 'token',
+                                     'basket': [{'instrument': 'BTCUSD.SPOT', 'side': 'buy', 'quantity': '1'}]}]}, f)
+        code, out = self.run_main('accounts', path, '--workers', '2')
+        self.assertEqual(code, 0)
+        self.assertEqual([o.get('account') for o in out], ['desk', None])
+        self.assertEqual((out[1]['orders'], out[1]['filled']), (1, 1))
+
+    def test_slice(self):
+        code, out = self.run_main('slice', 'BTCUSD.SPOT', 'buy', '150', '--slices', '3', '--duration', '0.03')
+        self.assertEqual(code, 0)
+        self.assertEqual([o['quantity'] for o in out[:3]], ['50.0000'] * 3)
+        self.assertEqual((out[3]['filled'], float(out[3]['vwap'])), (3, 10000.0))
+        with patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+            self.run_main('slice', 'BTCUSD.SPOT', 'buy', '150', '--slices', '-1')
+
+    def test_profile(self):
+        path = os.path.join(self.directory, 'stacks.txt')
+        err = io.StringIO()
+        with patch('sys.stderr', err):
+            code, out = self.run_main('--profile', path, 'quote', 'BTCUSD.SPOT', 'buy', '1')
+        self.assertEqual(code, 0)
+        summary = json.loads(err.getvalue().splitlines()[-1])
+        self.assertEqual(summary['methods']['RFQ']['count'], 1)
+
+    def test_analytics(self):
+        cache = os.path.join(self.directory, 'trades.d')
+        self.run_main('trade', 'BTCUSD.SPOT', 'buy', '2')
+        code, out = self.run_main('analytics', '--cache', cache)
+        self.assertEqual(code, 0)
+        self.assertEqual([o['report'] for o in out], ['pnl', 'volume'])
+        self.assertEqual((out[0]['position'], out[0]['average_buy_price']), (2.0, 10000.0))
+        self.server.trades.clear()
+        self.assertEqual(self.run_main('analytics', '--cache', cache)[1], out)